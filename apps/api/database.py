@@ -1,12 +1,32 @@
 """
 MongoDB connection via Motor (async).
-Used by FastAPI dependency get_db(). Create 2dsphere index on startup in main.py.
+Indexes are declared in INDEX_SPECS and synced on startup in main.py (skipped when unchanged).
+
+One client per workload profile, so heavy market scans and batch sweeps cannot take the
+connections the reserve/pickup writes need:
+
+  transactional – get_db(): reserves, pickups, listing writes, and single-listing reads that
+                  must see a write just made (primary reads, short timeouts)
+  market        – get_market_db(): uncached map/search/impact reads (secondaryPreferred,
+                  compressed); market tile-cache fills use get_db
+  batch         – get_batch_db(): sweeps, simulation, bulk planning (small pool, long timeouts)
+
+Each setting can be overridden per profile, e.g. MONGO_MARKET_POOL_SIZE=50:
+  MONGO_<PROFILE>_POOL_SIZE, _MIN_POOL_SIZE, _WAIT_QUEUE_MS, _SOCKET_TIMEOUT_MS,
+  _COMPRESSORS (comma list: zlib, zstd, snappy; "none" to disable), _READ_PREFERENCE
 """
+import asyncio
+import hashlib
+import json
 import os
-from typing import Optional
+from datetime import datetime, timezone
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from pymongo import IndexModel
+
+from services.metrics import event_listeners
+from services.travel_time import TRAVEL_SAMPLES_TTL_DAYS
 
 # Load .env when running locally (uvicorn does not auto-load it)
 load_dotenv()
@@ -19,33 +39,170 @@ MONGODB_URI = (
 )
 DB_NAME = os.environ.get("DB_NAME", "replate")
 
-client: Optional[AsyncIOMotorClient] = None
+PROFILE_DEFAULTS = {
+    "transactional": {
+        "pool_size": 50, "min_pool_size": 5, "wait_queue_ms": 1000, "socket_timeout_ms": 5000,
+        "compressors": "none", "read_preference": "primary",
+    },
+    "market": {
+        "pool_size": 30, "min_pool_size": 2, "wait_queue_ms": 2000, "socket_timeout_ms": 10000,
+        "compressors": "zlib", "read_preference": "secondaryPreferred",
+    },
+    "batch": {
+        "pool_size": 10, "min_pool_size": 0, "wait_queue_ms": 30000, "socket_timeout_ms": 120000,
+        "compressors": "zlib", "read_preference": "primary",
+    },
+}
+
+_clients: dict[str, AsyncIOMotorClient] = {}
+
+
+def profile_settings(profile: str) -> dict:
+    settings = dict(PROFILE_DEFAULTS[profile])
+    for key, default in settings.items():
+        value = os.environ.get(f"MONGO_{profile.upper()}_{key.upper()}")
+        if value is not None:
+            settings[key] = type(default)(value)
+    return settings
 
 
-def get_client() -> AsyncIOMotorClient:
-    global client
+def get_client(profile: str = "transactional") -> AsyncIOMotorClient:
+    client = _clients.get(profile)
     if client is None:
-        client = AsyncIOMotorClient(MONGODB_URI)
+        s = profile_settings(profile)
+        kwargs = {}
+        if s["compressors"] != "none":
+            kwargs["compressors"] = s["compressors"]
+        client = _clients[profile] = AsyncIOMotorClient(
+            MONGODB_URI,
+            appname=f"replate-{profile}",
+            maxPoolSize=s["pool_size"],
+            minPoolSize=s["min_pool_size"],
+            waitQueueTimeoutMS=s["wait_queue_ms"],
+            socketTimeoutMS=s["socket_timeout_ms"],
+            serverSelectionTimeoutMS=5000,
+            readPreference=s["read_preference"],
+            event_listeners=event_listeners(profile, s["pool_size"]),
+            **kwargs,
+        )
     return client
 
 
+def close_clients() -> None:
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
+
+
 def get_db():
-    return get_client()[DB_NAME]
+    return get_client("transactional")[DB_NAME]
+
+
+def get_market_db():
+    return get_client("market")[DB_NAME]
+
+
+def get_batch_db():
+    return get_client("batch")[DB_NAME]
 
 
-async def ensure_indexes(db):
-    """Create indexes for map, filters, food banks, and donations."""
-    await db.listings.create_index([("location", "2dsphere")])
-    await db.listings.create_index([("status", 1), ("pickup_start", 1), ("pickup_end", 1)])
-    await db.listings.create_index([("status", 1), ("price_cents", 1)])
-    await db.listings.create_index([("status", 1), ("category", 1)])
-    await db.businesses.create_index([("business_code", 1)], unique=True)
+# collection -> [(keys, options)]; changing anything here changes INDEX_SCHEMA_HASH
+INDEX_SPECS: dict[str, list[tuple[list, dict]]] = {
+    "listings": [
+        ([("location", "2dsphere")], {}),
+        ([("status", 1), ("pickup_start", 1), ("pickup_end", 1)], {}),
+        ([("status", 1), ("price_cents", 1)], {}),
+        ([("status", 1), ("category", 1)], {}),
+        # MARKET_INDEX_MODE=tile: quadkey-prefix range scans (services/listing_fields.py)
+        ([("status", 1), ("tile", 1), ("price_cents", 1)], {}),
+        # GET /api/market/search: multikey over word prefixes
+        ([("status", 1), ("search_prefixes", 1)], {}),
+        # Archive sweep: listings past pickup_end (services/archive.py)
+        ([("pickup_end", 1)], {}),
+    ],
+    "businesses": [
+        ([("business_code", 1)], {"unique": True}),
+    ],
+    "food_banks": [
+        ([("location", "2dsphere")], {}),
+        ([("active", 1)], {}),
+        ([("location", "2dsphere"), ("open_days", 1)], {}),
+    ],
+    "orders": [
+        # Buyer and business order history, newest first, from one index each
+        ([("user_name", 1), ("created_at", -1)], {}),
+        ([("business_id", 1), ("created_at", -1)], {}),
+        ([("listing_id", 1)], {}),
+        ([("qr_token", 1)], {}),
+        # No-show sweep: reserved orders whose pickup window has ended (services/no_show.py)
+        ([("status", 1), ("listing_snapshot.pickup_end", 1)], {}),
+        # Archive sweep: settled orders by age
+        ([("status", 1), ("created_at", 1)], {}),
+    ],
+    "donations": [
+        ([("listing_id", 1)], {}),
+        ([("food_bank_id", 1)], {}),
+        ([("status", 1)], {}),
+    ],
+    # Cold tier (services/archive.py): only the history reads that take include_archived
+    "listings_archive": [
+        ([("business_id", 1)], {}),
+    ],
+    "orders_archive": [
+        ([("user_name", 1), ("created_at", -1)], {}),
+        ([("business_id", 1), ("created_at", -1)], {}),
+        ([("listing_id", 1)], {}),
+    ],
+    "donations_archive": [
+        ([("listing_id", 1)], {}),
+    ],
+    # Daily impact rollups (services/rollups.py): per-key day ranges, and per-day leaderboards
+    "rollup_bank_daily": [
+        ([("key", 1), ("day", 1)], {}),
+        ([("day", 1)], {}),
+    ],
+    "rollup_business_daily": [
+        ([("key", 1), ("day", 1)], {}),
+        ([("day", 1)], {}),
+    ],
+    "rollup_neighborhood_daily": [
+        ([("key", 1), ("day", 1)], {}),
+        ([("day", 1)], {}),
+    ],
+    # Cached OSRM results for the travel-time model: a rolling window (services/travel_time.py)
+    "travel_time_samples": [
+        ([("created_at", 1)], {"expireAfterSeconds": int(TRAVEL_SAMPLES_TTL_DAYS * 86400)}),
+    ],
+    "jobs": [
+        # One queued/running job per key; finished jobs drop active_key
+        ([("active_key", 1)], {"unique": True, "sparse": True}),
+        ([("status", 1), ("kind", 1), ("visible_at", 1)], {}),
+        ([("kind", 1), ("key", 1), ("created_at", -1)], {}),
+    ],
+}
+INDEX_SCHEMA_HASH = hashlib.sha1(
+    json.dumps(INDEX_SPECS, sort_keys=True).encode()
+).hexdigest()[:12]
+FORCE_INDEX_SYNC = os.environ.get("FORCE_INDEX_SYNC", "0") in ("1", "true", "True")
 
-    # Food banks
-    await db.food_banks.create_index([("location", "2dsphere")])
-    await db.food_banks.create_index([("active", 1)])
 
-    # Donations
-    await db.donations.create_index([("listing_id", 1)])
-    await db.donations.create_index([("food_bank_id", 1)])
-    await db.donations.create_index([("status", 1)])
+async def ensure_indexes(db, force: bool = FORCE_INDEX_SYNC) -> dict:
+    """
+    Create indexes for map, filters, food banks, donations, and the job queue.
+    Skipped (one find_one) when meta.index_schema already records INDEX_SCHEMA_HASH; otherwise
+    one create_indexes call per collection, run concurrently.
+    """
+    if not force:
+        applied = await db.meta.find_one({"_id": "index_schema"})
+        if applied and applied.get("hash") == INDEX_SCHEMA_HASH:
+            return {"applied": False, "hash": INDEX_SCHEMA_HASH}
+    await asyncio.gather(*(
+        db[collection].create_indexes([IndexModel(keys, **options) for keys, options in specs])
+        for collection, specs in INDEX_SPECS.items()
+    ))
+    await db.meta.update_one(
+        {"_id": "index_schema"},
+        {"$set": {"hash": INDEX_SCHEMA_HASH, "applied_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+    )
+    return {"applied": True, "hash": INDEX_SCHEMA_HASH}
@@ -1,23 +1,107 @@
 """
-FastAPI app: MongoDB (Motor), 2dsphere index on listings.location, CORS.
+FastAPI app: MongoDB (Motor), 2dsphere index on listings.location, CORS, /metrics.
 Run: uvicorn main:app --reload --port 8000
+
+Cold start: index sync is skipped when the stored index-schema hash matches, and non-critical
+setup (demo business seed) runs after the app starts serving. GET /debug/startup reports where
+the startup milliseconds went.
+
+Background loops (job workers for geocoding and donation plans, archiver, no-show sweeper) only start when
+RUN_BACKGROUND_WORKERS is on. On serverless (Vercel) they would freeze between invocations and
+run once per instance. There, jobs a request enqueues (geocoding, donation plans) run inside that
+request, and the rest is driven from a scheduler: /api/jobs/run (retries and leftover jobs),
+/api/orders/no-show-sweep (both on Vercel Cron, see vercel.json), and scripts/archive_cold_data.py.
+
+Env vars:
+  RUN_BACKGROUND_WORKERS – start the in-process background loops, default: 1 (0 when VERCEL is set)
 """
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from database import get_db, get_batch_db, ensure_indexes, close_clients
+from routers import listings, orders, business, donations, simulation, need, impact
+from services.osrm_service import close_client as close_osrm_client
+from services.need_raster import load_raster
+from services.geocode_queue import geocode_queue
+from services.jobs import job_pool
+from services.archive import archiver
+from services.no_show import no_show_sweeper
+from services import metrics
+
+
+logger = logging.getLogger(__name__)
+
+RUN_BACKGROUND_WORKERS = os.environ.get(
+    "RUN_BACKGROUND_WORKERS", "0" if os.environ.get("VERCEL") else "1",
+) in ("1", "true", "True")
+
+STARTUP_REPORT: dict = {"phases_ms": {}, "deferred_ms": {}}
+_background: set[asyncio.Task] = set()
 
-from database import get_db, ensure_indexes
-from routers import listings, orders, business, donations, simulation
+
+def _record(section: str, phase: str, started: float) -> None:
+    STARTUP_REPORT[section][phase] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _deferred_setup(db) -> None:
+    """Work that does not need to finish before the first request."""
+    t0 = time.perf_counter()
+    try:
+        if await db.businesses.find_one({}, {"_id": 1}) is None:
+            await db.businesses.insert_one({"name": "Demo Restaurant", "business_code": "DEMO"})
+    except Exception:
+        logger.exception("Deferred startup setup failed")
+    _record("deferred_ms", "seed_demo_business", t0)
+    t0 = time.perf_counter()
+    try:
+        resumed = await geocode_queue.resume_pending(db)
+        if resumed:
+            logger.info("Resumed geocoding for %d listings", resumed)
+    except Exception:
+        logger.exception("Resuming pending geocodes failed")
+    _record("deferred_ms", "resume_geocoding", t0)
+    logger.info("Deferred startup: %s", STARTUP_REPORT["deferred_ms"])
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    t_start = time.perf_counter()
     db = get_db()
-    await ensure_indexes(db)
-    if await db.businesses.count_documents({}) == 0:
-        await db.businesses.insert_one({"name": "Demo Restaurant", "business_code": "DEMO"})
+    t0 = time.perf_counter()
+    load_raster()
+    _record("phases_ms", "load_need_raster", t0)
+    t0 = time.perf_counter()
+    STARTUP_REPORT["indexes"] = await ensure_indexes(db)
+    _record("phases_ms", "ensure_indexes", t0)
+    _record("phases_ms", "lifespan_total", t_start)
+    logger.info("Startup: imports %.1f ms, %s", STARTUP_REPORT["import_ms"], STARTUP_REPORT["phases_ms"])
+
+    task = asyncio.create_task(_deferred_setup(db))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    if RUN_BACKGROUND_WORKERS:
+        # Donation-planning workers; jobs left by another process are picked up once their lease expires
+        job_pool.start(get_batch_db())
+        # Moves finished listings/orders/donations to the *_archive collections (ARCHIVE_INTERVAL_S)
+        archiver.start(get_batch_db())
+        # Expires reservations whose pickup window ended and returns their units (NO_SHOW_INTERVAL_S)
+        no_show_sweeper.start(get_batch_db())
     yield
+    await no_show_sweeper.close()
+    await archiver.close()
+    await job_pool.close()
+    await geocode_queue.close()
+    await close_osrm_client()
+    close_clients()
 
 
 app = FastAPI(title="Replate API", lifespan=lifespan)
@@ -37,13 +121,32 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 app.include_router(listings.router)
 app.include_router(orders.router)
 app.include_router(business.router)
 app.include_router(donations.router)
 app.include_router(simulation.router)
+app.include_router(need.router)
+app.include_router(impact.router)
+
+
+STARTUP_REPORT["import_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
 
 
 @app.get("/")
 async def root():
     return {"message": "Replate API", "docs": "/docs"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition: route, Mongo command and outbound call histograms."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/startup", include_in_schema=False)
+async def startup_report():
+    """Cold-start timing: import, lifespan phases, deferred setup, and whether indexes were synced."""
+    return STARTUP_REPORT
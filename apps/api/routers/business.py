@@ -1,31 +1,45 @@
 """
 Business side: listings CRUD and orders view. Require X-Business-Id header.
 Lookup business_id from business_code via GET /business/lookup?business_code=.
+Close and delete cascade to reserved orders and planned donations (services/listing_lifecycle.py).
 """
+import asyncio
 import math
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from bson import ObjectId
 from typing import Optional
 from pydantic import BaseModel
+from pymongo import UpdateOne
 
-from database import get_db
+from database import get_db, get_batch_db
 from schemas import (
     ListingCreate,
     ListingResponse,
     OrderResponse,
     BusinessCreateListingResponse,
     AllocationItem,
+    BulkListingCreateRequest,
+    BulkListingCreateResponse,
+    ListingLifecycleResponse,
 )
 from routers.listings import _listing_to_response
 from routers.orders import _order_to_response
-from services.geocode import geocode_address
+from services import jobs
+from services.archive import find_one_with_archive, find_with_archive
+from services.geocode_queue import geocode_queue, normalize_address
+from services.donation_planner import enqueue_plan
+from services.market_cache import invalidate as invalidate_market
+from services.listing_fields import derive_listing_fields
+from services.listing_lifecycle import close_listings
+from services.rollups import record_donations
 from services.donation_routing_service import (
-    pick_candidates,
+    pick_candidates_bulk,
     score_candidates,
     allocate_units,
+    request_deadline,
 )
 
 OSRM_MAX_MINUTES = float(os.environ.get("OSRM_MAX_MINUTES", 20))
@@ -59,26 +73,7 @@ async def get_business_id(
     return x_business_id.strip()
 
 
-@router.get("/listings", response_model=list[ListingResponse])
-async def business_list_listings(
-    business_id: str = Depends(get_business_id),
-    db=Depends(get_db),
-):
-    """List listings for this business."""
-    cursor = db.listings.find({"business_id": business_id})
-    out = []
-    async for doc in cursor:
-        out.append(_listing_to_response(doc))
-    return out
-
-
-@router.post("/listings", response_model=BusinessCreateListingResponse)
-async def business_create_listing(
-    body: ListingCreate,
-    business_id: str = Depends(get_business_id),
-    db=Depends(get_db),
-):
-    """Create listing; if donate_percent set, run allocation and set qty_available to remainder. Returns listing + allocations."""
+def _new_listing_doc(body: ListingCreate, business_id: str) -> dict:
     doc = {
         "business_id": business_id,
         "business_name": body.business_name,
@@ -94,88 +89,246 @@ async def business_create_listing(
     }
     if body.location:
         doc["location"] = {"type": "Point", "coordinates": body.location.coordinates}
-    elif body.address:
-        coords = await geocode_address(body.address)
-        if coords:
-            doc["location"] = {"type": "Point", "coordinates": list(coords)}
-
-    if body.donate_percent is not None and body.donate_percent > 0:
-        if not doc.get("location") or doc["location"].get("type") != "Point":
-            raise HTTPException(
-                status_code=422,
-                detail="Address (or location) is required when donate_percent > 0 so we can find nearby food banks",
-            )
+    doc.update(derive_listing_fields(doc))
+    return doc
+
 
+def _allocation_items(allocations: list[dict]) -> list[AllocationItem]:
+    return [
+        AllocationItem(
+            food_bank_id=str(a["food_bank_id"]),
+            name=a["name"],
+            address=a.get("address"),
+            phone=a.get("phone"),
+            qty=a["qty"],
+            duration_minutes=a.get("duration_minutes"),
+            score=a.get("score"),
+        )
+        for a in allocations
+    ]
+
+
+@router.get("/listings", response_model=list[ListingResponse])
+async def business_list_listings(
+    business_id: str = Depends(get_business_id),
+    include_archived: bool = Query(False),
+    db=Depends(get_db),
+):
+    """List listings for this business (?include_archived=true adds archived past listings)."""
+    docs = await find_with_archive(db, "listings", {"business_id": business_id}, include_archived=include_archived)
+    return [_listing_to_response(doc) for doc in docs]
+
+
+@router.post("/listings", response_model=BusinessCreateListingResponse)
+async def business_create_listing(
+    body: ListingCreate,
+    business_id: str = Depends(get_business_id),
+    db=Depends(get_db),
+):
+    """
+    Create listing and return it immediately. If donate_percent is set, the listing comes back with
+    donation_mode "queued" and a donation_plan job is queued (services/jobs.py); poll
+    GET /api/listings/{id}/donation or subscribe to .../donation/events for the finished plan.
+    Without background workers (serverless) the job runs inside this request and the listing
+    comes back planned (or failed).
+    With only an address, the listing is in status "geocoding" and the job is queued once the
+    geocode job lands its location.
+    """
+    doc = _new_listing_doc(body, business_id)
+    wants_donation = (
+        body.donate_percent is not None
+        and body.donate_percent > 0
+        and math.floor(doc["qty_available"] * body.donate_percent) >= 1
+    )
+    if wants_donation and not doc.get("location") and not (body.address and body.address.strip()):
+        raise HTTPException(
+            status_code=422,
+            detail="Address (or location) is required when donate_percent > 0 so we can find nearby food banks",
+        )
+
+    geocoding = not doc.get("location") and bool(body.address and body.address.strip())
+    if geocoding:
+        doc["status"] = "geocoding"
+        doc["geocode_status"] = "pending"
+    if wants_donation:
+        doc["donation_mode"] = "queued"
+        if geocoding:
+            doc["donation_request"] = {"donate_percent": body.donate_percent}
     result = await db.listings.insert_one(doc)
     doc["_id"] = result.inserted_id
-    listing_id_str = str(doc["_id"])
-    allocations: list[dict] = []
-
-    if body.donate_percent is not None and body.donate_percent > 0 and doc.get("location"):
-        total_qty = doc["qty_available"]
-        donation_qty = math.floor(total_qty * body.donate_percent)
-        if donation_qty >= 1:
-            candidates, routing_used = await pick_candidates(
-                doc["location"], db, top_k=OSRM_TOP_K, max_minutes=OSRM_MAX_MINUTES
-            )
-            if not candidates and routing_used:
-                await db.listings.delete_one({"_id": doc["_id"]})
-                raise HTTPException(
-                    status_code=503,
-                    detail="No reachable food banks found within the time constraint. Try again or create without donation %.",
-                )
+    invalidate_market(location=doc.get("location"))
+
+    job_id = None
+    if geocoding:
+        await geocode_queue.submit_listing(db, doc["_id"], body.address)
+        if not jobs.job_pool.running:
+            # Geocoded (and planned) inside this request: return the listing as it now is
+            doc = await db.listings.find_one({"_id": doc["_id"]}) or doc
+    elif wants_donation:
+        job = await enqueue_plan(db, doc["_id"], body.donate_percent, top_k=OSRM_TOP_K, max_minutes=OSRM_MAX_MINUTES)
+        job_id = str(job["_id"])
+        if await jobs.run_inline(db, job):
+            doc = await db.listings.find_one({"_id": doc["_id"]}) or doc
+
+    return BusinessCreateListingResponse(listing=_listing_to_response(doc), donation_job_id=job_id)
+
+
+@router.post("/listings/bulk", response_model=BulkListingCreateResponse)
+async def business_bulk_create_listings(
+    body: BulkListingCreateRequest,
+    business_id: str = Depends(get_business_id),
+    db=Depends(get_batch_db),
+):
+    """
+    Create many listings in one request. Same per-item rules as POST /listings, but:
+    - each distinct missing address is geocoded once, through the shared geocode queue;
+    - listings are written with one insert_many;
+    - donation plans share OSRM Table matrices, and their donation records and listing
+      updates are written in one batch each.
+    Items that fail (no location for a donation, no reachable food bank) are not kept.
+    """
+    items = body.listings
+    docs = [_new_listing_doc(item, business_id) for item in items]
+    results: list[Optional[dict]] = [None] * len(items)
+
+    def _fail(i: int, status_code: int, error: str):
+        results[i] = {"index": i, "ok": False, "status_code": status_code, "error": error}
+
+    def _wants_donation(item: ListingCreate) -> bool:
+        return item.donate_percent is not None and item.donate_percent > 0
+
+    # Geocode each distinct address once (shared rate limit and cache with single creates)
+    addresses: dict[str, str] = {}
+    for item, doc in zip(items, docs):
+        if not doc.get("location") and item.address:
+            addresses.setdefault(normalize_address(item.address), item.address)
+    if addresses:
+        coords = await asyncio.gather(*(geocode_queue.resolve(a) for a in addresses.values()))
+        coords_by_key = dict(zip(addresses.keys(), coords))
+        for item, doc in zip(items, docs):
+            if not doc.get("location") and item.address:
+                found = coords_by_key.get(normalize_address(item.address))
+                if found:
+                    doc["location"] = {"type": "Point", "coordinates": list(found)}
+                    doc.update(derive_listing_fields(doc))
+
+    insert_idx = []
+    for i, (item, doc) in enumerate(zip(items, docs)):
+        if _wants_donation(item) and not doc.get("location"):
+            _fail(i, 422, "Address (or location) is required when donate_percent > 0 so we can find nearby food banks")
+        else:
+            insert_idx.append(i)
+    if insert_idx:
+        inserted = await db.listings.insert_many([docs[i] for i in insert_idx])
+        for i, oid in zip(insert_idx, inserted.inserted_ids):
+            docs[i]["_id"] = oid
+
+    # Donation plans with shared routing matrices
+    plan_idx = [
+        i for i in insert_idx
+        if _wants_donation(items[i]) and math.floor(docs[i]["qty_available"] * items[i].donate_percent) >= 1
+    ]
+    allocations_by_idx: dict[int, list[dict]] = {}
+    routing_by_idx: dict[int, bool] = {}
+    if plan_idx:
+        picked = await pick_candidates_bulk(
+            [docs[i]["location"] for i in plan_idx],
+            db,
+            top_k=OSRM_TOP_K,
+            max_minutes=OSRM_MAX_MINUTES,
+            deadline=request_deadline(),
+        )
+        now = datetime.utcnow().isoformat() + "Z"
+        donation_docs = []
+        listing_updates = []
+        for i, (candidates, routing_used) in zip(plan_idx, picked):
             if not candidates:
-                await db.listings.delete_one({"_id": doc["_id"]})
-                raise HTTPException(
-                    status_code=404,
-                    detail="No active food banks found near this address",
-                )
-            scored = score_candidates(candidates)
-            allocations = allocate_units(donation_qty, scored)
+                if routing_used:
+                    _fail(i, 503, "No reachable food banks found within the time constraint. Try again or create without donation %.")
+                else:
+                    _fail(i, 404, "No active food banks found near this address")
+                continue
+            total_qty = docs[i]["qty_available"]
+            donation_qty = math.floor(total_qty * items[i].donate_percent)
+            allocations = allocate_units(donation_qty, score_candidates(candidates))
             if not allocations:
-                await db.listings.delete_one({"_id": doc["_id"]})
-                raise HTTPException(status_code=422, detail="Could not allocate units to any food bank")
+                _fail(i, 422, "Could not allocate units to any food bank")
+                continue
 
-            now = datetime.utcnow().isoformat() + "Z"
-            donation_docs = [
+            listing_id_str = str(docs[i]["_id"])
+            donation_docs.extend(
                 {
                     "listing_id": listing_id_str,
+                    "business_id": business_id,
                     "food_bank_id": a["food_bank_id"],
+                    "neighborhood": a.get("neighborhood"),
                     "qty": a["qty"],
                     "status": "planned",
                     "created_at": now,
                 }
                 for a in allocations
-            ]
-            await db.donations.insert_many(donation_docs)
-            remaining = total_qty - donation_qty
+            )
             update_payload = {
                 "donation_mode": "planned",
                 "donation_plan": allocations,
-                "donate_percent": body.donate_percent,
-                "qty_available": remaining,
+                "donate_percent": items[i].donate_percent,
             }
-            if remaining <= 0:
-                update_payload["status"] = "sold_out"
-            await db.listings.update_one({"_id": doc["_id"]}, {"$set": update_payload})
-            doc.update(update_payload)
+            # The listing is already live: $inc keeps reservations made since the insert
+            listing_updates.append(UpdateOne(
+                {"_id": docs[i]["_id"], "status": "open", "qty_available": {"$gte": donation_qty}},
+                {"$inc": {"qty_available": -donation_qty}, "$set": update_payload},
+            ))
+            docs[i].update(update_payload)
+            allocations_by_idx[i] = allocations
+            routing_by_idx[i] = routing_used
 
-    allocation_items = [
-        AllocationItem(
-            food_bank_id=str(a["food_bank_id"]),
-            name=a["name"],
-            address=a.get("address"),
-            phone=a.get("phone"),
-            qty=a["qty"],
-            duration_minutes=a.get("duration_minutes"),
-            score=a.get("score"),
-        )
-        for a in allocations
-    ]
-    return BusinessCreateListingResponse(
-        listing=_listing_to_response(doc),
-        allocations=allocation_items,
-    )
+        if donation_docs:
+            await db.donations.insert_many(donation_docs, ordered=False)
+        if listing_updates:
+            result = await db.listings.bulk_write(listing_updates, ordered=False)
+            planned_ids = [docs[i]["_id"] for i in allocations_by_idx]
+            if result.modified_count < len(listing_updates):
+                landed = set(await db.listings.distinct(
+                    "_id", {"_id": {"$in": planned_ids}, "donation_mode": "planned"},
+                ))
+                for i in [i for i in allocations_by_idx if docs[i]["_id"] not in landed]:
+                    _fail(i, 409, "Listing changed while planning (reserved or closed); try again")
+                    del allocations_by_idx[i]
+                missed = {str(docs[i]["_id"]) for i in plan_idx if i not in allocations_by_idx}
+                await db.donations.delete_many({"listing_id": {"$in": list(missed)}})
+                donation_docs = [d for d in donation_docs if d["listing_id"] not in missed]
+            await db.listings.update_many(
+                {"_id": {"$in": planned_ids}, "qty_available": {"$lte": 0}, "status": "open"},
+                {"$set": {"status": "sold_out"}},
+            )
+            fresh = {
+                d["_id"]: d for d in await db.listings.find(
+                    {"_id": {"$in": planned_ids}}, {"qty_available": 1, "status": 1},
+                ).to_list(length=None)
+            }
+            for i in allocations_by_idx:
+                docs[i].update(fresh.get(docs[i]["_id"], {}))
+        if donation_docs:
+            await record_donations(db, donation_docs)
+
+    failed_ids = [docs[i]["_id"] for i in insert_idx if results[i] is not None]
+    if failed_ids:
+        # Cascading delete: a listing that lost a plan race may already hold reservations
+        await close_listings(db, {"_id": {"$in": failed_ids}}, delete=True)
+    for i in insert_idx:
+        invalidate_market(location=docs[i].get("location"))
+
+    for i in insert_idx:
+        if results[i] is None:
+            results[i] = {
+                "index": i,
+                "ok": True,
+                "listing": _listing_to_response(docs[i]),
+                "allocations": _allocation_items(allocations_by_idx.get(i, [])),
+                "routing_used": routing_by_idx.get(i),
+            }
+    failed = sum(1 for r in results if not r["ok"])
+    return BulkListingCreateResponse(created=len(results) - failed, failed=failed, results=results)
 
 
 @router.patch("/listings/{listing_id}", response_model=ListingResponse)
@@ -185,7 +338,10 @@ async def business_update_listing(
     business_id: str = Depends(get_business_id),
     db=Depends(get_db),
 ):
-    """Update listing only if it belongs to this business."""
+    """
+    Update listing only if it belongs to this business. A changed pickup window is copied to the
+    listing_snapshot of its reserved orders, which the no-show sweep and order history read.
+    """
     try:
         oid = ObjectId(listing_id)
     except Exception:
@@ -197,60 +353,92 @@ async def business_update_listing(
     update = {k: v for k, v in body.items() if k in allowed}
     if not update:
         return _listing_to_response(listing)
+    update.update(derive_listing_fields({**listing, **update}))
     await db.listings.update_one({"_id": oid}, {"$set": update})
+    window = {f"listing_snapshot.{k}": update[k] for k in ("pickup_start", "pickup_end") if k in update}
+    if window:
+        await db.orders.update_many({"listing_id": listing_id, "status": "reserved"}, {"$set": window})
+    invalidate_market(oid, listing.get("location"))
     listing.update(update)
     return _listing_to_response(listing)
 
 
-@router.delete("/listings/{listing_id}", status_code=204)
+@router.delete("/listings/{listing_id}", response_model=ListingLifecycleResponse)
 async def business_delete_listing(
     listing_id: str,
     business_id: str = Depends(get_business_id),
     db=Depends(get_db),
 ):
-    """Delete listing only if it belongs to this business."""
+    """Delete listing only if it belongs to this business; cancels its reserved orders and voids planned donations."""
     try:
         oid = ObjectId(listing_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid listing id")
-    result = await db.listings.delete_one({"_id": oid, "business_id": business_id})
-    if result.deleted_count == 0:
+    result = await close_listings(db, {"_id": oid, "business_id": business_id}, delete=True)
+    if result["listings"] == 0:
         raise HTTPException(status_code=404, detail="Listing not found")
+    return result
+
+
+@router.post("/listings/close-today", response_model=ListingLifecycleResponse)
+async def business_close_today(
+    business_id: str = Depends(get_business_id),
+    db=Depends(get_db),
+):
+    """Close every live listing of this business whose pickup starts before the end of today (UTC)."""
+    tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return await close_listings(db, {
+        "business_id": business_id,
+        "status": {"$in": ["open", "sold_out", "geocoding"]},
+        "pickup_start": {"$lt": tomorrow.isoformat()},
+    })
+
+
+@router.post("/listings/{listing_id}/close", response_model=ListingLifecycleResponse)
+async def business_close_listing(
+    listing_id: str,
+    business_id: str = Depends(get_business_id),
+    db=Depends(get_db),
+):
+    """Stop selling a listing: status "closed", reserved orders canceled, planned donations voided."""
+    try:
+        oid = ObjectId(listing_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid listing id")
+    if not await db.listings.find_one({"_id": oid, "business_id": business_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Listing not found")
+    return await close_listings(db, {"_id": oid, "business_id": business_id})
 
 
 @router.get("/listings/{listing_id}/orders", response_model=list[OrderResponse])
 async def business_listing_orders(
     listing_id: str,
     business_id: str = Depends(get_business_id),
+    include_archived: bool = Query(False),
     db=Depends(get_db),
 ):
-    """Orders for this listing (only if listing belongs to business)."""
+    """Orders for this listing (only if listing belongs to business); archived ones with ?include_archived=true."""
     try:
         oid = ObjectId(listing_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid listing id")
-    listing = await db.listings.find_one({"_id": oid, "business_id": business_id})
+    listing = await find_one_with_archive(db, "listings", {"_id": oid, "business_id": business_id}, include_archived)
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
-    cursor = db.orders.find({"listing_id": listing_id})
-    out = []
-    async for doc in cursor:
-        out.append(_order_to_response(doc))
-    return out
+    docs = await find_with_archive(db, "orders", {"listing_id": listing_id}, include_archived=include_archived)
+    return [_order_to_response(doc) for doc in docs]
 
 
 @router.get("/orders", response_model=list[OrderResponse])
 async def business_orders(
     business_id: str = Depends(get_business_id),
     status: Optional[str] = Query(None),
+    include_archived: bool = Query(False),
     db=Depends(get_db),
 ):
-    """All orders for this business's listings. Optional ?status=reserved|picked_up|canceled."""
+    """All orders for this business's listings. Optional ?status=reserved|picked_up|canceled, ?include_archived=true."""
     filter: dict = {"business_id": business_id}
     if status:
         filter["status"] = status
-    cursor = db.orders.find(filter).sort("created_at", -1)
-    out = []
-    async for doc in cursor:
-        out.append(_order_to_response(doc))
-    return out
+    docs = await find_with_archive(db, "orders", filter, ("created_at", -1), include_archived)
+    return [_order_to_response(doc) for doc in docs]
@@ -2,28 +2,42 @@
 Donation routing endpoints.
 
 POST /api/listings/{listing_id}/donation/plan
+GET  /api/listings/{listing_id}/donation          – poll the background plan (after create)
+GET  /api/listings/{listing_id}/donation/events   – same, as Server-Sent Events until it settles
+GET  /api/jobs/{job_id}
+POST /api/jobs/run                               – drain queued jobs (serverless; GET for Vercel Cron)
 POST /api/donations/trigger-expiring
+GET  /api/donations/routing-status
+
+Env vars:
+  DONATION_EVENTS_POLL_S   – default: 0.5
+  DONATION_EVENTS_TIMEOUT_S – default: 60
 """
-import math
+import asyncio
+import json
 import os
 import logging
+import time
 from datetime import datetime, timezone
 
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
-from database import get_db
+from database import get_db, get_batch_db
 from schemas import (
+    AllocationItem,
     DonationPlanRequest,
     DonationPlanResponse,
+    DonationStatusResponse,
+    JobResponse,
+    JobsRunResponse,
     TriggerExpiringRequest,
     TriggerExpiringResponse,
 )
-from services.donation_routing_service import (
-    pick_candidates,
-    score_candidates,
-    allocate_units,
-)
+from services import jobs
+from services.donation_planner import DONATION_PLAN_JOB, PlanningError, plan_listing
+from services.osrm_service import osrm_status
 
 logger = logging.getLogger(__name__)
 
@@ -31,10 +45,34 @@ router = APIRouter(prefix="/api", tags=["donations"])
 
 OSRM_MAX_MINUTES = int(os.environ.get("OSRM_MAX_MINUTES", 20))
 OSRM_TOP_K = int(os.environ.get("OSRM_TOP_K", 5))
+DONATION_EVENTS_POLL_S = float(os.environ.get("DONATION_EVENTS_POLL_S", 0.5))
+DONATION_EVENTS_TIMEOUT_S = float(os.environ.get("DONATION_EVENTS_TIMEOUT_S", 60))
+
 
+def _listing_oid(listing_id: str) -> ObjectId:
+    try:
+        return ObjectId(listing_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid listing id")
 
-def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+
+async def _donation_status(db, oid: ObjectId) -> DonationStatusResponse:
+    listing = await db.listings.find_one(
+        {"_id": oid}, {"donation_mode": 1, "donation_error": 1, "donation_plan": 1}
+    )
+    if not listing:
+        raise HTTPException(status_code=404, detail="Listing not found")
+    job = await jobs.latest_job(db, DONATION_PLAN_JOB, str(oid))
+    return DonationStatusResponse(
+        listing_id=str(oid),
+        donation_mode=listing.get("donation_mode"),
+        donation_error=listing.get("donation_error"),
+        donation_plan=[
+            AllocationItem(**{**a, "food_bank_id": str(a["food_bank_id"])})
+            for a in listing.get("donation_plan") or []
+        ],
+        job=JobResponse(**jobs.job_to_response(job)) if job else None,
+    )
 
 
 @router.post("/listings/{listing_id}/donation/plan", response_model=DonationPlanResponse)
@@ -61,85 +99,83 @@ async def create_donation_plan(
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
 
-    location = listing.get("location")
-    if not location or location.get("type") != "Point":
-        raise HTTPException(status_code=422, detail="Listing has no valid location")
-
-    qty_available = listing.get("qty_available", 0)
-    donation_qty = math.floor(qty_available * body.donate_percent)
-    if donation_qty < 1:
-        raise HTTPException(status_code=422, detail="donation_qty rounds to 0; nothing to donate")
-
-    max_minutes = body.max_minutes or OSRM_MAX_MINUTES
-    top_k = body.top_k or OSRM_TOP_K
-
-    candidates, routing_used = await pick_candidates(location, db, top_k=top_k, max_minutes=max_minutes)
-
-    if not candidates and routing_used:
-        raise HTTPException(
-            status_code=503,
-            detail={
-                "error": "routing_unavailable",
-                "message": "No reachable food banks found within the time constraint",
-                "fallback": "use /map view",
-            },
+    try:
+        plan = await plan_listing(
+            db,
+            listing,
+            body.donate_percent,
+            top_k=body.top_k or OSRM_TOP_K,
+            max_minutes=body.max_minutes or OSRM_MAX_MINUTES,
         )
+    except PlanningError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    if not candidates:
-        raise HTTPException(
-            status_code=404,
-            detail="No active food banks found near this listing",
-        )
+    return DonationPlanResponse(
+        donation_qty=plan["donation_qty"],
+        remaining_public_qty=plan["remaining_public_qty"],
+        routing_used=plan["routing_used"],
+        allocations=plan["allocations"],
+    )
 
-    scored = score_candidates(candidates)
-    allocations = allocate_units(donation_qty, scored)
 
-    if not allocations:
-        raise HTTPException(status_code=422, detail="Could not allocate units to any food bank")
+@router.get("/listings/{listing_id}/donation", response_model=DonationStatusResponse)
+async def get_donation_status(listing_id: str, db=Depends(get_db)):
+    """Donation mode, plan and latest planning job for a listing (poll after create)."""
+    return await _donation_status(db, _listing_oid(listing_id))
 
-    now = _now_iso()
 
-    # Persist donation records
-    donation_docs = []
-    for alloc in allocations:
-        donation_docs.append({
-            "listing_id": listing_id,
-            "food_bank_id": alloc["food_bank_id"],
-            "qty": alloc["qty"],
-            "status": "planned",
-            "created_at": now,
-        })
-    if donation_docs:
-        await db.donations.insert_many(donation_docs)
-
-    remaining_public_qty = qty_available - donation_qty
-
-    # Set listing qty_available to remainder so marketplace shows correct reservable amount
-    update_payload = {
-        "donation_mode": "planned",
-        "donation_plan": allocations,
-        "donate_percent": body.donate_percent,
-        "qty_available": remaining_public_qty,
-    }
-    if remaining_public_qty <= 0:
-        update_payload["status"] = "sold_out"
-    await db.listings.update_one(
-        {"_id": oid},
-        {"$set": update_payload},
+@router.get("/listings/{listing_id}/donation/events")
+async def donation_events(listing_id: str, db=Depends(get_db)):
+    """
+    Server-Sent Events: one `status` event now and whenever the donation state changes, ending
+    once donation_mode leaves "queued" (or after DONATION_EVENTS_TIMEOUT_S).
+    """
+    oid = _listing_oid(listing_id)
+    first = await _donation_status(db, oid)
+
+    async def stream():
+        status, last = first, None
+        deadline = time.monotonic() + DONATION_EVENTS_TIMEOUT_S
+        while True:
+            payload = status.model_dump_json()
+            if payload != last:
+                yield f"event: status\ndata: {payload}\n\n"
+                last = payload
+            if status.donation_mode != "queued" or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(DONATION_EVENTS_POLL_S)
+            try:
+                status = await _donation_status(db, oid)
+            except HTTPException as e:
+                yield f"event: error\ndata: {json.dumps({'detail': e.detail})}\n\n"
+                break
+        yield "event: end\ndata: {}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    return DonationPlanResponse(
-        donation_qty=donation_qty,
-        remaining_public_qty=remaining_public_qty,
-        routing_used=routing_used,
-        allocations=allocations,
-    )
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db=Depends(get_db)):
+    job = await jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_to_response(job)
+
+
+@router.api_route("/jobs/run", methods=["GET", "POST"], response_model=JobsRunResponse)
+async def run_jobs(db=Depends(get_batch_db)):
+    """Run queued jobs in this request, for deployments without background workers."""
+    return await jobs.run_pending(db, jobs.JOB_RUN_LIMIT, jobs.JOB_RUN_BUDGET_S)
 
 
 @router.post("/donations/trigger-expiring", response_model=TriggerExpiringResponse)
 async def trigger_expiring_donations(
     body: TriggerExpiringRequest,
-    db=Depends(get_db),
+    db=Depends(get_batch_db),
 ):
     """
     Find open listings with qty_available > 0 whose pickup_end is within
@@ -155,7 +191,7 @@ async def trigger_expiring_donations(
                 "status": "open",
                 "qty_available": {"$gt": 0},
                 "pickup_end": {"$gte": threshold_iso},
-                "donation_mode": {"$nin": ["planned", "pending", "assigned"]},
+                "donation_mode": {"$nin": ["planned", "pending", "assigned", "queued"]},
             }
         },
         {"$addFields": {"pickup_end_date": {"$dateFromString": {"dateString": "$pickup_end"}}}},
@@ -181,61 +217,28 @@ async def trigger_expiring_donations(
     processed = 0
 
     for listing in expiring:
-        location = listing.get("location")
-        if not location:
+        if not listing.get("location"):
             continue
-
-        qty_available = listing.get("qty_available", 0)
-        donation_qty = math.floor(qty_available * body.donate_percent)
-        if donation_qty < 1:
+        try:
+            plan = await plan_listing(
+                db, listing, body.donate_percent, max_minutes=max_minutes, donation_mode="pending"
+            )
+        except PlanningError:
             continue
 
-        candidates, routing_used = await pick_candidates(location, db, max_minutes=max_minutes)
-        if not candidates:
-            continue
-
-        scored = score_candidates(candidates)
-        allocations = allocate_units(donation_qty, scored)
-        if not allocations:
-            continue
-
-        now_iso = _now_iso()
-        listing_id_str = str(listing["_id"])
-
-        donation_docs = [
-            {
-                "listing_id": listing_id_str,
-                "food_bank_id": a["food_bank_id"],
-                "qty": a["qty"],
-                "status": "planned",
-                "created_at": now_iso,
-            }
-            for a in allocations
-        ]
-        if donation_docs:
-            await db.donations.insert_many(donation_docs)
-
-        remaining_public_qty = qty_available - donation_qty
-        update_payload = {
-            "donation_mode": "pending",
-            "donation_plan": allocations,
-            "donate_percent": body.donate_percent,
-            "qty_available": remaining_public_qty,
-        }
-        if remaining_public_qty <= 0:
-            update_payload["status"] = "sold_out"
-        await db.listings.update_one(
-            {"_id": listing["_id"]},
-            {"$set": update_payload},
-        )
-
         plans.append({
-            "listing_id": listing_id_str,
+            "listing_id": str(listing["_id"]),
             "title": listing.get("title"),
-            "donation_qty": donation_qty,
-            "routing_used": routing_used,
-            "allocations": allocations,
+            "donation_qty": plan["donation_qty"],
+            "routing_used": plan["routing_used"],
+            "allocations": plan["allocations"],
         })
         processed += 1
 
     return TriggerExpiringResponse(processed=processed, plans=plans)
+
+
+@router.get("/donations/routing-status")
+async def routing_status():
+    """OSRM circuit-breaker state, latency percentiles and request counters."""
+    return osrm_status()
@@ -0,0 +1,72 @@
+"""
+Impact analytics from the daily rollups (services/rollups.py); reads never touch donations/orders.
+
+GET /api/impact/{dimension}?key=&start=&end=  – one bank / business / neighborhood, per day + totals
+GET /api/impact/{dimension}/top?start=&end=   – keys ranked by donated units over the range
+
+dimension: bank (key = food_bank_id), business (key = business_id), neighborhood (key = food-bank
+neighborhood, e.g. "ALLSTON/BRIGHTON"). Days are UTC "YYYY-MM-DD"; the range defaults to the last
+7 days and is capped at IMPACT_MAX_DAYS.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from database import get_market_db
+from schemas import ImpactCounts, ImpactDay, ImpactSeriesResponse, ImpactTopEntry
+from services.rollups import COUNTERS, read_series, read_top
+
+router = APIRouter(prefix="/api/impact", tags=["impact"])
+
+IMPACT_MAX_DAYS = 366
+Dimension = Literal["bank", "business", "neighborhood"]
+
+
+def _range(start: Optional[date], end: Optional[date]) -> tuple[str, str]:
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=6)
+    if start > end:
+        raise HTTPException(status_code=422, detail="start must be on or before end")
+    if (end - start).days >= IMPACT_MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"Range is limited to {IMPACT_MAX_DAYS} days")
+    return start.isoformat(), end.isoformat()
+
+
+def _counts(doc: dict) -> dict:
+    counts = {c: doc.get(c, 0) for c in COUNTERS}
+    counts["meals_rescued"] = counts["donated_units"] + counts["picked_up"]
+    return counts
+
+
+@router.get("/{dimension}/top", response_model=list[ImpactTopEntry])
+async def impact_top(
+    dimension: Dimension,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+    db=Depends(get_market_db),
+):
+    """Banks, businesses or neighborhoods with the most donated units in the range."""
+    start_day, end_day = _range(start, end)
+    rows = await read_top(db, dimension, start_day, end_day, limit)
+    return [{"key": row["_id"], **_counts(row)} for row in rows]
+
+
+@router.get("/{dimension}", response_model=ImpactSeriesResponse)
+async def impact_series(
+    dimension: Dimension,
+    key: str = Query(..., min_length=1),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db=Depends(get_market_db),
+):
+    """Per-day counters for one key; days without activity are omitted."""
+    start_day, end_day = _range(start, end)
+    docs = await read_series(db, dimension, key, start_day, end_day)
+    days = [{"day": doc["day"], **_counts(doc)} for doc in docs]
+    totals = _counts({c: sum(d[c] for d in days) for c in COUNTERS})
+    return ImpactSeriesResponse(
+        dimension=dimension, key=key, start=start_day, end=end_day,
+        totals=ImpactCounts(**totals), days=[ImpactDay(**d) for d in days],
+    )
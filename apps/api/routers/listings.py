@@ -1,5 +1,12 @@
 """
-Listings: POST (create), GET /market with optional bounds and filters (open_now, price, category).
+Listings: POST (create), GET /market with optional bounds and filters (open_now, price, category),
+GET /market/search for word-prefix search over title, business_name and category,
+GET /market/near for the closest listings within a radius ($geoNear, sorted by distance).
+
+Env vars:
+  MARKET_INDEX_MODE – how bounded market queries hit Mongo: "geo" ($geoWithin on the 2dsphere
+                      index, default) or "tile" (quadkey-prefix range scans on the
+                      (status, tile, price_cents) index; see services/listing_fields.py)
 """
 from datetime import datetime
 from typing import Optional
@@ -9,9 +16,8 @@ import re
 
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Query
-import httpx
 
-from database import get_db
+from database import get_db, get_market_db
 from schemas import (
     ListingCreate,
     ListingResponse,
@@ -20,10 +26,20 @@ from schemas import (
     MarketIntentResponse,
     BoundsPayload,
 )
-from services.geocode import geocode_address
+from services import jobs
+from services.archive import find_one_with_archive
+from services.geocode_queue import geocode_queue
+from services.market_cache import MARKET_CACHE_ENABLED, filter_key, invalidate as invalidate_market, market_cache
+from services.listing_fields import covering_ranges, derive_listing_fields
+from services.listing_search import query_terms, rank
+from services.metrics import track_outbound
 
 router = APIRouter(prefix="/api", tags=["listings"])
 
+MARKET_INDEX_MODE = os.environ.get("MARKET_INDEX_MODE", "geo")
+# Largest radius GET /market/near accepts (same cap the intent parser applies to radius_km)
+MARKET_NEAR_MAX_KM = 20.0
+
 _GEMINI_MODEL = "gemini-1.5-flash"
 _GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{_GEMINI_MODEL}:generateContent"
 
@@ -84,7 +100,7 @@ def _normalize_market_intent(payload: dict) -> MarketIntentResponse:
 
     radius_km = payload.get("radius_km")
     if isinstance(radius_km, (int, float)):
-        out.radius_km = float(min(max(radius_km, 0.5), 20.0))
+        out.radius_km = float(min(max(radius_km, 0.5), MARKET_NEAR_MAX_KM))
 
     bounds = payload.get("bounds")
     if isinstance(bounds, dict):
@@ -104,40 +120,37 @@ def _normalize_market_intent(payload: dict) -> MarketIntentResponse:
     return out
 
 
-@router.get("/market", response_model=list[ListingResponse])
-async def get_market(
-    sw_lat: Optional[float] = Query(None),
-    sw_lng: Optional[float] = Query(None),
-    ne_lat: Optional[float] = Query(None),
-    ne_lng: Optional[float] = Query(None),
-    open_now: Optional[bool] = Query(None),
-    min_price_cents: Optional[int] = Query(None),
-    max_price_cents: Optional[int] = Query(None),
-    category: Optional[str] = Query(None),
-    db=Depends(get_db),
-):
-    """Public feed. Optional bounds + filters: open_now, min/max_price_cents, category."""
+def market_filter(
+    bounds: Optional[tuple] = None,
+    open_now: bool = False,
+    min_price_cents: Optional[int] = None,
+    max_price_cents: Optional[int] = None,
+    category: Optional[str] = None,
+    mode: str = MARKET_INDEX_MODE,
+) -> dict:
+    """Mongo filter for open listings; bounds is (west, south, east, north)."""
     filter: dict = {"status": "open"}
-    if all(x is not None for x in (sw_lat, sw_lng, ne_lat, ne_lng)):
+    if bounds is not None and mode == "tile":
+        filter["$or"] = [{"tile": {"$gte": lo, "$lt": hi}} for lo, hi in covering_ranges(*bounds)]
+    elif bounds is not None:
+        west, south, east, north = bounds
         filter["location"] = {
             "$geoWithin": {
                 "$geometry": {
                     "type": "Polygon",
                     "coordinates": [[
-                        [sw_lng, sw_lat],
-                        [ne_lng, sw_lat],
-                        [ne_lng, ne_lat],
-                        [sw_lng, ne_lat],
-                        [sw_lng, sw_lat],
+                        [west, south],
+                        [east, south],
+                        [east, north],
+                        [west, north],
+                        [west, south],
                     ]]
                 }
             }
         }
     if open_now:
         now = datetime.utcnow().isoformat() + "Z"
-        filter["$and"] = filter.get("$and", [])
-        filter["$and"].append({"pickup_start": {"$lte": now}})
-        filter["$and"].append({"pickup_end": {"$gte": now}})
+        filter["$and"] = [{"pickup_start": {"$lte": now}}, {"pickup_end": {"$gte": now}}]
     if min_price_cents is not None or max_price_cents is not None:
         p: dict = {}
         if min_price_cents is not None:
@@ -147,16 +160,138 @@ async def get_market(
         filter["price_cents"] = p
     if category:
         filter["category"] = category
-    cursor = db.listings.find(filter)
+    return filter
+
+
+def in_bounds(doc: dict, bounds: tuple) -> bool:
+    """Exact box test; tile-mode covering prefixes overhang the requested box."""
+    west, south, east, north = bounds
+    location = doc.get("location")
+    if not location:
+        return False
+    lng, lat = location["coordinates"][:2]
+    return west <= lng <= east and south <= lat <= north
+
+
+@router.get("/market", response_model=list[ListingResponse])
+async def get_market(
+    sw_lat: Optional[float] = Query(None),
+    sw_lng: Optional[float] = Query(None),
+    ne_lat: Optional[float] = Query(None),
+    ne_lng: Optional[float] = Query(None),
+    open_now: Optional[bool] = Query(None),
+    min_price_cents: Optional[int] = Query(None),
+    max_price_cents: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
+    db=Depends(get_market_db),
+    primary=Depends(get_db),
+):
+    """
+    Public feed. Optional bounds + filters: open_now, min/max_price_cents, category.
+    Bounded requests are assembled from the tile cache (services/market_cache.py). Tile fills read
+    the primary: a fill right after an invalidating write must not cache a lagging secondary's
+    view for MARKET_CACHE_TTL_S. Uncached reads stay on the market profile.
+    """
+    async def fetch(bounds: Optional[tuple], with_open_now: bool = False, source=db) -> list[dict]:
+        cursor = source.listings.find(
+            market_filter(bounds, with_open_now, min_price_cents, max_price_cents, category),
+            {"search_prefixes": 0},
+        )
+        rows = [_listing_to_response(doc) async for doc in cursor]
+        if bounds is not None and MARKET_INDEX_MODE == "tile":
+            rows = [r for r in rows if in_bounds(r, bounds)]
+        return rows
+
+    if not all(x is not None for x in (sw_lat, sw_lng, ne_lat, ne_lng)):
+        return await fetch(None, with_open_now=bool(open_now))
+    if not MARKET_CACHE_ENABLED:
+        return await fetch((sw_lng, sw_lat, ne_lng, ne_lat), with_open_now=bool(open_now))
+    return await market_cache.query(
+        (sw_lng, sw_lat, ne_lng, ne_lat),
+        filter_key(min_price_cents, max_price_cents, category),
+        bool(open_now),
+        fetch,
+        fill=lambda bounds: fetch(bounds, source=primary),
+    )
+
+
+@router.get("/market/search", response_model=list[ListingResponse])
+async def search_market(
+    q: str = Query(..., min_length=1, max_length=100),
+    sw_lat: Optional[float] = Query(None),
+    sw_lng: Optional[float] = Query(None),
+    ne_lat: Optional[float] = Query(None),
+    ne_lng: Optional[float] = Query(None),
+    open_now: Optional[bool] = Query(None),
+    min_price_cents: Optional[int] = Query(None),
+    max_price_cents: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db=Depends(get_market_db),
+):
+    """
+    Open listings whose title, business name or category has a word starting with every word of q
+    ("flour bag" matches "Flour Bakery – Surplus Bagels"). Same bounds/price/category/open_now
+    filters as /market; ranked best first with a `score`.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    bounds = None
+    if all(x is not None for x in (sw_lat, sw_lng, ne_lat, ne_lng)):
+        bounds = (sw_lng, sw_lat, ne_lng, ne_lat)
+    filter = market_filter(bounds, bool(open_now), min_price_cents, max_price_cents, category)
+    filter["search_prefixes"] = {"$all": terms}
+    rows = [_listing_to_response(doc) async for doc in db.listings.find(filter, {"search_prefixes": 0})]
+    if bounds is not None and MARKET_INDEX_MODE == "tile":
+        rows = [r for r in rows if in_bounds(r, bounds)]
+    return rank(rows, terms)[:limit]
+
+
+@router.get("/market/near", response_model=list[ListingResponse])
+async def market_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(2.5, gt=0, le=MARKET_NEAR_MAX_KM),
+    open_now: Optional[bool] = Query(None),
+    min_price_cents: Optional[int] = Query(None),
+    max_price_cents: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db=Depends(get_market_db),
+):
+    """
+    Open listings within radius_km of (lat, lng), closest first, each with `distance_m`.
+    One $geoNear on the location 2dsphere index with the status/price/category/open_now
+    filters pushed into its query.
+    """
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": {"type": "Point", "coordinates": [lng, lat]},
+                "key": "location",
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": market_filter(None, bool(open_now), min_price_cents, max_price_cents, category),
+            }
+        },
+        {"$limit": limit},
+        {"$project": {"search_prefixes": 0}},
+    ]
     out = []
-    async for doc in cursor:
+    async for doc in db.listings.aggregate(pipeline):
+        doc["distance_m"] = round(doc["distance_m"], 1)
         out.append(_listing_to_response(doc))
     return out
 
 
 @router.post("/listings", response_model=ListingResponse)
 async def create_listing(body: ListingCreate, db=Depends(get_db)):
-    """Business creates listing. If address given and no location, geocode once and store."""
+    """
+    Business creates listing. If address given and no location, the listing is returned in status
+    "geocoding" and patched with its location (status "open") by the background geocode queue.
+    """
     doc = {
         "business_id": body.business_id,
         "business_name": body.business_name,
@@ -172,12 +307,18 @@ async def create_listing(body: ListingCreate, db=Depends(get_db)):
     }
     if body.location:
         doc["location"] = {"type": "Point", "coordinates": body.location.coordinates}
-    elif body.address:
-        coords = await geocode_address(body.address)
-        if coords:
-            doc["location"] = {"type": "Point", "coordinates": list(coords)}
+    elif body.address and body.address.strip():
+        doc["status"] = "geocoding"
+        doc["geocode_status"] = "pending"
+    doc.update(derive_listing_fields(doc))
     result = await db.listings.insert_one(doc)
     doc["_id"] = result.inserted_id
+    invalidate_market(location=doc.get("location"))
+    if doc["status"] == "geocoding":
+        await geocode_queue.submit_listing(db, doc["_id"], body.address)
+        if not jobs.job_pool.running:
+            # Geocoded inside this request (no background workers): return the located listing
+            doc = await db.listings.find_one({"_id": doc["_id"]}) or doc
     return _listing_to_response(doc)
 
 
@@ -231,14 +372,16 @@ Query: {query}
         },
     }
 
+    import httpx
+
     try:
-        async with httpx.AsyncClient(timeout=12.0) as client:
+        async with httpx.AsyncClient(timeout=12.0) as client, track_outbound("gemini", "generate_content"):
             resp = await client.post(
                 _GEMINI_URL,
                 params={"key": gemini_key},
                 json=payload,
             )
-        resp.raise_for_status()
+            resp.raise_for_status()
         data = resp.json()
         text = (
             data.get("candidates", [{}])[0]
@@ -255,12 +398,12 @@ Query: {query}
 
 
 @router.get("/listings/{listing_id}", response_model=ListingResponse)
-async def get_listing(listing_id: str, db=Depends(get_db)):
+async def get_listing(listing_id: str, include_archived: bool = Query(False), db=Depends(get_db)):
     try:
         oid = ObjectId(listing_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid listing id")
-    doc = await db.listings.find_one({"_id": oid})
+    doc = await find_one_with_archive(db, "listings", {"_id": oid}, include_archived)
     if not doc:
         raise HTTPException(status_code=404, detail="Listing not found")
     return _listing_to_response(doc)
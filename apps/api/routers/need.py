@@ -0,0 +1,45 @@
+"""
+Food-insecurity raster endpoints.
+
+GET /api/need/tiles/{z}/{x}/{y}.png  – heatmap tile (transparent outside the raster)
+GET /api/need/point?lng=&lat=        – interpolated SNAP rate at a point
+"""
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from services.need_raster import MAX_ZOOM, get_raster
+
+router = APIRouter(prefix="/api/need", tags=["need"])
+
+TILE_CACHE_CONTROL = "public, max-age=86400"
+
+
+@router.get("/tiles/{z}/{x}/{y}.png")
+def need_tile(z: int, x: int, y: int, request: Request):
+    """
+    Pre-rendered (or cached) heatmap tile with ETag / Cache-Control. A plain def, so FastAPI runs
+    it in the threadpool: a cache-miss render is CPU-bound and would otherwise stall the event loop.
+    """
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    raster = get_raster()
+    if raster is None:
+        raise HTTPException(status_code=404, detail="Need raster not built")
+    etag = f'"{raster.etag}-{z}-{x}-{y}"'
+    headers = {"Cache-Control": TILE_CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=raster.tile(z, x, y), media_type="image/png", headers=headers)
+
+
+@router.get("/point")
+async def need_point(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+):
+    """SNAP rate interpolated from nearby tracts; null outside the covered area."""
+    raster = get_raster()
+    if raster is None:
+        raise HTTPException(status_code=404, detail="Need raster not built")
+    value = raster.value_at(lng, lat)
+    return {"lng": lng, "lat": lat, "need_weight": round(value, 4) if value is not None else None}
@@ -1,5 +1,5 @@
 """
-Orders: atomic reserve, idempotent pickup scan, cancel + restock.
+Orders: atomic reserve, idempotent pickup scan, cancel + restock, no-show sweep.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from bson import ObjectId
@@ -8,8 +8,13 @@ from pymongo import ReturnDocument
 import secrets
 from typing import Optional
 
-from database import get_db
-from schemas import ReserveBody, PickupScanBody, OrderResponse, PickupScanResponse
+from database import get_db, get_batch_db
+from schemas import ReserveBody, PickupScanBody, OrderResponse, PickupScanResponse, NoShowSweepResponse
+from services.archive import find_with_archive
+from services.listing_fields import listing_snapshot
+from services.no_show import sweep_no_shows
+from services.market_cache import invalidate as invalidate_market
+from services.rollups import record_pickups
 
 router = APIRouter(prefix="/api", tags=["orders"])
 
@@ -27,25 +32,31 @@ def _order_to_response(doc: dict) -> dict:
 async def buyer_orders(
     user_name: str = Query(..., min_length=1),
     status: Optional[str] = Query(None),
+    include_archived: bool = Query(False),
     db=Depends(get_db),
 ):
-    """Buyer order history by user_name. Optional ?status=reserved|picked_up|canceled."""
+    """
+    Buyer order history by user_name. Optional ?status=reserved|picked_up|canceled.
+    Settled orders older than ARCHIVE_ORDERS_AFTER_D are only returned with ?include_archived=true.
+    """
     user = user_name.strip()
     if not user:
         raise HTTPException(status_code=400, detail="user_name is required")
     filter: dict = {"user_name": user}
     if status:
         filter["status"] = status
-    cursor = db.orders.find(filter).sort("created_at", -1)
-    out = []
-    async for doc in cursor:
-        out.append(_order_to_response(doc))
-    return out
+    docs = await find_with_archive(db, "orders", filter, ("created_at", -1), include_archived)
+    return [_order_to_response(doc) for doc in docs]
 
 
 @router.post("/listings/{listing_id}/reserve", response_model=OrderResponse)
 async def reserve(listing_id: str, body: ReserveBody, db=Depends(get_db)):
-    """Reserve one unit; atomic findOneAndUpdate to prevent oversell."""
+    """
+    Reserve one unit; atomic findOneAndUpdate to prevent oversell. The order embeds a
+    listing_snapshot (title, business, pickup window, address, price) for join-free history.
+    If the listing was closed or deleted between the unit and the order insert, the order is
+    canceled again and 409 returned (the close cascade could not see it yet).
+    """
     try:
         oid = ObjectId(listing_id)
     except Exception:
@@ -58,7 +69,8 @@ async def reserve(listing_id: str, body: ReserveBody, db=Depends(get_db)):
     if not listing:
         raise HTTPException(status_code=409, detail="Sold out / unavailable")
     if listing.get("qty_available", 0) <= 0:
-        await db.listings.update_one({"_id": oid}, {"$set": {"status": "sold_out"}})
+        await db.listings.update_one({"_id": oid, "status": "open"}, {"$set": {"status": "sold_out"}})
+    invalidate_market(oid, listing.get("location"))
     business_id = listing.get("business_id")
     order_doc = {
         "listing_id": listing_id,
@@ -67,27 +79,49 @@ async def reserve(listing_id: str, body: ReserveBody, db=Depends(get_db)):
         "status": "reserved",
         "qr_token": secrets.token_hex(16),
         "created_at": datetime.utcnow().isoformat() + "Z",
+        "listing_snapshot": listing_snapshot(listing),
     }
     r = await db.orders.insert_one(order_doc)
     order_doc["_id"] = r.inserted_id
+    live = await db.listings.find_one({"_id": oid}, {"status": 1})
+    if live is None or live.get("status") not in ("open", "sold_out"):
+        await db.orders.update_one(
+            {"_id": r.inserted_id, "status": "reserved"},
+            {"$set": {
+                "status": "canceled",
+                "canceled_at": datetime.utcnow().isoformat() + "Z",
+                "cancel_reason": "listing_deleted" if live is None else "listing_closed",
+            }},
+        )
+        raise HTTPException(status_code=409, detail="Listing was closed while reserving")
     return _order_to_response(order_doc)
 
 
 @router.post("/pickup/scan", response_model=PickupScanResponse)
 async def pickup_scan(body: PickupScanBody, db=Depends(get_db)):
-    """Idempotent: if already picked_up return 200 with already_picked_up=true."""
+    """
+    Idempotent: if already picked_up return 200 with already_picked_up=true. 409 when the order is
+    no longer reserved (canceled, or swept as a no-show and its unit restocked).
+    """
     order = await db.orders.find_one({"qr_token": body.qr_token})
     if not order:
         raise HTTPException(status_code=404, detail="Invalid or already used code")
     if order.get("status") == "picked_up":
         return PickupScanResponse(ok=True, already_picked_up=True, order=_order_to_response(order))
     now = datetime.utcnow().isoformat() + "Z"
-    await db.orders.update_one(
+    result = await db.orders.update_one(
         {"_id": order["_id"], "status": "reserved"},
         {"$set": {"status": "picked_up", "picked_up_at": now}},
     )
+    if not result.modified_count:
+        order = await db.orders.find_one({"_id": order["_id"]})
+        if order and order.get("status") == "picked_up":
+            return PickupScanResponse(ok=True, already_picked_up=True, order=_order_to_response(order))
+        status = order.get("status") if order else "missing"
+        raise HTTPException(status_code=409, detail=f"Order is {status}, not reserved; do not hand over")
     order["status"] = "picked_up"
     order["picked_up_at"] = now
+    await record_pickups(db, [order])
     return PickupScanResponse(ok=True, already_picked_up=False, order=_order_to_response(order))
 
 
@@ -102,21 +136,36 @@ async def cancel_order(order_id: str, db=Depends(get_db)):
     if not order:
         raise HTTPException(status_code=400, detail="Order not found or not reservable")
     now = datetime.utcnow().isoformat() + "Z"
-    await db.orders.update_one(
+    result = await db.orders.update_one(
         {"_id": oid, "status": "reserved"},
         {"$set": {"status": "canceled", "canceled_at": now, "cancel_reason": "user_cancel"}},
     )
+    if not result.modified_count:
+        # Picked up or swept as a no-show since the read; the sweep already restocked it
+        raise HTTPException(status_code=400, detail="Order not found or not reservable")
     lid = order.get("listing_id")
     if lid:
         try:
             lid_oid = ObjectId(lid) if isinstance(lid, str) else lid
-            await db.listings.update_one(
+            # The location finds the tile even when the listing was not cached (it was sold out)
+            listing = await db.listings.find_one_and_update(
                 {"_id": lid_oid},
                 {"$inc": {"qty_available": 1}, "$set": {"status": "open"}},
+                projection={"location": 1},
             )
+            invalidate_market(lid_oid, (listing or {}).get("location"))
         except Exception:
             pass
     order["status"] = "canceled"
     order["canceled_at"] = now
     order["cancel_reason"] = "user_cancel"
     return _order_to_response(order)
+
+
+@router.api_route("/orders/no-show-sweep", methods=["GET", "POST"], response_model=NoShowSweepResponse)
+async def no_show_sweep(db=Depends(get_batch_db)):
+    """
+    Run one no-show sweep now (the API also runs it every NO_SHOW_INTERVAL_S when background
+    workers are on). GET is accepted for Vercel Cron, which only sends GETs.
+    """
+    return await sweep_no_shows(db)
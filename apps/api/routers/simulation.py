@@ -7,7 +7,7 @@ GET /api/simulation
 from fastapi import APIRouter, Depends
 from bson import ObjectId
 
-from database import get_db
+from database import get_batch_db
 
 router = APIRouter(prefix="/api", tags=["simulation"])
 
@@ -20,7 +20,7 @@ def _serialize(doc: dict) -> dict:
 
 
 @router.get("/simulation")
-async def get_simulation(db=Depends(get_db)):
+async def get_simulation(db=Depends(get_batch_db)):
     """
     Returns listings that have a donation plan, plus details for each assigned food bank.
 
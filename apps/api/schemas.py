@@ -40,6 +40,11 @@ class ListingResponse(BaseModel):
     created_at: Optional[str] = None
     donate_percent: Optional[float] = None
     donation_plan: Optional[list] = None  # list of AllocationItem-like dicts
+    geocode_status: Optional[str] = None  # pending | done | failed (address-only creates)
+    donation_mode: Optional[str] = None
+    donation_error: Optional[str] = None
+    score: Optional[float] = None  # /market/search relevance
+    distance_m: Optional[float] = None  # /market/near
 
 # --- Orders ---
 class ReserveBody(BaseModel):
@@ -50,6 +55,17 @@ class PickupScanBody(BaseModel):
     qr_token: str
 
 
+class OrderListingSnapshot(BaseModel):
+    """Listing as it was when the order was reserved (embedded on the order)."""
+    title: Optional[str] = None
+    business_name: Optional[str] = None
+    price_cents: Optional[int] = None
+    pickup_start: Optional[str] = None
+    pickup_end: Optional[str] = None
+    address: Optional[str] = None
+    category: Optional[str] = None
+
+
 class OrderResponse(BaseModel):
     id: str
     listing_id: str
@@ -62,6 +78,7 @@ class OrderResponse(BaseModel):
     canceled_at: Optional[str] = None
     no_show_at: Optional[str] = None
     cancel_reason: Optional[str] = None
+    listing_snapshot: Optional[OrderListingSnapshot] = None
 
 
 class PickupScanResponse(BaseModel):
@@ -82,6 +99,7 @@ class AllocationItem(BaseModel):
     name: str
     address: Optional[str] = None
     phone: Optional[str] = None
+    neighborhood: Optional[str] = None
     qty: int
     duration_minutes: Optional[float] = None
     score: Optional[float] = None
@@ -95,9 +113,58 @@ class DonationPlanResponse(BaseModel):
 
 
 class BusinessCreateListingResponse(BaseModel):
-    """Create listing response: listing plus allocations when donate_percent was used."""
+    """Create listing response. Donation plans are computed by a background job (donation_mode "queued")."""
     listing: ListingResponse
     allocations: list[AllocationItem] = []
+    donation_job_id: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    key: str
+    status: str  # queued | running | done | failed
+    attempts: int
+    max_attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class JobsRunResponse(BaseModel):
+    ran: int  # jobs claimed and run in this call
+    reaped: int  # expired leases on their last attempt, marked failed
+
+
+class DonationStatusResponse(BaseModel):
+    """Donation state of one listing, for polling after create."""
+    listing_id: str
+    donation_mode: Optional[str] = None  # queued | pending | planned | failed | assigned | voided
+    donation_error: Optional[str] = None
+    donation_plan: list[AllocationItem] = []
+    job: Optional[JobResponse] = None
+
+
+class BulkListingCreateRequest(BaseModel):
+    listings: list[ListingCreate] = Field(..., min_length=1, max_length=500)
+
+
+class BulkListingItemResult(BaseModel):
+    """One entry per submitted listing, same order. On failure the listing is not kept."""
+    index: int
+    ok: bool
+    listing: Optional[ListingResponse] = None
+    allocations: list[AllocationItem] = []
+    routing_used: Optional[bool] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkListingCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkListingItemResult]
 
 
 class TriggerExpiringRequest(BaseModel):
@@ -111,6 +178,47 @@ class TriggerExpiringResponse(BaseModel):
     plans: list[dict]
 
 
+class ListingLifecycleResponse(BaseModel):
+    """Counts from a cascading listing close/delete (services/listing_lifecycle.py)."""
+    listings: int
+    orders_canceled: int
+    donations_voided: int
+    units_voided: int
+
+
+class NoShowSweepResponse(BaseModel):
+    orders: int  # reservations marked no_show
+    listings: int  # parent listings restocked or closed
+    seconds: float
+
+
+# --- Impact rollups ---
+class ImpactCounts(BaseModel):
+    donated_units: int = 0
+    donations: int = 0
+    picked_up: int = 0
+    revenue_cents: int = 0
+    no_shows: int = 0
+    meals_rescued: int = 0  # donated_units + picked_up
+
+
+class ImpactDay(ImpactCounts):
+    day: str
+
+
+class ImpactSeriesResponse(BaseModel):
+    dimension: str  # bank | business | neighborhood
+    key: str
+    start: str
+    end: str
+    totals: ImpactCounts
+    days: list[ImpactDay]
+
+
+class ImpactTopEntry(ImpactCounts):
+    key: str
+
+
 # --- Market intent ---
 class BoundsPayload(BaseModel):
     sw_lat: float
@@ -0,0 +1,57 @@
+"""
+Move finished listings, orders and donations to the *_archive collections (services/archive.py).
+
+The API runs the same sweep every ARCHIVE_INTERVAL_S. Use this for a one-off catch-up on a large
+backlog, or from cron with ARCHIVE_ENABLED=0. The retention windows come from
+ARCHIVE_LISTINGS_AFTER_H and ARCHIVE_ORDERS_AFTER_D.
+
+Usage (from apps/api/, MongoDB running):
+  python scripts/archive_cold_data.py
+  python scripts/archive_cold_data.py --db replate_scale --batch 5000
+  python scripts/archive_cold_data.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+load_dotenv(API_DIR / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.archive import ARCHIVE_BATCH, archive_once
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Archive finished listings, orders and donations")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "replate"))
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="only count what is past retention")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    try:
+        db = client[args.db]
+        result = await archive_once(db, args.batch, args.dry_run)
+        for name in ("listings", "orders", "donations"):
+            hot = await db[name].estimated_document_count()
+            cold = await db[f"{name}_archive"].estimated_document_count()
+            print(f"  {name:<10} hot={hot:,}  archive={cold:,}")
+    finally:
+        client.close()
+    print(f"Done: {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
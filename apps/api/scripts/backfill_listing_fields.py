@@ -0,0 +1,77 @@
+"""
+Recompute derived listing fields (services/listing_fields.py) on existing listings.
+
+Walks listings in _id order, derives the fields for each, and writes only the documents whose
+stored values differ, with one unordered bulk_write per batch. Safe to re-run; run it after
+deploying a change to derive_listing_fields() (or before switching MARKET_INDEX_MODE=tile).
+
+Usage (from apps/api/, MongoDB running):
+  python scripts/backfill_listing_fields.py
+  python scripts/backfill_listing_fields.py --db replate_scale --batch 5000
+  python scripts/backfill_listing_fields.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+load_dotenv(API_DIR / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from services.listing_fields import derive_listing_fields
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+
+async def backfill(db, batch_size: int, dry_run: bool) -> dict:
+    scanned = changed = 0
+    t0 = time.perf_counter()
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = await db.listings.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        ops = []
+        for doc in docs:
+            derived = derive_listing_fields(doc)
+            if any(doc.get(k) != v for k, v in derived.items()):
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": derived}))
+        scanned += len(docs)
+        changed += len(ops)
+        if ops and not dry_run:
+            await db.listings.bulk_write(ops, ordered=False)
+        print(f"  {scanned:,} scanned, {changed:,} {'to update' if dry_run else 'updated'}")
+    return {"scanned": scanned, "changed": changed, "seconds": round(time.perf_counter() - t0, 1)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill derived listing fields")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "replate"))
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    try:
+        result = await backfill(client[args.db], args.batch, args.dry_run)
+    finally:
+        client.close()
+    print(f"Done: {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
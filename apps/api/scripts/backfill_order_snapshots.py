@@ -0,0 +1,96 @@
+"""
+Embed listing_snapshot on orders reserved before reserve started writing it.
+
+Walks orders without a snapshot in _id order. Each batch loads its listings with one $in query
+and writes the snapshots with one unordered bulk_write. Orders whose listing was deleted are
+left without a snapshot (counted as missing). Safe to re-run.
+
+Usage (from apps/api/, MongoDB running):
+  python scripts/backfill_order_snapshots.py
+  python scripts/backfill_order_snapshots.py --db replate_scale --batch 5000
+  python scripts/backfill_order_snapshots.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+load_dotenv(API_DIR / ".env")
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from services.listing_fields import SNAPSHOT_FIELDS, listing_snapshot
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+
+def _oid(value):
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except Exception:
+        return None
+
+
+async def backfill(db, batch_size: int, dry_run: bool) -> dict:
+    scanned = updated = missing = 0
+    t0 = time.perf_counter()
+    last_id = None
+    while True:
+        query: dict = {"listing_snapshot": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = await db.orders.find(query, {"listing_id": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            break
+        last_id = orders[-1]["_id"]
+        listing_ids = {oid for oid in (_oid(o.get("listing_id")) for o in orders) if oid is not None}
+        listings = {
+            doc["_id"]: doc
+            async for doc in db.listings.find({"_id": {"$in": list(listing_ids)}}, dict.fromkeys(SNAPSHOT_FIELDS, 1))
+        }
+        ops = []
+        for order in orders:
+            listing = listings.get(_oid(order.get("listing_id")))
+            if listing is None:
+                missing += 1
+                continue
+            ops.append(UpdateOne({"_id": order["_id"]}, {"$set": {"listing_snapshot": listing_snapshot(listing)}}))
+        scanned += len(orders)
+        updated += len(ops)
+        if ops and not dry_run:
+            await db.orders.bulk_write(ops, ordered=False)
+        print(f"  {scanned:,} scanned, {updated:,} {'to update' if dry_run else 'updated'}, {missing:,} without listing")
+    return {"scanned": scanned, "updated": updated, "missing_listing": missing, "seconds": round(time.perf_counter() - t0, 1)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill listing snapshots on orders")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "replate"))
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    try:
+        result = await backfill(client[args.db], args.batch, args.dry_run)
+    finally:
+        client.close()
+    print(f"Done: {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
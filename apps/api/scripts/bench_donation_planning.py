@@ -0,0 +1,264 @@
+"""
+Donation-planning benchmark: pick_candidates → score_candidates → allocate_units.
+
+Starts scripts/osrm_stub.py as a subprocess, loads N synthetic food banks (jittered around the
+real boston_food_distributors.csv sites) into a scratch database on a local MongoDB, then runs
+plans for random listing locations and records plans/s, p50/p99 latency and allocations per plan.
+
+Usage (from apps/api/, MongoDB running locally):
+  python scripts/bench_donation_planning.py run --sizes 10,100,1000,10000 --plans 500
+  python scripts/bench_donation_planning.py run --stub-latency-ms 30 --stub-failure-rate 0.1
+  python scripts/bench_donation_planning.py compare bench_results/a.json bench_results/b.json
+
+Results are written to bench_results/donation_planning-<timestamp>.json.
+
+--db is dropped and refilled, so it must name a scratch database: the script refuses DB_NAME
+and any name without "bench" or "scratch" in it. --keep leaves it in place afterwards.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from dotenv import load_dotenv
+
+load_dotenv(API_DIR / ".env")
+
+DISTRIBUTORS_CSV = API_DIR / "food_data" / "boston_food_distributors.csv"
+RESULTS_DIR = API_DIR / "bench_results"
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+DB_NAME = os.environ.get("DB_NAME", "replate")
+SCRATCH_MARKERS = ("bench", "scratch")
+
+# Greater Boston listing area
+LAT_RANGE = (42.30, 42.40)
+LNG_RANGE = (-71.16, -71.03)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def load_sites() -> list[tuple[float, float]]:
+    sites = []
+    with open(DISTRIBUTORS_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                sites.append((float(row["longitude"]), float(row["latitude"])))
+            except (KeyError, ValueError):
+                continue
+    return sites
+
+
+def synthetic_banks(n: int, sites: list[tuple[float, float]], rng: random.Random) -> list[dict]:
+    banks = []
+    for i in range(n):
+        lng, lat = rng.choice(sites)
+        banks.append({
+            "name": f"Bench Bank {i}",
+            "address": f"{i} Bench St, Boston, MA",
+            "location": {
+                "type": "Point",
+                "coordinates": [lng + rng.gauss(0, 0.01), lat + rng.gauss(0, 0.01)],
+            },
+            "need_weight": round(rng.uniform(0.02, 0.6), 6),
+            "active": True,
+        })
+    return banks
+
+
+def start_stub(port: int, latency_ms: float, failure_rate: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [
+            sys.executable, str(API_DIR / "scripts" / "osrm_stub.py"),
+            "--port", str(port),
+            "--latency-ms", str(latency_ms),
+            "--failure-rate", str(failure_rate),
+        ],
+        cwd=API_DIR,
+    )
+    import httpx
+
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("OSRM stub did not start")
+
+
+async def bench_size(db, size: int, args, sites, rng) -> dict:
+    from services.donation_routing_service import (
+        pick_candidates,
+        score_candidates,
+        allocate_units,
+        request_deadline,
+    )
+
+    await db.food_banks.drop()
+    banks = synthetic_banks(size, sites, rng)
+    await db.food_banks.insert_many(banks, ordered=False)
+    await db.food_banks.create_index([("location", "2dsphere")])
+    await db.food_banks.create_index([("active", 1)])
+
+    latencies: list[float] = []
+    alloc_counts: list[int] = []
+    routed = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one_plan():
+        nonlocal routed
+        location = {
+            "type": "Point",
+            "coordinates": [rng.uniform(*LNG_RANGE), rng.uniform(*LAT_RANGE)],
+        }
+        donation_qty = rng.randint(5, 40)
+        async with sem:
+            t0 = time.perf_counter()
+            candidates, routing_used = await pick_candidates(
+                location, db, top_k=args.top_k, max_minutes=args.max_minutes,
+                deadline=request_deadline(),
+            )
+            allocations = allocate_units(donation_qty, score_candidates(candidates))
+            latencies.append(time.perf_counter() - t0)
+        alloc_counts.append(len(allocations))
+        routed += int(routing_used)
+
+    # Warm up connections and the stub before timing
+    await asyncio.gather(*(one_plan() for _ in range(min(10, args.plans))))
+    latencies.clear()
+    alloc_counts.clear()
+    routed = 0
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one_plan() for _ in range(args.plans)))
+    wall = time.perf_counter() - t_start
+
+    result = {
+        "food_banks": size,
+        "plans": args.plans,
+        "plans_per_s": round(args.plans / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "allocations_per_plan": round(statistics.mean(alloc_counts), 2),
+        "routing_used_rate": round(routed / args.plans, 3),
+    }
+    print(
+        f"  {size:>6} banks: {result['plans_per_s']:>8} plans/s  p50={result['p50_ms']}ms  "
+        f"p99={result['p99_ms']}ms  allocs/plan={result['allocations_per_plan']}  "
+        f"routed={result['routing_used_rate']:.0%}"
+    )
+    return result
+
+
+async def run(args):
+    os.environ["OSRM_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}"
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from services.osrm_service import close_client, osrm_status
+
+    rng = random.Random(args.seed)
+    sites = load_sites()
+    stub = start_stub(args.stub_port, args.stub_latency_ms, args.stub_failure_rate)
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[args.db]
+    results = []
+    try:
+        print(f"Benchmarking donation planning against stub on :{args.stub_port} (db={args.db})")
+        for size in args.sizes:
+            results.append(await bench_size(db, size, args, sites, rng))
+        osrm = osrm_status()
+    finally:
+        await close_client()
+        if not args.keep:
+            await client.drop_database(args.db)
+        client.close()
+        stub.terminate()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out = args.out or RESULTS_DIR / f"donation_planning-{stamp}.json"
+    out.write_text(json.dumps({
+        "benchmark": "donation_planning",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "plans": args.plans,
+            "concurrency": args.concurrency,
+            "top_k": args.top_k,
+            "max_minutes": args.max_minutes,
+            "stub_latency_ms": args.stub_latency_ms,
+            "stub_failure_rate": args.stub_failure_rate,
+            "seed": args.seed,
+        },
+        "results": results,
+        "osrm": osrm,
+    }, indent=2))
+    print(f"Saved to {out}")
+
+
+def compare(base_path: Path, new_path: Path):
+    base = {r["food_banks"]: r for r in json.loads(base_path.read_text())["results"]}
+    new = {r["food_banks"]: r for r in json.loads(new_path.read_text())["results"]}
+    print(f"{'banks':>6}  {'plans/s':>18}  {'p50 ms':>18}  {'p99 ms':>18}")
+    for size in sorted(base.keys() & new.keys()):
+        cells = []
+        for key in ("plans_per_s", "p50_ms", "p99_ms"):
+            b, n = base[size][key], new[size][key]
+            delta = (n - b) / b * 100 if b else 0.0
+            cells.append(f"{b:>7} → {n:<7}({delta:+.0f}%)")
+        print(f"{size:>6}  " + "  ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Donation-planning benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[10, 100, 1000, 10000])
+    p_run.add_argument("--plans", type=int, default=300)
+    p_run.add_argument("--concurrency", type=int, default=8)
+    p_run.add_argument("--top-k", type=int, default=5)
+    p_run.add_argument("--max-minutes", type=float, default=20)
+    p_run.add_argument("--stub-port", type=int, default=5099)
+    p_run.add_argument("--stub-latency-ms", type=float, default=10)
+    p_run.add_argument("--stub-failure-rate", type=float, default=0.0)
+    p_run.add_argument("--db", default="replate_bench", help="scratch database; dropped and refilled")
+    p_run.add_argument("--keep", action="store_true", help="keep the generated database")
+    p_run.add_argument("--seed", type=int, default=7)
+    p_run.add_argument("--out", type=Path, default=None)
+
+    p_cmp = sub.add_parser("compare")
+    p_cmp.add_argument("base", type=Path)
+    p_cmp.add_argument("new", type=Path)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        if args.db == DB_NAME or not any(m in args.db.lower() for m in SCRATCH_MARKERS):
+            parser.error(f"--db {args.db!r} is not a scratch database (it is dropped); use a name containing "
+                         f"{' or '.join(SCRATCH_MARKERS)}, other than DB_NAME={DB_NAME!r}")
+        asyncio.run(run(args))
+    else:
+        compare(args.base, args.new)
+
+
+if __name__ == "__main__":
+    main()
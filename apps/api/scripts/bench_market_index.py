@@ -0,0 +1,242 @@
+"""
+Market bounding-box benchmark: MARKET_INDEX_MODE "geo" ($geoWithin on 2dsphere) vs "tile"
+(quadkey-prefix range scans on (status, tile, price_cents)).
+
+Loads N dense synthetic listings (clustered around random Greater-Boston centres, mixed
+statuses and prices, derived fields set) into a scratch database on a local MongoDB, builds the
+app's indexes, then runs the same random viewports through both modes with the filter the
+endpoint builds (routers.listings.market_filter). Records p50/p99 latency, keys and docs examined
+per query (explain executionStats), and checks that both modes return the same listings.
+
+Usage (from apps/api/, MongoDB running locally):
+  python scripts/bench_market_index.py run --listings 200000 --queries 300
+  python scripts/bench_market_index.py run --db replate_scale --use-existing
+  python scripts/bench_market_index.py compare bench_results/a.json bench_results/b.json
+
+Results are written to bench_results/market_index-<timestamp>.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from dotenv import load_dotenv
+
+load_dotenv(API_DIR / ".env")
+
+RESULTS_DIR = API_DIR / "bench_results"
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+# Greater Boston listing area
+LAT_RANGE = (42.30, 42.40)
+LNG_RANGE = (-71.16, -71.03)
+# Viewport widths in degrees (~0.5 km street view → ~9 km city view)
+VIEWPORTS = (0.005, 0.02, 0.08)
+MODES = ("geo", "tile")
+CATEGORIES = ("bakery", "meal", "grocery", "cafe", "produce")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def synthetic_listings(n: int, rng: random.Random):
+    from services.listing_fields import derive_listing_fields
+
+    centres = [(rng.uniform(*LNG_RANGE), rng.uniform(*LAT_RANGE)) for _ in range(max(1, n // 500))]
+    now = datetime.now(timezone.utc)
+    for i in range(n):
+        lng, lat = rng.choice(centres)
+        start = now + timedelta(hours=rng.uniform(-24, 24))
+        doc = {
+            "business_id": f"bench-{i % 2000}",
+            "business_name": f"Bench Business {i % 2000}",
+            "title": f"Bench Bag {i}",
+            "price_cents": rng.choice([199, 299, 399, 499, 699, 899, 1299]),
+            "qty_available": rng.randint(0, 20),
+            "pickup_start": start.isoformat().replace("+00:00", "Z"),
+            "pickup_end": (start + timedelta(hours=2)).isoformat().replace("+00:00", "Z"),
+            "status": rng.choices(["open", "sold_out"], weights=[4, 6])[0],
+            "category": rng.choice(CATEGORIES),
+            "location": {
+                "type": "Point",
+                "coordinates": [lng + rng.gauss(0, 0.004), lat + rng.gauss(0, 0.004)],
+            },
+        }
+        doc.update(derive_listing_fields(doc))
+        yield doc
+
+
+def random_query(width: float, rng: random.Random) -> dict:
+    west = rng.uniform(LNG_RANGE[0], LNG_RANGE[1] - width)
+    south = rng.uniform(LAT_RANGE[0], LAT_RANGE[1] - width * 0.75)
+    query = {"bounds": (west, south, west + width, south + width * 0.75)}
+    if rng.random() < 0.4:
+        query["max_price_cents"] = rng.choice([299, 499, 899])
+    if rng.random() < 0.2:
+        query["category"] = rng.choice(CATEGORIES)
+    return query
+
+
+async def run_query(db, query: dict, mode: str) -> tuple[float, set]:
+    from routers.listings import in_bounds, market_filter
+
+    filter = market_filter(
+        query["bounds"], False, None, query.get("max_price_cents"), query.get("category"), mode=mode
+    )
+    t0 = time.perf_counter()
+    docs = await db.listings.find(filter).to_list(length=None)
+    if mode == "tile":
+        docs = [d for d in docs if in_bounds(d, query["bounds"])]
+    return time.perf_counter() - t0, {d["_id"] for d in docs}
+
+
+async def explain(db, query: dict, mode: str) -> dict:
+    from routers.listings import market_filter
+
+    filter = market_filter(
+        query["bounds"], False, None, query.get("max_price_cents"), query.get("category"), mode=mode
+    )
+    out = await db.command({"explain": {"find": "listings", "filter": filter}, "verbosity": "executionStats"})
+    stats = out["executionStats"]
+    return {"keys": stats["totalKeysExamined"], "docs": stats["totalDocsExamined"], "returned": stats["nReturned"]}
+
+
+async def bench_viewport(db, width: float, args, rng) -> dict:
+    queries = [random_query(width, rng) for _ in range(args.queries)]
+    result = {"viewport_deg": width, "queries": len(queries)}
+    returned: dict[str, list[set]] = {}
+    for mode in MODES:
+        # Warm the index pages this mode touches before timing
+        for q in queries[:10]:
+            await run_query(db, q, mode)
+        latencies, sets = [], []
+        for q in queries:
+            elapsed, ids = await run_query(db, q, mode)
+            latencies.append(elapsed)
+            sets.append(ids)
+        returned[mode] = sets
+        sampled = [await explain(db, q, mode) for q in queries[: args.explain]]
+        result[mode] = {
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+            "keys_examined": round(statistics.mean(s["keys"] for s in sampled), 1),
+            "docs_examined": round(statistics.mean(s["docs"] for s in sampled), 1),
+            "returned": round(statistics.mean(len(ids) for ids in sets), 1),
+        }
+    # $geoWithin uses geodesic polygon edges; count viewports where the two modes disagree
+    result["mismatched_queries"] = sum(a != b for a, b in zip(returned["geo"], returned["tile"]))
+    geo, tile = result["geo"], result["tile"]
+    print(
+        f"  {width:>6}°: geo p50={geo['p50_ms']}ms docs={geo['docs_examined']:.0f}  |  "
+        f"tile p50={tile['p50_ms']}ms keys={tile['keys_examined']:.0f} docs={tile['docs_examined']:.0f}  "
+        f"|  returned≈{geo['returned']:.0f}  mismatches={result['mismatched_queries']}"
+    )
+    return result
+
+
+async def run(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from database import ensure_indexes
+
+    rng = random.Random(args.seed)
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[args.db]
+    results = []
+    try:
+        if not args.use_existing:
+            await db.listings.drop()
+            batch = []
+            for doc in synthetic_listings(args.listings, rng):
+                batch.append(doc)
+                if len(batch) >= 10_000:
+                    await db.listings.insert_many(batch, ordered=False)
+                    batch = []
+            if batch:
+                await db.listings.insert_many(batch, ordered=False)
+        await ensure_indexes(db, force=True)
+        total = await db.listings.count_documents({})
+        print(f"Benchmarking market index modes on {total:,} listings (db={args.db})")
+        for width in args.viewports:
+            results.append(await bench_viewport(db, width, args, rng))
+    finally:
+        if not args.use_existing and not args.keep:
+            await client.drop_database(args.db)
+        client.close()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out = args.out or RESULTS_DIR / f"market_index-{stamp}.json"
+    out.write_text(json.dumps({
+        "benchmark": "market_index",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "listings": total,
+            "queries": args.queries,
+            "explain": args.explain,
+            "seed": args.seed,
+            "use_existing": args.use_existing,
+        },
+        "results": results,
+    }, indent=2))
+    print(f"Saved to {out}")
+
+
+def compare(base_path: Path, new_path: Path):
+    base = {r["viewport_deg"]: r for r in json.loads(base_path.read_text())["results"]}
+    new = {r["viewport_deg"]: r for r in json.loads(new_path.read_text())["results"]}
+    print(f"{'viewport':>8}  {'mode':>4}  {'p50 ms':>18}  {'p99 ms':>18}")
+    for width in sorted(base.keys() & new.keys()):
+        for mode in MODES:
+            cells = []
+            for key in ("p50_ms", "p99_ms"):
+                b, n = base[width][mode][key], new[width][mode][key]
+                delta = (n - b) / b * 100 if b else 0.0
+                cells.append(f"{b:>7} → {n:<7}({delta:+.0f}%)")
+            print(f"{width:>8}  {mode:>4}  " + "  ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market index mode benchmark (geo vs tile)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--listings", type=int, default=200_000)
+    p_run.add_argument("--queries", type=int, default=300)
+    p_run.add_argument("--explain", type=int, default=20, help="queries per viewport to explain")
+    p_run.add_argument("--viewports", type=lambda s: [float(x) for x in s.split(",")], default=list(VIEWPORTS))
+    p_run.add_argument("--db", default="replate_bench")
+    p_run.add_argument("--use-existing", action="store_true", help="query the listings already in --db")
+    p_run.add_argument("--keep", action="store_true", help="keep the generated database")
+    p_run.add_argument("--seed", type=int, default=7)
+    p_run.add_argument("--out", type=Path, default=None)
+
+    p_cmp = sub.add_parser("compare")
+    p_cmp.add_argument("base", type=Path)
+    p_cmp.add_argument("new", type=Path)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+    else:
+        compare(args.base, args.new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Build the food-insecurity raster used by services/need_raster.py.
+
+SNAP rates from greater_boston_snap_food_insecurity.csv tract centroids are interpolated onto a
+regular lat/lng grid with inverse-distance weighting over the k nearest tracts (KD-tree in local
+km). Cells farther than --max-km from every tract are nodata. Heatmap tiles for --min-zoom ..
+--max-zoom are pre-rendered into food_data/need_tiles/{z}/{x}/{y}.png; deeper zooms are rendered
+on demand by the API.
+
+Usage (from apps/api/):
+  python scripts/build_need_raster.py
+  python scripts/build_need_raster.py --cell-deg 0.001 --max-zoom 15
+  python scripts/build_need_raster.py --no-tiles
+"""
+import argparse
+import csv
+import math
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+
+from services.need_raster import (
+    HEADER,
+    MAGIC,
+    NEED_RASTER_PATH,
+    NEED_TILES_DIR,
+    NODATA,
+    VERSION,
+    NeedRaster,
+)
+
+SNAP_CSV = API_DIR / "food_data" / "greater_boston_snap_food_insecurity.csv"
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG_EQUATOR = 111.320
+
+
+def load_tracts(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    lat, lng, rate = [], [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                t_lat, t_lng, t_rate = float(row["lat"]), float(row["lng"]), float(row["snap_rate"])
+            except (KeyError, ValueError):
+                continue
+            lat.append(t_lat)
+            lng.append(t_lng)
+            rate.append(t_rate)
+    return np.array(lat), np.array(lng), np.array(rate)
+
+
+def interpolate(lat, lng, rate, args) -> tuple[np.ndarray, float, float]:
+    """IDW grid (rows north → south). Returns (grid with NaN for nodata, west, north)."""
+    west = math.floor((lng.min() - args.pad_deg) / args.cell_deg) * args.cell_deg
+    north = math.ceil((lat.max() + args.pad_deg) / args.cell_deg) * args.cell_deg
+    width = math.ceil((lng.max() + args.pad_deg - west) / args.cell_deg)
+    height = math.ceil((north - (lat.min() - args.pad_deg)) / args.cell_deg)
+
+    lng_scale = KM_PER_DEG_LNG_EQUATOR * math.cos(math.radians(float(lat.mean())))
+    tree = cKDTree(np.column_stack((lng * lng_scale, lat * KM_PER_DEG_LAT)))
+
+    cell_lng = west + (np.arange(width) + 0.5) * args.cell_deg
+    cell_lat = north - (np.arange(height) + 0.5) * args.cell_deg
+    glng, glat = np.meshgrid(cell_lng, cell_lat)
+    query = np.column_stack((glng.ravel() * lng_scale, glat.ravel() * KM_PER_DEG_LAT))
+
+    k = min(args.k, len(rate))
+    dist, idx = tree.query(query, k=k)
+    if k == 1:
+        dist, idx = dist[:, None], idx[:, None]
+    weights = 1.0 / np.maximum(dist, 1e-3) ** args.power
+    values = (weights * rate[idx]).sum(axis=1) / weights.sum(axis=1)
+    values[dist[:, 0] > args.max_km] = np.nan
+    return values.reshape(height, width), west, north
+
+
+def write_raster(grid: np.ndarray, west: float, north: float, cell_deg: float, path: Path) -> None:
+    scale = 1.0 / (NODATA - 1)
+    cells = np.where(np.isnan(grid), NODATA, np.clip(np.rint(np.nan_to_num(grid) / scale), 0, NODATA - 1))
+    height, width = grid.shape
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, west, north, cell_deg, scale))
+        f.write(cells.astype(np.uint8).tobytes())
+    tmp.replace(path)
+
+
+def tile_range(raster: NeedRaster, z: int) -> tuple[range, range]:
+    n = 1 << z
+
+    def tx(lng):
+        return min(n - 1, max(0, int((lng + 180.0) / 360.0 * n)))
+
+    def ty(lat):
+        s = math.sin(math.radians(lat))
+        return min(n - 1, max(0, int((0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n)))
+
+    return range(tx(raster.west), tx(raster.east) + 1), range(ty(raster.north), ty(raster.south) + 1)
+
+
+def render_tiles(raster: NeedRaster, min_zoom: int, max_zoom: int, out_dir: Path) -> int:
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    written = 0
+    for z in range(min_zoom, max_zoom + 1):
+        xs, ys = tile_range(raster, z)
+        for x in xs:
+            for y in ys:
+                if not raster.tile_in_bounds(z, x, y):
+                    continue
+                path = out_dir / str(z) / str(x) / f"{y}.png"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(raster.render_tile(z, x, y))
+                written += 1
+        print(f"  z{z}: {len(xs) * len(ys)} tiles")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SNAP need raster and heatmap tiles")
+    parser.add_argument("--snap", type=Path, default=SNAP_CSV)
+    parser.add_argument("--out", type=Path, default=NEED_RASTER_PATH)
+    parser.add_argument("--tiles-dir", type=Path, default=NEED_TILES_DIR)
+    parser.add_argument("--cell-deg", type=float, default=0.002, help="cell size in degrees (~200 m)")
+    parser.add_argument("--pad-deg", type=float, default=0.02)
+    parser.add_argument("--k", type=int, default=8, help="nearest tracts used per cell")
+    parser.add_argument("--power", type=float, default=2.0, help="IDW distance exponent")
+    parser.add_argument("--max-km", type=float, default=3.0, help="nodata beyond this distance from any tract")
+    parser.add_argument("--min-zoom", type=int, default=10)
+    parser.add_argument("--max-zoom", type=int, default=14)
+    parser.add_argument("--no-tiles", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    lat, lng, rate = load_tracts(args.snap)
+    if len(rate) == 0:
+        raise SystemExit(f"No tracts in {args.snap}")
+    grid, west, north = interpolate(lat, lng, rate, args)
+    write_raster(grid, west, north, args.cell_deg, args.out)
+    valid = np.count_nonzero(~np.isnan(grid))
+    print(
+        f"Wrote {args.out}: {grid.shape[1]}×{grid.shape[0]} cells ({valid} with data) "
+        f"from {len(rate)} tracts in {time.perf_counter() - t0:.2f}s"
+    )
+
+    if not args.no_tiles:
+        t0 = time.perf_counter()
+        raster = NeedRaster(args.out)
+        written = render_tiles(raster, args.min_zoom, args.max_zoom, args.tiles_dir)
+        raster.close()
+        print(f"Rendered {written} tiles into {args.tiles_dir} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
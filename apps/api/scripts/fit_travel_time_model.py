@@ -0,0 +1,127 @@
+"""
+Fit the local travel-time model from cached OSRM results (travel_time_samples collection)
+and write it to food_data/travel_time_model.json for services/travel_time.py.
+
+Model: duration_s = intercept_s + haversine_km * s_per_km, with s_per_km fitted per
+origin grid cell (falls back to the global slope for sparse cells).
+
+Run from apps/api (with .venv active and MongoDB running):
+  python scripts/fit_travel_time_model.py [--cell-deg 0.02] [--min-cell-samples 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.travel_time import TRAVEL_TIME_MODEL_PATH, DEFAULT_CELL_DEG, cell_key
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+DB_NAME = os.environ.get("DB_NAME", "replate")
+
+# Very short hops are dominated by the intercept; keep them out of the slope fit
+MIN_SLOPE_DISTANCE_KM = 0.5
+# Clamp per-cell slopes to something physically plausible (120 km/h .. 9 km/h)
+MIN_S_PER_KM = 30.0
+MAX_S_PER_KM = 400.0
+
+
+def fit_line(xs: list[float], ys: list[float]) -> tuple[float, float]:
+    """Ordinary least squares y = a + b*x. Returns (a, b)."""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0:
+        return 0.0, mean_y / mean_x if mean_x else 0.0
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    b = sxy / sxx
+    return mean_y - b * mean_x, b
+
+
+def fit(samples: list[dict], cell_deg: float, min_cell_samples: int) -> dict:
+    xs = [s["distance_km"] for s in samples]
+    ys = [s["duration_s"] for s in samples]
+    intercept, slope = fit_line(xs, ys)
+    intercept = max(intercept, 0.0)
+    slope = min(max(slope, MIN_S_PER_KM), MAX_S_PER_KM)
+
+    per_cell: dict[str, list[float]] = defaultdict(list)
+    for s in samples:
+        if s["distance_km"] < MIN_SLOPE_DISTANCE_KM:
+            continue
+        lng, lat = s["origin"]
+        per_cell[cell_key(lng, lat, cell_deg)].append(
+            (s["duration_s"] - intercept) / s["distance_km"]
+        )
+
+    cells = {
+        key: round(min(max(statistics.median(vals), MIN_S_PER_KM), MAX_S_PER_KM), 3)
+        for key, vals in per_cell.items()
+        if len(vals) >= min_cell_samples
+    }
+
+    residuals = []
+    for s in samples:
+        lng, lat = s["origin"]
+        s_per_km = cells.get(cell_key(lng, lat, cell_deg), slope)
+        residuals.append(abs(intercept + s["distance_km"] * s_per_km - s["duration_s"]))
+
+    return {
+        "cell_deg": cell_deg,
+        "intercept_s": round(intercept, 3),
+        "default_s_per_km": round(slope, 3),
+        "cells": cells,
+        "samples": len(samples),
+        "median_abs_error_s": round(statistics.median(residuals), 1),
+        "fitted_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cell-deg", type=float, default=DEFAULT_CELL_DEG)
+    parser.add_argument("--min-cell-samples", type=int, default=5)
+    parser.add_argument("--out", type=Path, default=TRAVEL_TIME_MODEL_PATH)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DB_NAME]
+    cursor = db.travel_time_samples.find(
+        {"duration_s": {"$ne": None}, "distance_km": {"$gt": 0}},
+        {"_id": 0, "origin": 1, "distance_km": 1, "duration_s": 1},
+    )
+    samples = await cursor.to_list(length=None)
+    client.close()
+
+    if len(samples) < 2:
+        print(f"Only {len(samples)} cached OSRM samples; need at least 2. Run some donation plans first.")
+        sys.exit(1)
+
+    model = fit(samples, args.cell_deg, args.min_cell_samples)
+    args.out.write_text(json.dumps(model, indent=2))
+    print(
+        f"Fitted on {model['samples']} samples: intercept={model['intercept_s']}s "
+        f"default={model['default_s_per_km']}s/km, {len(model['cells'])} cells, "
+        f"median |error|={model['median_abs_error_s']}s"
+    )
+    print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
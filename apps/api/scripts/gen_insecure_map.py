@@ -1,4 +1,22 @@
+"""
+Build food_data/greater_boston_snap_food_insecurity.csv: ACS SNAP rates per census tract plus
+area-weighted tract centroids from the TIGER boundaries.
+
+Both inputs are cached under food_data/cache/ so regeneration is fast and works offline:
+the tract GeoJSON is downloaded once and parsed as a stream, and ACS responses are stored per county.
+
+Usage (from apps/api/):
+  python scripts/gen_insecure_map.py              # uses caches, downloads what is missing
+  python scripts/gen_insecure_map.py --offline    # never touch the network
+  python scripts/gen_insecure_map.py --refresh    # re-download ACS and tract data
+"""
+import argparse
+import json
 import os
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
 import requests
 import pandas as pd
 from dotenv import load_dotenv
@@ -9,7 +27,6 @@ load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 # CONFIG
 # ----------------------------
 
-CENSUS_API_KEY = os.environ["CENSUS_KEY"]
 YEAR = 2022  # most recent ACS 5-year available
 DATASET = "acs/acs5"
 
@@ -34,72 +51,166 @@ TIGER_GEOJSON_URL = (
     "master/v2/GeoJSON/500k/2022/25/tract.json"
 )
 
+DATA_DIR = Path(__file__).parent.parent / "food_data"
+CACHE_DIR = DATA_DIR / "cache"
+TRACT_GEOJSON_PATH = CACHE_DIR / f"tract_{STATE_FIPS}_{YEAR}.json"
+OUT_PATH = DATA_DIR / "greater_boston_snap_food_insecurity.csv"
+
+_READ_CHUNK = 1 << 16
+
 
 # ----------------------------
 # FETCH SNAP DATA
 # ----------------------------
 
-def fetch_county_tract_data(county_name, county_fips):
-    url = f"https://api.census.gov/data/{YEAR}/{DATASET}"
-    params = {
-        "get": ",".join(["NAME"] + VARIABLES),
-        "for": "tract:*",
-        "in": f"state:{STATE_FIPS} county:{county_fips}",
-        "key": CENSUS_API_KEY,
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    data = response.json()
+def fetch_county_tract_data(county_name, county_fips, offline=False, refresh=False):
+    """ACS SNAP counts for every tract in a county; cached as JSON under food_data/cache/."""
+    cache_path = CACHE_DIR / f"acs_{YEAR}_{STATE_FIPS}{county_fips}.json"
+    if cache_path.exists() and not refresh:
+        data = json.loads(cache_path.read_text())
+    elif offline:
+        raise SystemExit(f"--offline: no cached ACS response at {cache_path}")
+    else:
+        census_api_key = os.environ.get("CENSUS_KEY")
+        if not census_api_key:
+            raise SystemExit("CENSUS_KEY is required to fetch ACS data (or run with a warm cache)")
+        url = f"https://api.census.gov/data/{YEAR}/{DATASET}"
+        params = {
+            "get": ",".join(["NAME"] + VARIABLES),
+            "for": "tract:*",
+            "in": f"state:{STATE_FIPS} county:{county_fips}",
+            "key": census_api_key,
+        }
+        response = requests.get(url, params=params, timeout=60)
+        response.raise_for_status()
+        data = response.json()
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(data))
     df = pd.DataFrame(data[1:], columns=data[0])
     df["county_name"] = county_name
     return df
 
 
 # ----------------------------
-# FETCH TRACT CENTROIDS
+# TRACT CENTROIDS
 # ----------------------------
 
-def fetch_tract_centroids(county_fips):
-    """Download MA tract GeoJSON from Census TIGER and extract centroids for one county."""
-    print("Fetching tract boundary centroids from TIGER...")
-    r = requests.get(TIGER_GEOJSON_URL, timeout=60)
-    r.raise_for_status()
-    geojson = r.json()
+def ensure_tract_file(path=TRACT_GEOJSON_PATH, offline=False, refresh=False) -> Path:
+    """Return the cached TIGER GeoJSON, downloading it (streamed to disk) if missing."""
+    if path.exists() and not refresh:
+        return path
+    if offline:
+        raise SystemExit(f"--offline: no cached tract file at {path}")
+    print("Downloading tract boundaries from TIGER...")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".part")
+    with requests.get(TIGER_GEOJSON_URL, timeout=60, stream=True) as r:
+        r.raise_for_status()
+        with open(tmp, "wb") as f:
+            for chunk in r.iter_content(_READ_CHUNK):
+                f.write(chunk)
+    tmp.replace(path)
+    return path
+
+
+def iter_features(path: Path) -> Iterator[dict]:
+    """
+    Yield features of a GeoJSON FeatureCollection one at a time without loading the file.
+    Scans to the "features" array, then raw_decodes one object at a time from a rolling buffer.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = ""
+        pos = -1
+        while pos < 0:
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                return
+            buf += chunk
+            key = buf.find('"features"')
+            if key >= 0:
+                pos = buf.find("[", key)
+        buf = buf[pos + 1:]
+        eof = False
+        while True:
+            stripped = buf.lstrip(" \t\r\n,")
+            if stripped.startswith("]"):
+                return
+            if stripped:
+                try:
+                    feature, end = decoder.raw_decode(stripped)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield feature
+                    buf = stripped[end:]
+                    continue
+            elif eof:
+                return
+            chunk = f.read(_READ_CHUNK)
+            eof = not chunk
+            buf = stripped + chunk
 
+
+def ring_area_centroid(ring: list) -> tuple[float, float, float]:
+    """Shoelace area (absolute) and centroid (x, y) of a closed ring, vectorized."""
+    pts = np.asarray(ring, dtype=float)
+    if len(pts) < 3:
+        return 0.0, 0.0, 0.0
+    # Translate to the first vertex for numerical stability
+    origin = pts[0]
+    x = pts[:, 0] - origin[0]
+    y = pts[:, 1] - origin[1]
+    if x[0] != x[-1] or y[0] != y[-1]:
+        x = np.append(x, x[0])
+        y = np.append(y, y[0])
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    signed = cross.sum() / 2.0
+    if signed == 0:
+        return 0.0, float(origin[0] + x.mean()), float(origin[1] + y.mean())
+    cx = ((x[:-1] + x[1:]) * cross).sum() / (6.0 * signed)
+    cy = ((y[:-1] + y[1:]) * cross).sum() / (6.0 * signed)
+    return abs(signed), float(origin[0] + cx), float(origin[1] + cy)
+
+
+def polygon_centroid(geom: dict):
+    """Area-weighted centroid (lng, lat) of a Polygon/MultiPolygon; holes subtract. None if degenerate."""
+    if geom["type"] == "Polygon":
+        polygons = [geom["coordinates"]]
+    elif geom["type"] == "MultiPolygon":
+        polygons = geom["coordinates"]
+    else:
+        return None
+    total = sx = sy = 0.0
+    for rings in polygons:
+        for i, ring in enumerate(rings):
+            area, cx, cy = ring_area_centroid(ring)
+            weight = area if i == 0 else -area
+            total += weight
+            sx += weight * cx
+            sy += weight * cy
+    if total <= 0:
+        return None
+    return float(sx / total), float(sy / total)
+
+
+def fetch_tract_centroids(county_fips, offline=False, refresh=False):
+    """Stream the cached MA tract GeoJSON and compute centroids for one county: {geoid: (lat, lng)}."""
+    path = ensure_tract_file(offline=offline, refresh=refresh)
+    prefix = STATE_FIPS + county_fips
     centroids = {}
-    for feature in geojson["features"]:
-        props = feature.get("properties", {})
-        geoid = props.get("GEOID", "")
+    for feature in iter_features(path):
+        geoid = (feature.get("properties") or {}).get("GEOID", "")
         # filter to the target county (state+county prefix)
-        if not geoid.startswith(STATE_FIPS + county_fips):
+        if not geoid.startswith(prefix):
             continue
         geom = feature.get("geometry")
         if not geom:
             continue
-        if geom["type"] == "Polygon":
-            rings = geom["coordinates"]
-        elif geom["type"] == "MultiPolygon":
-            rings = [ring for poly in geom["coordinates"] for ring in poly]
-        else:
-            continue
-        # Simple centroid: average of all exterior ring vertices
-        lngs, lats = [], []
-        for ring in rings:
-            for coord in ring[0] if isinstance(ring[0][0], list) else [ring[0]]:
-                pass
-        # Flatten all coordinates
-        coords = []
-        if geom["type"] == "Polygon":
-            for ring in geom["coordinates"]:
-                coords.extend(ring)
-        else:
-            for poly in geom["coordinates"]:
-                for ring in poly:
-                    coords.extend(ring)
-        if coords:
-            lngs = [c[0] for c in coords]
-            lats = [c[1] for c in coords]
-            centroids[geoid] = (sum(lats) / len(lats), sum(lngs) / len(lngs))
+        centroid = polygon_centroid(geom)
+        if centroid:
+            centroids[geoid] = (centroid[1], centroid[0])
 
     print(f"  Found centroids for {len(centroids)} tracts in county {county_fips}.")
     return centroids
@@ -110,10 +221,15 @@ def fetch_tract_centroids(county_fips):
 # ----------------------------
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the SNAP food-insecurity tract CSV")
+    parser.add_argument("--offline", action="store_true", help="use cached inputs only")
+    parser.add_argument("--refresh", action="store_true", help="re-download ACS and tract data")
+    args = parser.parse_args()
+
     all_data = []
     for county_name, county_fips in COUNTIES.items():
-        print(f"Fetching SNAP data for {county_name}...")
-        df = fetch_county_tract_data(county_name, county_fips)
+        print(f"Loading SNAP data for {county_name}...")
+        df = fetch_county_tract_data(county_name, county_fips, offline=args.offline, refresh=args.refresh)
         all_data.append(df)
 
     df = pd.concat(all_data, ignore_index=True)
@@ -126,7 +242,7 @@ def main():
 
     # Fetch centroids and merge
     county_fips = list(COUNTIES.values())[0]
-    centroids = fetch_tract_centroids(county_fips)
+    centroids = fetch_tract_centroids(county_fips, offline=args.offline, refresh=args.refresh)
     df["lat"] = df["geoid"].map(lambda g: centroids.get(g, (None, None))[0])
     df["lng"] = df["geoid"].map(lambda g: centroids.get(g, (None, None))[1])
 
@@ -145,9 +261,8 @@ def main():
         "snap_households",
     ]].rename(columns={"county_name": "county"})
 
-    out_path = os.path.join(os.path.dirname(__file__), "..", "food_data", "greater_boston_snap_food_insecurity.csv")
-    final_df.to_csv(out_path, index=False)
-    print(f"Done. Saved to {os.path.normpath(out_path)}")
+    final_df.to_csv(OUT_PATH, index=False)
+    print(f"Done. Saved to {os.path.normpath(OUT_PATH)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,335 @@
+"""
+Synthetic Greater-Boston dataset at production-like scale, for benchmarks.
+
+Distributions come from the real data:
+  - food banks are jittered copies of boston_food_distributors.csv sites (their hours strings
+    included), with need_weight from the nearest SNAP tract;
+  - businesses cluster around "commercial centres" drawn from SNAP tracts weighted by households;
+  - listings belong to businesses with a heavy-tailed (Pareto) listing count, evening pickup
+    windows spread from --history-days ago to two days ahead;
+  - orders and donations reference those listings, with statuses consistent with the window.
+
+Everything is written with unordered insert_many batches (a few in flight at once), then the
+app's indexes are built. Defaults to a separate database so the real one is untouched.
+
+Usage (from apps/api/, MongoDB running):
+  python scripts/gen_scale_dataset.py --listings 100000 --food-banks 10000 --orders 5000000 --donations 1000000
+  python scripts/gen_scale_dataset.py --listings 2000 --orders 20000 --db replate_scale --drop
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from bson import ObjectId
+from dotenv import load_dotenv
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+load_dotenv(API_DIR / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from ingest_food_banks import DISTRIBUTORS_CSV, SNAP_CSV, load_snap_tracts
+from services.hours import compile_hours
+from services.listing_fields import derive_listing_fields, listing_snapshot
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+CATEGORIES = [
+    "Bakery", "Cafe", "American", "Italian", "Asian", "Mexican", "Pizza", "Vegan",
+    "Seafood", "Sandwiches", "Market", "French", "Mediterranean", "Chinese", "Japanese",
+]
+# ~0.003° ≈ 300 m; businesses spread around commercial centres, banks around real sites
+BANK_JITTER_DEG = 0.003
+BUSINESS_JITTER_DEG = 0.004
+# Busy weekday evenings dominate pickup windows (local hour, UTC-4/5 ignored for simplicity)
+PICKUP_HOURS = [16, 17, 17, 18, 18, 18, 19, 19, 20, 21]
+
+
+def iso(dt: datetime) -> str:
+    return dt.replace(tzinfo=None).isoformat() + "Z"
+
+
+def load_tract_weights() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    lat, lng, households = [], [], []
+    with open(SNAP_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                lat.append(float(row["lat"]))
+                lng.append(float(row["lng"]))
+                households.append(max(float(row["total_households"]), 1.0))
+            except (KeyError, ValueError):
+                continue
+    w = np.array(households)
+    return np.array(lat), np.array(lng), w / w.sum()
+
+
+def load_sites() -> list[dict]:
+    sites = []
+    with open(DISTRIBUTORS_CSV, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                sites.append({
+                    "lat": float(row["latitude"]),
+                    "lng": float(row["longitude"]),
+                    "hours": (row.get("hours") or "").strip(),
+                    "neighborhood": (row.get("neighborhood") or "").strip(),
+                    "category": (row.get("category") or "").strip(),
+                })
+            except (KeyError, ValueError):
+                continue
+    return sites
+
+
+def gen_food_banks(n: int, rng: np.random.Generator) -> Iterator[dict]:
+    sites = load_sites()
+    tracts = load_snap_tracts()
+    picks = rng.integers(0, len(sites), size=n)
+    lat = np.array([sites[i]["lat"] for i in picks]) + rng.normal(0, BANK_JITTER_DEG, n)
+    lng = np.array([sites[i]["lng"] for i in picks]) + rng.normal(0, BANK_JITTER_DEG, n)
+    need = np.round(tracts.nearest_rates(lat, lng), 6)
+    now = datetime.now(timezone.utc)
+    compiled: dict[str, dict] = {}
+    for k in range(n):
+        site = sites[picks[k]]
+        if site["hours"] not in compiled:
+            compiled[site["hours"]] = compile_hours(site["hours"], now)
+        yield {
+            "name": f"Synthetic Food Bank {k}",
+            "category": site["category"],
+            "address": f"{k} Synthetic Way, Boston, MA",
+            "neighborhood": site["neighborhood"],
+            "phone": "",
+            "hours": site["hours"],
+            **compiled[site["hours"]],
+            "location": {"type": "Point", "coordinates": [float(lng[k]), float(lat[k])]},
+            "need_weight": float(need[k]),
+            "active": True,
+            "synthetic": True,
+        }
+
+
+def gen_businesses(n: int, rng: np.random.Generator) -> list[dict]:
+    t_lat, t_lng, weights = load_tract_weights()
+    n_centres = max(1, n // 25)
+    centres = rng.choice(len(t_lat), size=n_centres, p=weights)
+    owners = rng.choice(centres, size=n)
+    lat = t_lat[owners] + rng.normal(0, BUSINESS_JITTER_DEG, n)
+    lng = t_lng[owners] + rng.normal(0, BUSINESS_JITTER_DEG, n)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Synthetic Business {k}",
+            "business_code": f"SYN{k:06d}",
+            "category": CATEGORIES[int(rng.integers(len(CATEGORIES)))],
+            "lng": float(lng[k]),
+            "lat": float(lat[k]),
+            "synthetic": True,
+        }
+        for k in range(n)
+    ]
+
+
+def gen_listings(n: int, businesses: list[dict], now: datetime, history_days: int, rng: random.Random) -> Iterator[dict]:
+    # Heavy-tailed activity: a few businesses post most of the listings
+    activity = list(itertools.accumulate(rng.paretovariate(1.2) for _ in businesses))
+    for k in range(n):
+        biz = rng.choices(businesses, cum_weights=activity)[0] if k % 64 else rng.choice(businesses)
+        day = now - timedelta(days=rng.uniform(-2, history_days))
+        start = day.replace(hour=rng.choice(PICKUP_HOURS), minute=rng.choice([0, 15, 30, 45]), second=0, microsecond=0)
+        end = start + timedelta(minutes=rng.choice([60, 90, 120, 180]))
+        qty = int(rng.triangular(5, 80, 20))
+        if end < now:
+            status = rng.choices(["sold_out", "open"], weights=[6, 4])[0]
+        else:
+            status = "open"
+        doc = {
+            "_id": ObjectId(),
+            "business_id": str(biz["_id"]),
+            "business_name": biz["name"],
+            "title": f"{biz['name']} Surplus Bag",
+            "price_cents": rng.choice([199, 249, 299, 349, 399, 449, 499, 599, 699, 899, 1299]),
+            "qty_available": 0 if status == "sold_out" else rng.randint(0, qty),
+            "pickup_start": iso(start),
+            "pickup_end": iso(end),
+            "status": status,
+            "address": f"{k} Synthetic St, Boston, MA",
+            "category": biz["category"],
+            "location": {
+                "type": "Point",
+                "coordinates": [biz["lng"] + rng.gauss(0, 0.0005), biz["lat"] + rng.gauss(0, 0.0005)],
+            },
+            "created_at": iso(start - timedelta(hours=rng.uniform(1, 8))),
+            "synthetic": True,
+        }
+        doc.update(derive_listing_fields(doc))
+        yield doc
+
+
+def gen_orders(n: int, listings: list[tuple], now: datetime, rng: random.Random) -> Iterator[dict]:
+    """listings: (listing_id, business_id, pickup_start, pickup_end, listing_snapshot) tuples."""
+    users = max(1000, n // 25)
+    for _ in range(n):
+        listing_id, business_id, start, end, snapshot = rng.choice(listings)
+        created = start - timedelta(minutes=rng.uniform(5, 240))
+        doc = {
+            "listing_id": listing_id,
+            "business_id": business_id,
+            "user_name": f"user{rng.randrange(users)}",
+            "qr_token": secrets.token_hex(16),
+            "created_at": iso(created),
+            "listing_snapshot": snapshot,
+            "synthetic": True,
+        }
+        if end > now:
+            doc["status"] = "reserved"
+        else:
+            doc["status"] = rng.choices(["picked_up", "canceled", "reserved"], weights=[82, 10, 8])[0]
+            if doc["status"] == "picked_up":
+                doc["picked_up_at"] = iso(start + (end - start) * rng.random())
+            elif doc["status"] == "canceled":
+                doc["canceled_at"] = iso(created + timedelta(minutes=rng.uniform(1, 60)))
+                doc["cancel_reason"] = "user_cancel"
+        yield doc
+
+
+def gen_donations(n: int, listings: list[tuple], bank_ids: list[str], rng: random.Random) -> Iterator[dict]:
+    for _ in range(n):
+        listing_id, business_id, start, _, _ = rng.choice(listings)
+        yield {
+            "listing_id": listing_id,
+            "business_id": business_id,
+            "food_bank_id": rng.choice(bank_ids),
+            "qty": rng.randint(1, 20),
+            "status": "planned",
+            "created_at": iso(start - timedelta(minutes=rng.uniform(0, 120))),
+            "synthetic": True,
+        }
+
+
+async def insert_stream(coll, docs: Iterator[dict], total: int, batch_size: int, in_flight: int = 4) -> None:
+    """insert_many in unordered batches with a few batches in flight."""
+    t0 = time.perf_counter()
+    pending: set[asyncio.Task] = set()
+    written = 0
+    batch: list[dict] = []
+
+    async def _flush(b: list[dict]):
+        await coll.insert_many(b, ordered=False)
+
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            pending.add(asyncio.create_task(_flush(batch)))
+            written += len(batch)
+            batch = []
+            if len(pending) >= in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            if written % (batch_size * 10) == 0:
+                rate = written / (time.perf_counter() - t0)
+                print(f"    {coll.name}: {written:,}/{total:,} ({rate:,.0f} docs/s)")
+    if batch:
+        pending.add(asyncio.create_task(_flush(batch)))
+        written += len(batch)
+    for task in pending:
+        await task
+    elapsed = time.perf_counter() - t0
+    print(f"  {coll.name}: {written:,} docs in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} docs/s)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Greater-Boston dataset")
+    parser.add_argument("--db", default="replate_scale")
+    parser.add_argument("--businesses", type=int, default=2000)
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--food-banks", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=5_000_000)
+    parser.add_argument("--donations", type=int, default=1_000_000)
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="drop the target collections first")
+    args = parser.parse_args()
+
+    from database import ensure_indexes
+
+    rng = random.Random(args.seed)
+    np_rng = np.random.default_rng(args.seed)
+    now = datetime.now(timezone.utc)
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[args.db]
+    if args.drop:
+        for name in ("businesses", "listings", "food_banks", "orders", "donations"):
+            await db[name].drop()
+
+    print(f"Generating into {args.db}: {args.businesses:,} businesses, {args.listings:,} listings, "
+          f"{args.food_banks:,} food banks, {args.orders:,} orders, {args.donations:,} donations")
+    t0 = time.perf_counter()
+
+    businesses = gen_businesses(args.businesses, np_rng)
+    await insert_stream(
+        db.businesses,
+        ({k: v for k, v in b.items() if k not in ("lng", "lat", "category")} for b in businesses),
+        len(businesses), args.batch,
+    )
+
+    bank_ids: list[str] = []
+
+    def _banks():
+        for bank in gen_food_banks(args.food_banks, np_rng):
+            bank["_id"] = ObjectId()
+            bank_ids.append(str(bank["_id"]))
+            yield bank
+
+    await insert_stream(db.food_banks, _banks(), args.food_banks, args.batch)
+
+    listing_refs: list[tuple] = []
+
+    def _listings():
+        for doc in gen_listings(args.listings, businesses, now, args.history_days, rng):
+            listing_refs.append((
+                str(doc["_id"]),
+                doc["business_id"],
+                datetime.fromisoformat(doc["pickup_start"].rstrip("Z")).replace(tzinfo=timezone.utc),
+                datetime.fromisoformat(doc["pickup_end"].rstrip("Z")).replace(tzinfo=timezone.utc),
+                listing_snapshot(doc),
+            ))
+            yield doc
+
+    await insert_stream(db.listings, _listings(), args.listings, args.batch)
+    if listing_refs:
+        await insert_stream(db.orders, gen_orders(args.orders, listing_refs, now, rng), args.orders, args.batch)
+        if bank_ids:
+            await insert_stream(
+                db.donations, gen_donations(args.donations, listing_refs, bank_ids, rng),
+                args.donations, args.batch,
+            )
+
+    print("Building indexes...")
+    t_idx = time.perf_counter()
+    await ensure_indexes(db)
+    print(f"  indexes in {time.perf_counter() - t_idx:.1f}s")
+    client.close()
+    print(f"Done in {time.perf_counter() - t0:.1f}s. Point benchmarks at DB_NAME={args.db}.")
+    print(f"Impact rollups: python scripts/rebuild_rollups.py --db {args.db} --all")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
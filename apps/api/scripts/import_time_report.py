@@ -0,0 +1,123 @@
+"""
+Import-time report for the API entry point (what a cold start pays before lifespan runs).
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter (median of --runs), drops
+whatever a bare interpreter already imports (site hooks, encodings), then prints the total,
+the slowest top-level imports by cumulative time, and every first-party module. --check exits non-zero if the total exceeds the budget or if a module listed in
+LAZY_MODULES (only needed by specific endpoints) is imported eagerly; run it in CI as the
+import-time regression gate.
+
+Usage (from apps/api/):
+  python scripts/import_time_report.py
+  python scripts/import_time_report.py --check --budget-ms 900
+  python scripts/import_time_report.py --module api.index --top 40 --json bench_results/imports.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+API_DIR = Path(__file__).parent.parent
+
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 900))
+# Loaded inside the functions that need them (OSRM, geocoding, Gemini, raster build)
+LAZY_MODULES = ("httpx", "certifi", "numpy", "scipy", "pandas")
+FIRST_PARTY = ("main", "database", "schemas", "routers", "services", "api")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_once(module: Optional[str]) -> list[dict]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=API_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append({
+                "module": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulative_ms": int(m.group(2)) / 1000,
+                "depth": len(m.group(3)) // 2,
+            })
+    return rows
+
+
+def profile(module: str, runs: int) -> tuple[float, list[dict]]:
+    """Median total over runs; per-module rows come from the median run."""
+    baseline = {r["module"] for r in profile_once(None)}
+    samples = []
+    for _ in range(runs):
+        rows = [r for r in profile_once(module) if r["module"] not in baseline]
+        total = sum(r["cumulative_ms"] for r in rows if r["depth"] == 0)
+        samples.append((total, rows))
+    samples.sort(key=lambda s: s[0])
+    total = statistics.median(s[0] for s in samples)
+    return total, samples[len(samples) // 2][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report for the API entry point")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--check", action="store_true", help="exit 1 if over budget or a lazy module is eager")
+    parser.add_argument("--json", type=Path, default=None)
+    args = parser.parse_args()
+
+    total, rows = profile(args.module, args.runs)
+    loaded = {r["module"] for r in rows}
+
+    # Top-level imports as seen from the entry point (depth ≤ 2 keeps it readable)
+    print(f"import {args.module}: {total:.1f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)\n")
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for r in sorted((r for r in rows if r["depth"] <= 2), key=lambda r: -r["cumulative_ms"])[: args.top]:
+        print(f"{r['cumulative_ms']:>9.1f}ms {r['self_ms']:>7.1f}ms  {'  ' * r['depth']}{r['module']}")
+
+    print("\nFirst-party modules:")
+    for r in sorted(
+        (r for r in rows if r["module"].split(".")[0] in FIRST_PARTY), key=lambda r: -r["cumulative_ms"]
+    ):
+        print(f"{r['cumulative_ms']:>9.1f}ms {r['self_ms']:>7.1f}ms  {r['module']}")
+
+    eager = sorted(m for m in LAZY_MODULES if m in loaded)
+    if eager:
+        print(f"\nEagerly imported (should be lazy): {', '.join(eager)}")
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps({
+            "module": args.module,
+            "total_ms": round(total, 1),
+            "budget_ms": args.budget_ms,
+            "eager_lazy_modules": eager,
+            "modules": rows,
+        }, indent=2))
+        print(f"\nSaved to {args.json}")
+
+    if args.check:
+        failures = []
+        if total > args.budget_ms:
+            failures.append(f"import time {total:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        if eager:
+            failures.append(f"lazy modules imported at startup: {', '.join(eager)}")
+        if failures:
+            print("\nFAIL: " + "; ".join(failures))
+            sys.exit(1)
+        print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,43 @@
 Ingest food banks from boston_food_distributors.csv into MongoDB food_banks collection.
 Assigns need_weight from the nearest census tract's SNAP rate (greater_boston_snap_food_insecurity.csv).
 
+Free-text hours are compiled into weekly half-hour bitmasks (services/hours.py) so candidate
+selection can skip closed banks.
+
+Nearest-tract lookup is a KD-tree query over tract centroids projected to local km, and the
+distributors CSV is streamed in chunks, each written with one unordered bulk_write of upserts.
+The upserts are keyed by a unique (name, address) index. If an older database already holds
+duplicate pairs, the index is not created; the duplicates are listed so they can be merged by
+hand (donations reference food banks by _id, so they are not deleted here).
+
 Run once from apps/api (with .venv active and MongoDB running):
   python scripts/ingest_food_banks.py
+  python scripts/ingest_food_banks.py --dry-run                # parse + match only, timing report
+  python scripts/ingest_food_banks.py --distributors big.csv --snap tracts.csv --chunk-size 20000
 """
+import argparse
 import asyncio
 import csv
 import math
 import os
 import sys
+import time
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
+from typing import Iterator
 
+import numpy as np
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
 load_dotenv(Path(__file__).parent.parent / ".env")
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from services.hours import compile_hours
 
 MONGODB_URI = (
     os.environ.get("MONGODB_URI")
@@ -29,103 +51,220 @@ DATA_DIR = Path(__file__).parent.parent / "food_data"
 DISTRIBUTORS_CSV = DATA_DIR / "boston_food_distributors.csv"
 SNAP_CSV = DATA_DIR / "greater_boston_snap_food_insecurity.csv"
 
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG_EQUATOR = 111.320
+
+
+class TractIndex:
+    """Nearest SNAP tract centroid by planar distance in km (equirectangular around the data)."""
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, snap_rate: np.ndarray):
+        self.snap_rate = snap_rate
+        self.lng_scale = KM_PER_DEG_LNG_EQUATOR * math.cos(math.radians(float(np.mean(lat)))) if len(lat) else 1.0
+        self._points = self._project(lat, lng)
+        try:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self._points)
+        except ImportError:
+            print("  scipy not installed; using chunked brute-force nearest neighbour")
+            self._tree = None
+
+    def _project(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        return np.column_stack((lng * self.lng_scale, lat * KM_PER_DEG_LAT))
+
+    def nearest_rates(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """snap_rate of the nearest tract for each point; 1.0 when there are no tracts."""
+        if len(self.snap_rate) == 0:
+            return np.ones(len(lat))
+        query = self._project(lat, lng)
+        if self._tree is not None:
+            _, idx = self._tree.query(query, k=1)
+        else:
+            idx = np.empty(len(query), dtype=np.int64)
+            for start in range(0, len(query), 1024):
+                block = query[start:start + 1024]
+                d2 = ((block[:, None, :] - self._points[None, :, :]) ** 2).sum(axis=2)
+                idx[start:start + 1024] = d2.argmin(axis=1)
+        return self.snap_rate[idx]
 
-def load_snap_tracts() -> list[dict]:
-    tracts = []
-    with open(SNAP_CSV, newline="", encoding="utf-8") as f:
+
+def load_snap_tracts(path: Path = SNAP_CSV) -> TractIndex:
+    lat, lng, rate = [], [], []
+    with open(path, newline="", encoding="utf-8") as f:
         for row in csv.DictReader(f):
             try:
-                tracts.append({
-                    "lat": float(row["lat"]),
-                    "lng": float(row["lng"]),
-                    "snap_rate": float(row["snap_rate"]),
-                    "geoid": row["geoid"],
-                })
+                t_lat, t_lng, t_rate = float(row["lat"]), float(row["lng"]), float(row["snap_rate"])
             except (ValueError, KeyError):
                 continue
-    return tracts
-
+            lat.append(t_lat)
+            lng.append(t_lng)
+            rate.append(t_rate)
+    return TractIndex(np.array(lat), np.array(lng), np.array(rate))
 
-def nearest_snap_rate(lat: float, lng: float, tracts: list[dict]) -> float:
-    """Return snap_rate of the nearest tract centroid (Euclidean on lat/lng)."""
-    best_dist = float("inf")
-    best_rate = 1.0
-    for t in tracts:
-        d = math.hypot(lat - t["lat"], lng - t["lng"])
-        if d < best_dist:
-            best_dist = d
-            best_rate = t["snap_rate"]
-    return best_rate
 
-
-def load_food_banks(tracts: list[dict]) -> list[dict]:
-    banks = []
-    with open(DISTRIBUTORS_CSV, newline="", encoding="utf-8") as f:
+def iter_distributor_rows(path: Path = DISTRIBUTORS_CSV) -> Iterator[dict]:
+    """Stream rows that have a usable lat/lng."""
+    with open(path, newline="", encoding="utf-8") as f:
         for row in csv.DictReader(f):
-            lat_str = row.get("latitude", "").strip()
-            lng_str = row.get("longitude", "").strip()
+            lat_str = (row.get("latitude") or "").strip()
+            lng_str = (row.get("longitude") or "").strip()
             if not lat_str or not lng_str:
                 continue
             try:
-                lat = float(lat_str)
-                lng = float(lng_str)
+                row["_lat"] = float(lat_str)
+                row["_lng"] = float(lng_str)
             except ValueError:
                 continue
+            yield row
 
-            need_weight = nearest_snap_rate(lat, lng, tracts)
-
-            banks.append({
-                "name": row.get("name", "").strip(),
-                "category": row.get("category", "").strip(),
-                "address": row.get("full_address", row.get("street_address", "")).strip(),
-                "neighborhood": row.get("neighborhood", "").strip(),
-                "phone": row.get("phone", "").strip(),
-                "hours": row.get("hours", "").strip(),
-                "location": {
-                    "type": "Point",
-                    "coordinates": [lng, lat],
-                },
-                "need_weight": round(need_weight, 6),
-                "active": True,
-            })
-    return banks
 
+def iter_chunks(rows: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
 
-async def ingest():
-    print("Loading SNAP tract data...")
-    tracts = load_snap_tracts()
-    print(f"  {len(tracts)} tracts loaded.")
 
-    print("Loading food banks...")
-    banks = load_food_banks(tracts)
-    print(f"  {len(banks)} food banks with lat/lng.")
+def build_banks(rows: list[dict], tracts: TractIndex) -> list[dict]:
+    lat = np.fromiter((r["_lat"] for r in rows), dtype=float, count=len(rows))
+    lng = np.fromiter((r["_lng"] for r in rows), dtype=float, count=len(rows))
+    need_weights = np.round(tracts.nearest_rates(lat, lng), 6)
+    now = datetime.now(timezone.utc)
 
-    client = AsyncIOMotorClient(MONGODB_URI)
-    db = client[DB_NAME]
+    banks = []
+    for row, need_weight in zip(rows, need_weights.tolist()):
+        hours = (row.get("hours") or "").strip()
+        banks.append({
+            "name": (row.get("name") or "").strip(),
+            "category": (row.get("category") or "").strip(),
+            "address": (row.get("full_address") or row.get("street_address") or "").strip(),
+            "neighborhood": (row.get("neighborhood") or "").strip(),
+            "phone": (row.get("phone") or "").strip(),
+            "hours": hours,
+            **compile_hours(hours, now),
+            "location": {
+                "type": "Point",
+                "coordinates": [row["_lng"], row["_lat"]],
+            },
+            "need_weight": need_weight,
+            "active": True,
+        })
+    return banks
 
-    # Ensure indexes
-    await db.food_banks.create_index([("location", "2dsphere")])
-    await db.food_banks.create_index([("active", 1)])
-    await db.food_banks.create_index([("name", 1), ("address", 1)], unique=True)
 
-    inserted = 0
-    updated = 0
+def upsert_ops(banks: list[dict]) -> tuple[list[UpdateOne], int]:
+    """One upsert per (name, address); later rows win, as with sequential upserts. Returns (ops, skipped)."""
+    by_key: dict[tuple, dict] = {}
     skipped = 0
     for bank in banks:
         if not bank["name"]:
             skipped += 1
             continue
-        key = {"name": bank["name"], "address": bank["address"]}
-        result = await db.food_banks.update_one(key, {"$set": bank}, upsert=True)
-        if result.upserted_id:
-            inserted += 1
-        else:
-            updated += 1
+        by_key[(bank["name"], bank["address"])] = bank
+    ops = [
+        UpdateOne({"name": name, "address": address}, {"$set": bank}, upsert=True)
+        for (name, address), bank in by_key.items()
+    ]
+    return ops, skipped
+
+
+async def report_duplicates(db, limit: int = 20) -> None:
+    """Print (name, address) pairs held by more than one food bank."""
+    pipeline = [
+        {"$group": {"_id": {"name": "$name", "address": "$address"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$sort": {"n": -1}},
+    ]
+    dupes = await db.food_banks.aggregate(pipeline).to_list(length=None)
+    print(f"  Unique (name, address) index not created: {len(dupes)} pairs are duplicated. "
+          "Upserts still match by (name, address); merge these and re-run to add the index:")
+    for d in dupes[:limit]:
+        print(f"    {d['n']}x {d['_id'].get('name')!r} @ {d['_id'].get('address')!r}: {[str(i) for i in d['ids']]}")
+    if len(dupes) > limit:
+        print(f"    ... and {len(dupes) - limit} more")
+
+
+async def ingest(args):
+    timings: dict[str, float] = {}
+
+    def timed(phase: str, t0: float):
+        timings[phase] = timings.get(phase, 0.0) + (time.perf_counter() - t0)
+
+    t_total = time.perf_counter()
+    print("Loading SNAP tract data...")
+    t0 = time.perf_counter()
+    tracts = load_snap_tracts(args.snap)
+    timed("load_tracts", t0)
+    print(f"  {len(tracts.snap_rate)} tracts loaded.")
+
+    db = None
+    client = None
+    if not args.dry_run:
+        client = AsyncIOMotorClient(MONGODB_URI)
+        db = client[DB_NAME]
+        t0 = time.perf_counter()
+        await db.food_banks.create_index([("location", "2dsphere")])
+        await db.food_banks.create_index([("active", 1)])
+        await db.food_banks.create_index([("location", "2dsphere"), ("open_days", 1)])
+        try:
+            await db.food_banks.create_index([("name", 1), ("address", 1)], unique=True)
+        except DuplicateKeyError:
+            await report_duplicates(db)
+        timed("indexes", t0)
+
+    rows_seen = inserted = updated = skipped = 0
+    print(f"Streaming food banks from {args.distributors} (chunks of {args.chunk_size})...")
+    chunks = iter_chunks(iter_distributor_rows(args.distributors), args.chunk_size)
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        timed("parse_csv", t0)
+        if not chunk:
+            break
+        rows_seen += len(chunk)
+
+        t0 = time.perf_counter()
+        banks = build_banks(chunk, tracts)
+        timed("nearest_tract", t0)
+
+        t0 = time.perf_counter()
+        ops, chunk_skipped = upsert_ops(banks)
+        skipped += chunk_skipped
+        timed("build_ops", t0)
+
+        if db is not None and ops:
+            t0 = time.perf_counter()
+            result = await db.food_banks.bulk_write(ops, ordered=False)
+            inserted += result.upserted_count
+            updated += result.matched_count
+            timed("bulk_write", t0)
+
+    total = await db.food_banks.count_documents({}) if db is not None else None
+    if client is not None:
+        client.close()
+    timings["total"] = time.perf_counter() - t_total
+
+    print(f"  {rows_seen} food banks with lat/lng.")
+    if args.dry_run:
+        print(f"\nDry run: no writes. Skipped (no name): {skipped}")
+    else:
+        print(f"\nDone. Inserted: {inserted}  Updated: {updated}  Skipped: {skipped}")
+        print(f"Total food banks in DB: {total}")
+    print("\nTiming:")
+    for phase, seconds in timings.items():
+        print(f"  {phase:<14} {seconds * 1000:>10.1f} ms")
+
 
-    client.close()
-    print(f"\nDone. Inserted: {inserted}  Updated: {updated}  Skipped: {skipped}")
-    print(f"Total food banks in DB: {inserted + updated}")
+def main():
+    parser = argparse.ArgumentParser(description="Ingest food banks into MongoDB")
+    parser.add_argument("--distributors", type=Path, default=DISTRIBUTORS_CSV)
+    parser.add_argument("--snap", type=Path, default=SNAP_CSV)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--dry-run", action="store_true", help="parse and match only; print timing report")
+    args = parser.parse_args()
+    asyncio.run(ingest(args))
 
 
 if __name__ == "__main__":
-    asyncio.run(ingest())
+    main()
@@ -0,0 +1,298 @@
+"""
+HTTP load test for the marketplace hot paths.
+
+Seeds listings from the seed_demo_simulation.py RESTAURANTS set, then runs virtual users that
+pick a scenario per iteration from a weighted mix:
+
+  market     – map panning on GET /api/market with bounds and random filters
+  reserve    – reservation races on a few hot listings
+  scan       – pickup scans of reserved orders (some repeated, to hit the idempotent path)
+  dashboard  – business dashboard polling (listings + reserved orders)
+  create     – business listing creation with donate_percent
+
+Reports throughput, p50/p95/p99 and error rates per route, and writes them to JSON.
+409 on reserve (sold out) is an expected race outcome and is not counted as an error.
+
+Usage (from apps/api/):
+  python scripts/load_test.py --base-url http://127.0.0.1:8000 --users 50 --duration 60
+  python scripts/load_test.py --in-process --mix market=70,reserve=10,scan=5,dashboard=10,create=5
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(API_DIR / "scripts"))
+
+from seed_demo_simulation import RESTAURANTS, BUSINESS_CODE
+
+RESULTS_DIR = API_DIR / "bench_results"
+DEFAULT_MIX = "market=60,reserve=15,scan=5,dashboard=15,create=5"
+
+# Viewport size for panning (roughly a phone-sized map at city zoom)
+VIEW_LAT_SPAN = 0.03
+VIEW_LNG_SPAN = 0.04
+CATEGORIES = sorted({r["category"] for r in RESTAURANTS})
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.conflicts: dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, elapsed: float, status: int):
+        self.latencies[route].append(elapsed)
+        if status == 409:
+            self.conflicts[route] += 1
+        elif status >= 400:
+            self.errors[route] += 1
+
+    def report(self, wall: float) -> list[dict]:
+        rows = []
+        for route, lat in sorted(self.latencies.items()):
+            rows.append({
+                "route": route,
+                "requests": len(lat),
+                "rps": round(len(lat) / wall, 1),
+                "p50_ms": round(percentile(lat, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(lat, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(lat, 0.99) * 1000, 1),
+                "error_rate": round(self.errors[route] / len(lat), 4),
+                "conflicts": self.conflicts[route],
+            })
+        return rows
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rec = Recorder()
+        self.business_id = ""
+        self.listing_ids: list[str] = []
+        self.hot_ids: list[str] = []
+        self.qr_tokens: list[str] = []
+        self.created_ids: list[str] = []
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        t0 = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, **kwargs)
+            status = resp.status_code
+        except httpx.HTTPError:
+            resp, status = None, 599
+        self.rec.record(route, time.perf_counter() - t0, status)
+        return resp
+
+    # --- setup / teardown ---
+
+    async def setup(self):
+        r = await self.client.get("/api/business/lookup", params={"business_code": BUSINESS_CODE})
+        r.raise_for_status()
+        self.business_id = r.json()["business_id"]
+        now = datetime.now(timezone.utc)
+        start, end = now.isoformat(), (now + timedelta(hours=2)).isoformat()
+        for i, rest in enumerate(RESTAURANTS):
+            hot = i < self.args.hot_listings
+            r = await self.client.post(
+                "/api/business/listings",
+                json=self._listing_body(rest, start, end, qty=self.args.hot_qty if hot else rest["qty"]),
+                headers={"X-Business-Id": self.business_id},
+            )
+            r.raise_for_status()
+            listing_id = r.json()["listing"]["id"]
+            self.listing_ids.append(listing_id)
+            self.created_ids.append(listing_id)
+            if hot:
+                self.hot_ids.append(listing_id)
+        print(f"Seeded {len(self.listing_ids)} listings ({len(self.hot_ids)} hot) for business {self.business_id}")
+
+    async def teardown(self):
+        for listing_id in self.created_ids:
+            await self.client.delete(
+                f"/api/business/listings/{listing_id}",
+                headers={"X-Business-Id": self.business_id},
+            )
+        print(f"Deleted {len(self.created_ids)} load-test listings")
+
+    @staticmethod
+    def _listing_body(rest: dict, start: str, end: str, qty: int, donate_percent=None) -> dict:
+        body = {
+            "business_name": rest["name"],
+            "title": f"{rest['name']} Load Test Bag",
+            "price_cents": rest["price_cents"],
+            "qty_available": qty,
+            "address": rest["address"],
+            "category": rest["category"],
+            "pickup_start": start,
+            "pickup_end": end,
+            "location": {"type": "Point", "coordinates": [rest["lng"], rest["lat"]]},
+        }
+        if donate_percent is not None:
+            body["donate_percent"] = donate_percent
+        return body
+
+    # --- scenarios ---
+
+    async def market(self):
+        rest = self.rng.choice(RESTAURANTS)
+        lat = rest["lat"] + self.rng.uniform(-0.01, 0.01)
+        lng = rest["lng"] + self.rng.uniform(-0.01, 0.01)
+        params = {
+            "sw_lat": lat - VIEW_LAT_SPAN / 2,
+            "sw_lng": lng - VIEW_LNG_SPAN / 2,
+            "ne_lat": lat + VIEW_LAT_SPAN / 2,
+            "ne_lng": lng + VIEW_LNG_SPAN / 2,
+        }
+        if self.rng.random() < 0.3:
+            params["open_now"] = "true"
+        if self.rng.random() < 0.3:
+            params["max_price_cents"] = self.rng.choice([300, 500, 800])
+        if self.rng.random() < 0.2:
+            params["category"] = self.rng.choice(CATEGORIES)
+        await self.call("GET /api/market", "GET", "/api/market", params=params)
+
+    async def reserve(self):
+        listing_id = self.rng.choice(self.hot_ids or self.listing_ids)
+        r = await self.call(
+            "POST /api/listings/{id}/reserve", "POST", f"/api/listings/{listing_id}/reserve",
+            json={"user_name": f"loadtest-{self.rng.randint(1, 500)}"},
+        )
+        if r is not None and r.status_code == 200:
+            self.qr_tokens.append(r.json()["qr_token"])
+
+    async def scan(self):
+        if not self.qr_tokens:
+            return await self.reserve()
+        # Re-scan ~20% of the time to exercise the already_picked_up path
+        if self.rng.random() < 0.2:
+            token = self.rng.choice(self.qr_tokens)
+        else:
+            token = self.qr_tokens.pop(self.rng.randrange(len(self.qr_tokens)))
+        await self.call("POST /api/pickup/scan", "POST", "/api/pickup/scan", json={"qr_token": token})
+
+    async def dashboard(self):
+        headers = {"X-Business-Id": self.business_id}
+        await self.call("GET /api/business/listings", "GET", "/api/business/listings", headers=headers)
+        await self.call(
+            "GET /api/business/orders", "GET", "/api/business/orders",
+            params={"status": "reserved"}, headers=headers,
+        )
+
+    async def create(self):
+        rest = self.rng.choice(RESTAURANTS)
+        now = datetime.now(timezone.utc)
+        body = self._listing_body(
+            rest, now.isoformat(), (now + timedelta(hours=2)).isoformat(),
+            qty=rest["qty"], donate_percent=self.rng.choice([0.2, 0.3, 0.5]),
+        )
+        r = await self.call(
+            "POST /api/business/listings", "POST", "/api/business/listings",
+            json=body, headers={"X-Business-Id": self.business_id},
+        )
+        if r is not None and r.status_code == 200:
+            self.created_ids.append(r.json()["listing"]["id"])
+
+    # --- driver ---
+
+    async def user(self, stop_at: float, mix: dict[str, float]):
+        names = list(mix)
+        weights = [mix[n] for n in names]
+        while time.perf_counter() < stop_at:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_ms) / 1000)
+
+    async def run(self) -> dict:
+        mix = parse_mix(self.args.mix)
+        unknown = set(mix) - {"market", "reserve", "scan", "dashboard", "create"}
+        if unknown:
+            raise SystemExit(f"Unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+        await self.setup()
+        try:
+            print(f"Running {self.args.users} users for {self.args.duration}s, mix={self.args.mix}")
+            t0 = time.perf_counter()
+            stop_at = t0 + self.args.duration
+            await asyncio.gather(*(self.user(stop_at, mix) for _ in range(self.args.users)))
+            wall = time.perf_counter() - t0
+        finally:
+            if not self.args.keep:
+                await self.teardown()
+        rows = self.rec.report(wall)
+        total = sum(r["requests"] for r in rows)
+        print(f"\n{'route':<34}{'req':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>8}{'409':>7}")
+        for r in rows:
+            print(
+                f"{r['route']:<34}{r['requests']:>8}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+                f"{r['p99_ms']:>9}{r['error_rate'] * 100:>7.2f}%{r['conflicts']:>7}"
+            )
+        print(f"\nTotal: {total} requests in {wall:.1f}s ({total / wall:.1f} req/s)")
+        return {"wall_s": round(wall, 2), "total_requests": total, "routes": rows}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Marketplace HTTP load test")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true", help="drive main.app via ASGI transport")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--hot-listings", type=int, default=3)
+    parser.add_argument("--hot-qty", type=int, default=500)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep seeded listings afterwards")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.in_process:
+        from main import app, lifespan
+
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30) as client:
+                result = await LoadTest(client, args).run()
+    else:
+        limits = httpx.Limits(max_connections=args.users * 2)
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+            result = await LoadTest(client, args).run()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out = args.out or RESULTS_DIR / f"load_test-{stamp}.json"
+    out.write_text(json.dumps({
+        "benchmark": "load_test",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        **result,
+    }, indent=2))
+    print(f"Saved to {out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
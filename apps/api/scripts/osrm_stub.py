@@ -0,0 +1,152 @@
+"""
+Local OSRM-compatible stand-in for benchmarks and offline development.
+
+Serves the /table/v1 and /route/v1 response shapes used by services/osrm_service.py with
+deterministic synthetic durations (haversine distance, a per-pair circuity factor and a
+fixed speed), plus configurable latency and failure injection.
+
+Usage (from apps/api/):
+  python scripts/osrm_stub.py --port 5002 --latency-ms 20 --failure-rate 0.05
+  OSRM_BASE_URL=http://127.0.0.1:5002 uvicorn main:app --port 8000
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import zlib
+from typing import Optional
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+EARTH_RADIUS_KM = 6371.0088
+
+STUB_SECONDS_PER_KM = float(os.environ.get("OSRM_STUB_SECONDS_PER_KM", 90))
+STUB_INTERCEPT_S = float(os.environ.get("OSRM_STUB_INTERCEPT_S", 45))
+STUB_LATENCY_MS = float(os.environ.get("OSRM_STUB_LATENCY_MS", 0))
+STUB_JITTER_MS = float(os.environ.get("OSRM_STUB_JITTER_MS", 0))
+STUB_FAILURE_RATE = float(os.environ.get("OSRM_STUB_FAILURE_RATE", 0))
+# How failures look: "error" → HTTP 503, "timeout" → hang past the client timeout
+STUB_FAILURE_MODE = os.environ.get("OSRM_STUB_FAILURE_MODE", "error")
+STUB_SEED = int(os.environ.get("OSRM_STUB_SEED", 0))
+
+app = FastAPI(title="OSRM stub")
+_rng = random.Random(STUB_SEED)
+stats = {"table": 0, "route": 0, "failed": 0}
+
+
+def _parse_coords(coords: str) -> list[tuple[float, float]]:
+    out = []
+    for pair in coords.split(";"):
+        lng, lat = pair.split(",")
+        out.append((float(lng), float(lat)))
+    return out
+
+
+def _parse_indices(value: Optional[str], n: int) -> list[int]:
+    if value is None or value == "all":
+        return list(range(n))
+    return [int(i) for i in value.split(";")]
+
+
+def _haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    p1 = math.radians(a[1])
+    p2 = math.radians(b[1])
+    dl = math.radians(b[0] - a[0])
+    h = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def synthetic_duration(a: tuple[float, float], b: tuple[float, float]) -> float:
+    """Same inputs always give the same duration; circuity varies 1.2–1.6 per pair."""
+    if a == b:
+        return 0.0
+    key = f"{a[0]:.5f},{a[1]:.5f};{b[0]:.5f},{b[1]:.5f}".encode()
+    circuity = 1.2 + 0.4 * (zlib.crc32(key) / 0xFFFFFFFF)
+    return round(STUB_INTERCEPT_S + _haversine_km(a, b) * circuity * STUB_SECONDS_PER_KM, 1)
+
+
+async def _inject() -> Optional[JSONResponse]:
+    """Simulated latency and failures. Returns an error response when this call should fail."""
+    delay_ms = STUB_LATENCY_MS + (_rng.uniform(-STUB_JITTER_MS, STUB_JITTER_MS) if STUB_JITTER_MS else 0)
+    if delay_ms > 0:
+        await asyncio.sleep(delay_ms / 1000)
+    if STUB_FAILURE_RATE and _rng.random() < STUB_FAILURE_RATE:
+        stats["failed"] += 1
+        if STUB_FAILURE_MODE == "timeout":
+            await asyncio.sleep(60)
+        return JSONResponse({"code": "InvalidQuery", "message": "injected failure"}, status_code=503)
+    return None
+
+
+@app.get("/table/v1/{profile}/{coords:path}")
+async def table(
+    profile: str,
+    coords: str,
+    sources: Optional[str] = Query(None),
+    destinations: Optional[str] = Query(None),
+    annotations: str = Query("duration"),
+):
+    stats["table"] += 1
+    failure = await _inject()
+    if failure:
+        return failure
+    points = _parse_coords(coords)
+    src = _parse_indices(sources, len(points))
+    dst = _parse_indices(destinations, len(points))
+    return {
+        "code": "Ok",
+        "durations": [[synthetic_duration(points[i], points[j]) for j in dst] for i in src],
+        "sources": [{"location": list(points[i])} for i in src],
+        "destinations": [{"location": list(points[j])} for j in dst],
+    }
+
+
+@app.get("/route/v1/{profile}/{coords:path}")
+async def route(profile: str, coords: str, overview: str = Query("false")):
+    stats["route"] += 1
+    failure = await _inject()
+    if failure:
+        return failure
+    points = _parse_coords(coords)
+    duration = sum(synthetic_duration(a, b) for a, b in zip(points, points[1:]))
+    distance = sum(_haversine_km(a, b) for a, b in zip(points, points[1:])) * 1000
+    return {
+        "code": "Ok",
+        "routes": [{"duration": duration, "distance": round(distance, 1), "legs": []}],
+        "waypoints": [{"location": list(p)} for p in points],
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    global STUB_LATENCY_MS, STUB_JITTER_MS, STUB_FAILURE_RATE, STUB_FAILURE_MODE, _rng
+
+    parser = argparse.ArgumentParser(description="Local OSRM stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--latency-ms", type=float, default=STUB_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=STUB_JITTER_MS)
+    parser.add_argument("--failure-rate", type=float, default=STUB_FAILURE_RATE)
+    parser.add_argument("--failure-mode", choices=["error", "timeout"], default=STUB_FAILURE_MODE)
+    parser.add_argument("--seed", type=int, default=STUB_SEED)
+    args = parser.parse_args()
+
+    STUB_LATENCY_MS = args.latency_ms
+    STUB_JITTER_MS = args.jitter_ms
+    STUB_FAILURE_RATE = args.failure_rate
+    STUB_FAILURE_MODE = args.failure_mode
+    _rng = random.Random(args.seed)
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
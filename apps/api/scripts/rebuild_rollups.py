@@ -0,0 +1,64 @@
+"""
+Recompute the daily impact rollups (services/rollups.py) from donations, orders and their archives.
+
+The API keeps rollups current incrementally. Run this to backfill them after upgrading, after
+gen_scale_dataset.py, or to repair days after a logged rollup write failure. Days before --since
+are left untouched. Without --since, the rebuild starts from the watermark stored in meta.rollups
+minus --overlap-days (everything on the first run).
+
+Usage (from apps/api/, MongoDB running):
+  python scripts/rebuild_rollups.py
+  python scripts/rebuild_rollups.py --since 2026-01-01
+  python scripts/rebuild_rollups.py --db replate_scale --all
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+API_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(API_DIR))
+load_dotenv(API_DIR / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.rollups import rebuild
+
+MONGODB_URI = (
+    os.environ.get("MONGODB_URI")
+    or os.environ.get("MONGO_URI")
+    or "mongodb://localhost:27017"
+)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily impact rollups")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "replate"))
+    parser.add_argument("--since", default=None, help="first day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--overlap-days", type=int, default=2, help="days before the watermark to redo")
+    parser.add_argument("--all", action="store_true", help="ignore the watermark and rebuild everything")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    try:
+        db = client[args.db]
+        since = args.since
+        if since is None and not args.all:
+            mark = await db.meta.find_one({"_id": "rollups"})
+            if mark and mark.get("rebuilt_at"):
+                since = (date.fromisoformat(mark["rebuilt_at"][:10]) - timedelta(days=args.overlap_days)).isoformat()
+        since = since or "0000-00-00"
+        t0 = time.perf_counter()
+        written = await rebuild(db, since)
+    finally:
+        client.close()
+    print(f"Rebuilt rollups from {since}: {written} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
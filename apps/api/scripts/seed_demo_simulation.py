@@ -1,7 +1,7 @@
 """
 Demo simulation seed script.
-Creates Boston-area restaurant listings with pre-known lat/lng (no geocoding),
-then runs the donation allocation algorithm on each one. All listings have 50+ qty.
+Creates Boston-area restaurant listings with pre-known lat/lng (no geocoding) and their
+donation plans in one POST /api/business/listings/bulk request. All listings have 50+ qty.
 
 Usage (from apps/api/):
   python scripts/seed_demo_simulation.py seed    # create listings + compute plans
@@ -95,16 +95,14 @@ def pickup_window() -> tuple[str, str]:
 
 async def seed():
     pickup_start, pickup_end = pickup_window()
-    created_ids: list[str] = []
-    failed_plans: list[str] = []
 
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    async with httpx.AsyncClient(timeout=120.0) as client:
         business_id = await get_business_id(client)
         print(f"Business ID: {business_id}")
-        print(f"Creating {len(RESTAURANTS)} restaurant listings...")
+        print(f"Creating {len(RESTAURANTS)} restaurant listings with donation plans (one bulk request)...")
 
-        for i, r in enumerate(RESTAURANTS, 1):
-            body = {
+        listings = [
+            {
                 "business_name": r["name"],
                 "title": f"{r['name']} Surplus Bag",
                 "price_cents": r["price_cents"],
@@ -113,47 +111,43 @@ async def seed():
                 "category": r["category"],
                 "pickup_start": pickup_start,
                 "pickup_end": pickup_end,
+                "donate_percent": DONATE_PERCENT,
                 # Pass location directly — no geocoding needed
                 "location": {
                     "type": "Point",
                     "coordinates": [r["lng"], r["lat"]],
                 },
             }
-            resp = await client.post(
-                f"{BASE_URL}/api/business/listings",
-                json=body,
-                headers={"X-Business-Id": business_id},
-            )
-            if resp.status_code not in (200, 201):
-                print(f"  [{i}/{len(RESTAURANTS)}] SKIP {r['name']}: {resp.status_code} {resp.text[:80]}")
-                continue
+            for r in RESTAURANTS
+        ]
+        resp = await client.post(
+            f"{BASE_URL}/api/business/listings/bulk",
+            json={"listings": listings},
+            headers={"X-Business-Id": business_id},
+        )
+        resp.raise_for_status()
+        data = resp.json()
 
-            listing_id = resp.json()["listing"]["id"]
-            created_ids.append(listing_id)
-            print(f"  [{i}/{len(RESTAURANTS)}] Created {r['name']} → {listing_id}")
-
-        print(f"\nRunning donation plans on {len(created_ids)} listings...")
-
-        for i, listing_id in enumerate(created_ids, 1):
-            plan_resp = await client.post(
-                f"{BASE_URL}/api/listings/{listing_id}/donation/plan",
-                json={"donate_percent": DONATE_PERCENT},
-            )
-            if plan_resp.status_code == 200:
-                data = plan_resp.json()
-                allocs = data.get("allocations", [])
-                names = ", ".join(a["name"] for a in allocs)
-                print(f"  [{i}/{len(created_ids)}] Plan OK → {names or 'no allocs'}")
-            else:
-                failed_plans.append(listing_id)
-                print(f"  [{i}/{len(created_ids)}] Plan FAILED {listing_id}: {plan_resp.status_code} {plan_resp.text[:80]}")
+    created_ids: list[str] = []
+    failed: list[str] = []
+    for result in data["results"]:
+        r = RESTAURANTS[result["index"]]
+        i = result["index"] + 1
+        if not result["ok"]:
+            failed.append(r["name"])
+            print(f"  [{i}/{len(RESTAURANTS)}] FAILED {r['name']}: {result['status_code']} {(result['error'] or '')[:80]}")
+            continue
+        listing_id = result["listing"]["id"]
+        created_ids.append(listing_id)
+        names = ", ".join(a["name"] for a in result["allocations"])
+        print(f"  [{i}/{len(RESTAURANTS)}] {r['name']} → {listing_id}  plan: {names or 'no allocs'}")
 
     IDS_FILE.write_text(json.dumps(created_ids, indent=2))
-    print(f"\nDone. {len(created_ids)} listings created, {len(failed_plans)} plans failed.")
+    print(f"\nDone. {len(created_ids)} listings created with plans, {len(failed)} failed.")
     print(f"IDs saved to {IDS_FILE.name}")
     print(f"Open http://localhost:3000/demo to see the simulation.")
-    if failed_plans:
-        print(f"No-plan listings (food banks not ingested yet?): {failed_plans}")
+    if failed:
+        print(f"Failed (food banks not ingested yet?): {failed}")
 
 
 async def clean():
@@ -149,26 +149,31 @@ async def get_business_id(client: httpx.AsyncClient) -> str:
 
 
 async def seed():
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    async with httpx.AsyncClient(timeout=120.0) as client:
         print(f"Looking up business code '{BUSINESS_CODE}'...")
         business_id = await get_business_id(client)
         print(f"  business_id = {business_id}")
 
+        print(f"  Creating {len(TEST_LISTINGS)} listings (one bulk request, addresses geocoded server-side)...")
+        r = await client.post(
+            f"{BASE_URL}/api/business/listings/bulk",
+            json={"listings": TEST_LISTINGS},
+            headers={"X-Business-Id": business_id},
+        )
+        if r.status_code != 200:
+            print(f"    -> FAILED ({r.status_code}): {r.text}")
+            sys.exit(1)
+
         created_ids = []
-        for listing in TEST_LISTINGS:
-            print(f"  Creating: {listing['title']} @ {listing['address']}")
-            r = await client.post(
-                f"{BASE_URL}/api/business/listings",
-                json=listing,
-                headers={"X-Business-Id": business_id},
-            )
-            if r.status_code in (200, 201):
-                data = r.json()
+        for result in r.json()["results"]:
+            listing = TEST_LISTINGS[result["index"]]
+            if result["ok"]:
+                data = result["listing"]
                 created_ids.append(data["id"])
                 geocoded = data.get("location") is not None
-                print(f"    -> id={data['id']}  geocoded={geocoded}")
+                print(f"    {listing['title']} -> id={data['id']}  geocoded={geocoded}")
             else:
-                print(f"    -> FAILED ({r.status_code}): {r.text}")
+                print(f"    {listing['title']} -> FAILED ({result['status_code']}): {result['error']}")
 
         IDS_FILE.write_text(json.dumps({"business_id": business_id, "ids": created_ids}, indent=2))
         print(f"\nCreated {len(created_ids)} listings. IDs saved to {IDS_FILE.name}")
@@ -0,0 +1,197 @@
+"""
+Hot/cold tiering: finished documents move from listings, orders and donations into
+listings_archive, orders_archive and donations_archive, so hot queries only see live data.
+
+- Listings move once pickup_end is ARCHIVE_LISTINGS_AFTER_H hours old. A listing is held back while
+  it still has reserved orders or a donation_plan job is queued. Its donations move along with it.
+- Orders move once they are settled (picked_up, canceled, no_show) and created_at is
+  ARCHIVE_ORDERS_AFTER_D days old.
+
+A move is done per batch. One upserting bulk_write copies the docs to the archive (with
+archived_at), then one delete_many removes them from the hot collection. The delete re-applies the
+selection filter, so a doc that changed in between stays hot and its archive copy is dropped.
+Re-running after a crash is safe.
+
+Reads that need history pass include_archived (find_with_archive merges both tiers).
+archiver.start(db) runs archive_once every ARCHIVE_INTERVAL_S. scripts/archive_cold_data.py runs
+the same sweep from a shell or cron.
+
+Env vars:
+  ARCHIVE_ENABLED          – run the in-process scheduler, default: 1
+  ARCHIVE_INTERVAL_S       – seconds between sweeps, default: 3600
+  ARCHIVE_LISTINGS_AFTER_H – hours after pickup_end, default: 24
+  ARCHIVE_ORDERS_AFTER_D   – days after an order was created, default: 30
+  ARCHIVE_BATCH            – docs per bulk move, default: 1000
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReplaceOne
+
+from services.market_cache import invalidate as invalidate_market
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED = os.environ.get("ARCHIVE_ENABLED", "1") not in ("0", "false", "False")
+ARCHIVE_INTERVAL_S = float(os.environ.get("ARCHIVE_INTERVAL_S", 3600))
+ARCHIVE_LISTINGS_AFTER_H = float(os.environ.get("ARCHIVE_LISTINGS_AFTER_H", 24))
+ARCHIVE_ORDERS_AFTER_D = float(os.environ.get("ARCHIVE_ORDERS_AFTER_D", 30))
+ARCHIVE_BATCH = int(os.environ.get("ARCHIVE_BATCH", 1000))
+
+SETTLED_ORDER_STATUSES = ("picked_up", "canceled", "no_show")
+
+
+def archive_name(collection: str) -> str:
+    return f"{collection}_archive"
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def listing_filter(now: datetime) -> dict:
+    """Listings whose pickup window closed ARCHIVE_LISTINGS_AFTER_H ago (reserved orders aside)."""
+    return {
+        "pickup_end": {"$lt": _iso(now - timedelta(hours=ARCHIVE_LISTINGS_AFTER_H))},
+        "status": {"$ne": "geocoding"},
+        "donation_mode": {"$ne": "queued"},
+    }
+
+
+def order_filter(now: datetime) -> dict:
+    return {
+        "status": {"$in": list(SETTLED_ORDER_STATUSES)},
+        "created_at": {"$lt": _iso(now - timedelta(days=ARCHIVE_ORDERS_AFTER_D))},
+    }
+
+
+async def move_docs(db, collection: str, docs: list[dict], guard: dict) -> list:
+    """Copy docs to the archive and delete them from the hot collection. Returns the moved _ids."""
+    if not docs:
+        return []
+    hot, cold = db[collection], db[archive_name(collection)]
+    archived_at = _iso(datetime.now(timezone.utc))
+    await cold.bulk_write(
+        [ReplaceOne({"_id": d["_id"]}, {**d, "archived_at": archived_at}, upsert=True) for d in docs],
+        ordered=False,
+    )
+    ids = [d["_id"] for d in docs]
+    deleted = await hot.delete_many({"_id": {"$in": ids}, **guard})
+    if deleted.deleted_count == len(ids):
+        return ids
+    # Some changed between read and delete: the hot copy stays authoritative
+    still_hot = set(await hot.distinct("_id", {"_id": {"$in": ids}}))
+    await cold.delete_many({"_id": {"$in": list(still_hot)}})
+    return [i for i in ids if i not in still_hot]
+
+
+async def archive_listings(db, now: datetime, batch_size: int = ARCHIVE_BATCH) -> dict:
+    guard = listing_filter(now)
+    held: list = []
+    moved = donations = 0
+    while True:
+        query = {**guard, "_id": {"$nin": held}} if held else guard
+        docs = await db.listings.find(query).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        # One query per batch for listings that still have buyers on the way
+        busy = set(await db.orders.distinct(
+            "listing_id", {"listing_id": {"$in": [str(d["_id"]) for d in docs]}, "status": "reserved"},
+        ))
+        ready = [d for d in docs if str(d["_id"]) not in busy]
+        held.extend(d["_id"] for d in docs if str(d["_id"]) in busy)
+        ids = await move_docs(db, "listings", ready, guard)
+        moved += len(ids)
+        if ids:
+            str_ids = [str(i) for i in ids]
+            linked = await db.donations.find({"listing_id": {"$in": str_ids}}).to_list(length=None)
+            donations += len(await move_docs(db, "donations", linked, {"listing_id": {"$in": str_ids}}))
+            locations = {d["_id"]: d.get("location") for d in ready}
+            for i in ids:
+                invalidate_market(i, locations.get(i))
+    return {"listings": moved, "donations": donations, "held": len(held)}
+
+
+async def archive_orders(db, now: datetime, batch_size: int = ARCHIVE_BATCH) -> int:
+    guard = order_filter(now)
+    moved = 0
+    while True:
+        docs = await db.orders.find(guard).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        moved += len(await move_docs(db, "orders", docs, guard))
+    return moved
+
+
+async def archive_once(db, batch_size: int = ARCHIVE_BATCH, dry_run: bool = False) -> dict:
+    """One sweep over all tiers. dry_run only counts what would move (reserved-order holds aside)."""
+    now = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    if dry_run:
+        result = {
+            "listings": await db.listings.count_documents(listing_filter(now)),
+            "orders": await db.orders.count_documents(order_filter(now)),
+        }
+    else:
+        result = {**await archive_listings(db, now, batch_size), "orders": await archive_orders(db, now, batch_size)}
+    result["seconds"] = round(time.perf_counter() - t0, 2)
+    return result
+
+
+async def find_with_archive(
+    db, collection: str, filter: dict, sort: Optional[tuple[str, int]] = None, include_archived: bool = False,
+) -> list[dict]:
+    """Docs matching filter from the hot collection, plus the archive when include_archived."""
+    tiers = [db[collection]] + ([db[archive_name(collection)]] if include_archived else [])
+    out: list[dict] = []
+    for coll in tiers:
+        cursor = coll.find(filter)
+        if sort:
+            cursor = cursor.sort(*sort)
+        out.extend(await cursor.to_list(length=None))
+    if sort and include_archived:
+        key, direction = sort
+        out.sort(key=lambda d: d.get(key) or "", reverse=direction < 0)
+    return out
+
+
+async def find_one_with_archive(db, collection: str, filter: dict, include_archived: bool = False) -> Optional[dict]:
+    doc = await db[collection].find_one(filter)
+    if doc is None and include_archived:
+        doc = await db[archive_name(collection)].find_one(filter)
+    return doc
+
+
+class Archiver:
+    """Runs archive_once on an interval in this process; concurrent sweeps from other processes are harmless."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    def start(self, db, interval_s: float = ARCHIVE_INTERVAL_S) -> None:
+        if self._task is None and ARCHIVE_ENABLED:
+            self._task = asyncio.create_task(self._run(db, interval_s))
+
+    async def _run(self, db, interval_s: float) -> None:
+        while True:
+            try:
+                self.last_run = await archive_once(db)
+                if self.last_run.get("listings") or self.last_run.get("orders"):
+                    logger.info("Archived %s", self.last_run)
+            except Exception:
+                logger.exception("Archive sweep failed")
+            await asyncio.sleep(interval_s)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+archiver = Archiver()
@@ -0,0 +1,208 @@
+"""
+Plan and persist a donation for one listing: pick_candidates → score → allocate, then write the
+donation records and the listing's donation fields. Shared by the plan endpoints and by the
+background "donation_plan" job (services/jobs.py), which listing creation and geocoding
+completion enqueue instead of planning inline.
+
+donation_mode: "queued" while a job is waiting to plan; "pending" for a plan computed by
+trigger-expiring that awaits confirmation; then "planned", "failed", "assigned" or "voided".
+"""
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from services import jobs
+from services.market_cache import invalidate as invalidate_market
+from services.rollups import record_donations
+from services.donation_routing_service import (
+    OSRM_MAX_MINUTES,
+    OSRM_TOP_K,
+    allocate_units,
+    pick_candidates,
+    request_deadline,
+    score_candidates,
+)
+
+
+class PlanningError(Exception):
+    """Planning failed; status_code/detail map directly onto an HTTPException."""
+
+    def __init__(self, status_code: int, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def plan_listing(
+    db,
+    listing: dict,
+    donate_percent: float,
+    top_k: int = OSRM_TOP_K,
+    max_minutes: float = OSRM_MAX_MINUTES,
+    deadline: Optional[float] = None,
+    donation_mode: str = "planned",
+    job_id=None,
+) -> dict:
+    """
+    Allocate floor(qty_available * donate_percent) units to nearby food banks and persist.
+    Returns {donation_qty, remaining_public_qty, routing_used, allocations, update}.
+    Raises PlanningError when there is nothing to plan or no bank can take the units, and 409 when
+    the listing changed while planning (reservations took the units, it was closed, or another path
+    planned it); the donation records written for this attempt are removed again.
+    job_id tags the donation records and the listing so a retried job can tell what it already wrote.
+    """
+    location = listing.get("location")
+    if not location or location.get("type") != "Point":
+        raise PlanningError(422, "Listing has no valid location")
+
+    qty_available = listing.get("qty_available", 0)
+    donation_qty = math.floor(qty_available * donate_percent)
+    if donation_qty < 1:
+        raise PlanningError(422, "donation_qty rounds to 0; nothing to donate")
+
+    candidates, routing_used = await pick_candidates(
+        location, db, top_k=top_k, max_minutes=max_minutes,
+        deadline=deadline if deadline is not None else request_deadline(),
+    )
+    if not candidates and routing_used:
+        raise PlanningError(503, {
+            "error": "routing_unavailable",
+            "message": "No reachable food banks found within the time constraint",
+            "fallback": "use /map view",
+        })
+    if not candidates:
+        raise PlanningError(404, "No active food banks found near this listing")
+
+    allocations = allocate_units(donation_qty, score_candidates(candidates))
+    if not allocations:
+        raise PlanningError(422, "Could not allocate units to any food bank")
+
+    now = datetime.now(timezone.utc).isoformat()
+    listing_id = str(listing["_id"])
+    donations = [
+        {
+            "listing_id": listing_id,
+            "business_id": listing.get("business_id"),
+            "food_bank_id": a["food_bank_id"],
+            "neighborhood": a.get("neighborhood"),
+            "qty": a["qty"],
+            "status": "planned",
+            "created_at": now,
+            **({"job_id": job_id} if job_id is not None else {}),
+        }
+        for a in allocations
+    ]
+    await db.donations.insert_many(donations)
+
+    update = {
+        "donation_mode": donation_mode,
+        "donation_plan": allocations,
+        "donate_percent": donate_percent,
+    }
+    if job_id is not None:
+        update["donation_job_id"] = job_id
+    # $inc against the live count, guarded on the state the plan was computed from: reserves that
+    # landed meanwhile are kept, and a listing closed/voided or planned elsewhere is not overwritten
+    updated = await db.listings.find_one_and_update(
+        {
+            "_id": listing["_id"],
+            "status": {"$in": ["open", "sold_out"]},
+            "donation_mode": listing.get("donation_mode"),
+            "qty_available": {"$gte": donation_qty},
+        },
+        {"$inc": {"qty_available": -donation_qty}, "$set": update, "$unset": {"donation_error": ""}},
+        projection={"qty_available": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated is None:
+        await db.donations.delete_many({"_id": {"$in": [d["_id"] for d in donations]}})
+        raise PlanningError(409, "Listing changed while planning (reserved, closed or already planned); try again")
+    remaining = updated["qty_available"]
+    if remaining <= 0:
+        await db.listings.update_one(
+            {"_id": listing["_id"], "qty_available": {"$lte": 0}, "status": "open"},
+            {"$set": {"status": "sold_out"}},
+        )
+    invalidate_market(listing["_id"], location)
+    # Only once the plan is committed: a retried job deletes the stray donations of a failed attempt
+    await record_donations(db, donations)
+
+    return {
+        "donation_qty": donation_qty,
+        "remaining_public_qty": remaining,
+        "routing_used": routing_used,
+        "allocations": allocations,
+        "update": update,
+    }
+
+
+DONATION_PLAN_JOB = "donation_plan"
+
+
+async def enqueue_plan(db, listing_id, donate_percent: float, top_k: Optional[int] = None,
+                       max_minutes: Optional[float] = None) -> dict:
+    """Queue a plan for a listing already in donation_mode "queued"; deduped per listing."""
+    payload = {"donate_percent": donate_percent, "top_k": top_k, "max_minutes": max_minutes}
+    return await jobs.enqueue(db, DONATION_PLAN_JOB, str(listing_id), payload)
+
+
+def _plan_result(plan: dict) -> dict:
+    return {
+        "donation_qty": plan["donation_qty"],
+        "remaining_public_qty": plan["remaining_public_qty"],
+        "routing_used": plan["routing_used"],
+        "allocations": [{**a, "food_bank_id": str(a["food_bank_id"])} for a in plan["allocations"]],
+    }
+
+
+async def _run_plan_job(db, job: dict) -> dict:
+    listing = await db.listings.find_one({"_id": ObjectId(job["key"])})
+    if listing is None:
+        raise jobs.PermanentJobError("Listing not found")
+    if listing.get("donation_job_id") == job["_id"]:
+        # An earlier attempt finished the writes but lost its lease before completing
+        plan = listing.get("donation_plan") or []
+        donated = sum(a["qty"] for a in plan)
+        return _plan_result({
+            "donation_qty": donated,
+            "remaining_public_qty": listing.get("qty_available", 0),
+            "routing_used": True,
+            "allocations": plan,
+        })
+    if listing.get("donation_mode") != "queued":
+        # Planned, failed or closed by another path since the job was queued
+        return {"skipped": True, "donation_mode": listing.get("donation_mode")}
+    # Donation records from an attempt that died before updating the listing
+    await db.donations.delete_many({"listing_id": job["key"], "job_id": job["_id"]})
+
+    payload = job["payload"]
+    try:
+        plan = await plan_listing(
+            db,
+            listing,
+            payload["donate_percent"],
+            top_k=payload.get("top_k") or OSRM_TOP_K,
+            max_minutes=payload.get("max_minutes") or OSRM_MAX_MINUTES,
+            job_id=job["_id"],
+        )
+    except PlanningError as e:
+        message = e.detail["message"] if isinstance(e.detail, dict) else str(e.detail)
+        if e.status_code in (409, 503):
+            # Routing was unavailable, or the listing changed under the plan: the retry re-reads it
+            raise RuntimeError(message)
+        raise jobs.PermanentJobError(message)
+    return _plan_result(plan)
+
+
+async def _give_up_plan(db, job: dict, error: str) -> None:
+    await db.listings.update_one(
+        {"_id": ObjectId(job["key"]), "donation_mode": "queued"},
+        {"$set": {"donation_mode": "failed", "donation_error": error}},
+    )
+    invalidate_market(job["key"])
+
+
+jobs.register(DONATION_PLAN_JOB, _run_plan_job, on_give_up=_give_up_plan)
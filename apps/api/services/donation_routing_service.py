@@ -1,70 +1,109 @@
 """
 Donation routing logic: candidate selection, scoring, and unit allocation.
 """
+import asyncio
 import math
 import os
 import logging
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional
 
-from services.osrm_service import table_durations
+from services.hours import SLOT_MINUTES, days_bits, horizon_masks, open_within
+from services.need_raster import need_at
+from services.osrm_service import OSRM_MAX_TABLE_COORDS, table_durations, table_matrix
+from services.travel_time import estimate_durations, record_samples
 
 logger = logging.getLogger(__name__)
 
 OSRM_MAX_MINUTES = float(os.environ.get("OSRM_MAX_MINUTES", 20))
 OSRM_TOP_K = int(os.environ.get("OSRM_TOP_K", 5))
+# Per-request budget for OSRM calls made on behalf of an endpoint
+OSRM_BUDGET_S = float(os.environ.get("OSRM_BUDGET_S", 3.0))
 
 # Rough fallback: max_minutes at 30 mph ≈ 0.8 km/min → prefilter radius in meters
 _KM_PER_MINUTE_ESTIMATE = 0.8
 
+# Only the best top_k * factor banks by estimated travel time are sent to OSRM
+OSRM_PRERANK_FACTOR = int(os.environ.get("OSRM_PRERANK_FACTOR", 2))
+
+# Banks must open within this many hours to receive a donation (0 disables the hours filter)
+HOURS_HORIZON_H = float(os.environ.get("HOURS_HORIZON_H", 48))
+
+
+def request_deadline(budget_s: float = OSRM_BUDGET_S) -> float:
+    """Deadline to pass down from an endpoint so OSRM cannot stall the request."""
+    return time.monotonic() + budget_s
+
+
+@lru_cache(maxsize=4)
+def _horizon_for_slot(slot: int) -> tuple[int, ...]:
+    return tuple(horizon_masks(datetime.fromtimestamp(slot * SLOT_MINUTES * 60, timezone.utc), HOURS_HORIZON_H))
+
 
 def _euclidean_dist(lat1, lng1, lat2, lng2) -> float:
     return math.hypot(lat1 - lat2, lng1 - lng2)
 
 
-async def pick_candidates(
-    listing_location: dict,
+async def _nearby_banks(
+    lng: float,
+    lat: float,
     db,
-    top_k: int = OSRM_TOP_K,
-    max_minutes: float = OSRM_MAX_MINUTES,
-) -> tuple[list[dict], bool]:
+    top_k: int,
+    max_minutes: float,
+) -> tuple[list[dict], list[tuple[float, float]], list[float]]:
     """
-    Find reachable food banks within max_minutes driving time.
-
-    Returns:
-        (candidates, routing_used)
-        candidates: list of food bank dicts with 'duration_seconds' and 'duration_minutes' added
-        routing_used: True if OSRM returned results, False if fallback was used
+    $near prefilter, drop banks that are closed for the next HOURS_HORIZON_H hours, then pre-rank
+    by the local travel-time model so OSRM gets a smaller table.
+    Returns (banks, dest_coords, estimated_seconds), all in the same order.
     """
-    lng, lat = listing_location["coordinates"]
-
     # Prefilter: $near with rough max distance to reduce OSRM calls
     max_distance_m = int(max_minutes * _KM_PER_MINUTE_ESTIMATE * 1000 * 2)  # generous 2x
 
-    cursor = db.food_banks.find(
-        {
-            "active": True,
-            "location": {
-                "$near": {
-                    "$geometry": {"type": "Point", "coordinates": [lng, lat]},
-                    "$maxDistance": max_distance_m,
-                }
-            },
+    query = {
+        "active": True,
+        "location": {
+            "$near": {
+                "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+                "$maxDistance": max_distance_m,
+            }
         },
-        limit=top_k * 4,  # fetch extra; OSRM will thin down
-    )
+    }
+    horizon = None
+    if HOURS_HORIZON_H > 0:
+        now = datetime.now(timezone.utc)
+        horizon = _horizon_for_slot(int(now.timestamp()) // (SLOT_MINUTES * 60))
+        # Weekday bits from the index; banks ingested before hours were compiled have no open_days and pass
+        query["open_days"] = {"$not": {"$bitsAllClear": days_bits(horizon)}}
+
+    cursor = db.food_banks.find(query, limit=top_k * 4)  # fetch extra; OSRM will thin down
     nearby = await cursor.to_list(length=top_k * 4)
+    if horizon is not None:
+        nearby = [bank for bank in nearby if open_within(bank, now, horizon)]
 
     if not nearby:
         logger.info("No food banks found within prefilter radius of %dm", max_distance_m)
-        return [], True
+        return [], [], []
 
     dest_coords = [
         (bank["location"]["coordinates"][0], bank["location"]["coordinates"][1])
         for bank in nearby
     ]
+    estimates = estimate_durations((lng, lat), dest_coords)
+    ranked = sorted(zip(nearby, dest_coords, estimates), key=lambda t: t[2])
+    ranked = ranked[: top_k * OSRM_PRERANK_FACTOR]
+    return [r[0] for r in ranked], [r[1] for r in ranked], [r[2] for r in ranked]
 
-    durations = await table_durations((lng, lat), dest_coords)
 
+def _select_candidates(
+    nearby: list[dict],
+    durations: list[Optional[float]],
+    estimates: list[float],
+    top_k: int,
+    max_minutes: float,
+) -> tuple[list[dict], bool]:
+    """Keep banks within max_minutes using OSRM durations, or the estimates if OSRM gave nothing."""
     routing_used = any(d is not None for d in durations)
 
     candidates = []
@@ -81,32 +120,129 @@ async def pick_candidates(
                     "duration_minutes": round(dur_min, 1),
                 })
     else:
-        # OSRM down — fall back to Euclidean distance, mark duration_minutes=None
-        logger.warning("OSRM unavailable; falling back to Euclidean distance prefilter")
-        for bank in nearby[:top_k]:
-            b_lng, b_lat = bank["location"]["coordinates"]
-            candidates.append({
+        # OSRM down — use the local travel-time model's estimates instead
+        logger.warning("OSRM unavailable; falling back to estimated travel times")
+        estimated = [
+            {
                 **bank,
                 "_id": str(bank["_id"]),
-                "duration_seconds": None,
-                "duration_minutes": None,
-            })
+                "duration_seconds": round(est_secs, 1),
+                "duration_minutes": round(est_secs / 60.0, 1),
+                "duration_estimated": True,
+            }
+            for bank, est_secs in zip(nearby, estimates)
+        ]
+        # The estimate is only a guess: when it rules every bank out, offer the nearest ones
+        # (as before the model existed) rather than no plan at all
+        candidates = [c for c in estimated if c["duration_seconds"] / 60.0 <= max_minutes] or estimated
 
     # Trim to top_k
     return candidates[:top_k], routing_used
 
 
+async def pick_candidates(
+    listing_location: dict,
+    db,
+    top_k: int = OSRM_TOP_K,
+    max_minutes: float = OSRM_MAX_MINUTES,
+    deadline: Optional[float] = None,
+) -> tuple[list[dict], bool]:
+    """
+    Find reachable food banks within max_minutes driving time.
+    deadline (time.monotonic()) bounds the OSRM call; past it we use the estimate fallback.
+
+    Returns:
+        (candidates, routing_used)
+        candidates: list of food bank dicts with 'duration_seconds' and 'duration_minutes' added
+        routing_used: True if OSRM returned results, False if fallback was used
+        (fallback candidates carry estimated durations and duration_estimated=True)
+    """
+    lng, lat = listing_location["coordinates"]
+    nearby, dest_coords, estimates = await _nearby_banks(lng, lat, db, top_k, max_minutes)
+    if not nearby:
+        return [], True
+
+    durations = await table_durations((lng, lat), dest_coords, deadline=deadline)
+    if any(d is not None for d in durations):
+        record_samples(db, (lng, lat), dest_coords, durations)
+    return _select_candidates(nearby, durations, estimates, top_k, max_minutes)
+
+
+async def pick_candidates_bulk(
+    listing_locations: list[dict],
+    db,
+    top_k: int = OSRM_TOP_K,
+    max_minutes: float = OSRM_MAX_MINUTES,
+    deadline: Optional[float] = None,
+) -> list[tuple[list[dict], bool]]:
+    """
+    pick_candidates for many listings with shared OSRM matrices: listings are grouped so each
+    group's sources + union of candidate banks fits in one Table request (OSRM_MAX_TABLE_COORDS).
+    Returns one (candidates, routing_used) per location, in order.
+    """
+    origins = [tuple(loc["coordinates"]) for loc in listing_locations]
+    prefiltered = await asyncio.gather(
+        *(_nearby_banks(lng, lat, db, top_k, max_minutes) for lng, lat in origins)
+    )
+
+    # Greedy grouping by coordinate budget
+    groups: list[tuple[list[int], dict]] = []
+    for i, (nearby, dest_coords, _) in enumerate(prefiltered):
+        if not nearby:
+            continue
+        dests = dict.fromkeys(dest_coords)
+        if groups:
+            members, union = groups[-1]
+            merged = len(members) + 1 + len(union.keys() | dests.keys())
+            if merged <= OSRM_MAX_TABLE_COORDS:
+                members.append(i)
+                union.update(dests)
+                continue
+        groups.append(([i], dests))
+
+    async def _durations_for(members: list[int], union: dict):
+        dest_list = list(union)
+        matrix = await table_matrix([origins[i] for i in members], dest_list, deadline=deadline)
+        column = {coord: j for j, coord in enumerate(dest_list)}
+        out = {}
+        for row, i in zip(matrix, members):
+            _, dest_coords, _ = prefiltered[i]
+            out[i] = [row[column[c]] for c in dest_coords]
+        return out
+
+    durations_by_listing: dict[int, list[Optional[float]]] = {}
+    for part in await asyncio.gather(*(_durations_for(m, u) for m, u in groups)):
+        durations_by_listing.update(part)
+
+    results = []
+    for i, (nearby, dest_coords, estimates) in enumerate(prefiltered):
+        if not nearby:
+            results.append(([], True))
+            continue
+        durations = durations_by_listing[i]
+        if any(d is not None for d in durations):
+            record_samples(db, origins[i], dest_coords, durations)
+        results.append(_select_candidates(nearby, durations, estimates, top_k, max_minutes))
+    return results
+
+
 def score_candidates(candidates: list[dict]) -> list[dict]:
     """
     Score each candidate: score = need_weight / (duration_minutes + 1).
+    Banks without a need_weight take the need raster value at their location (else 1.0).
     Returns list sorted descending by score.
     """
     scored = []
     for bank in candidates:
         dur = bank.get("duration_minutes")
-        need = bank.get("need_weight", 1.0)
+        need = bank.get("need_weight")
+        if need is None:
+            coords = (bank.get("location") or {}).get("coordinates")
+            need = need_at(coords[0], coords[1]) if coords else None
+            if need is None:
+                need = 1.0
         if dur is None:
-            # Fallback: score on need only
+            # No duration at all: score on need only
             score = need
         else:
             score = need / (dur + 1)
@@ -132,7 +268,7 @@ def allocate_units(
         capacities: optional {food_bank_id: remaining_capacity} override
 
     Returns:
-        List of allocation dicts: {food_bank_id, name, qty, duration_minutes, score}
+        List of allocation dicts: {food_bank_id, name, address, phone, neighborhood, qty, duration_minutes, score}
     """
     if not scored_candidates or donation_qty <= 0:
         return []
@@ -198,6 +334,7 @@ def allocate_units(
             "name": bank.get("name", "Unknown"),
             "address": bank.get("address", ""),
             "phone": bank.get("phone", ""),
+            "neighborhood": bank.get("neighborhood"),
             "qty": allocs[i],
             "duration_minutes": bank.get("duration_minutes"),
             "score": bank.get("score"),
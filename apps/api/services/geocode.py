@@ -2,10 +2,9 @@
 Geocode address once (on create/update). Nominatim or stub.
 Returns (lng, lat) or None. Never call on map load.
 """
-import os
 from typing import Optional, Tuple
 
-import httpx
+from services.metrics import track_outbound
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
@@ -13,8 +12,10 @@ NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 async def geocode_address(address: str) -> Optional[Tuple[float, float]]:
     if not address or not address.strip():
         return None
+    import httpx
+
     try:
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient() as client, track_outbound("nominatim", "search"):
             r = await client.get(
                 NOMINATIM_URL,
                 params={"q": address, "format": "json", "limit": 1},
@@ -0,0 +1,193 @@
+"""
+Background geocoding with one global rate limit (Nominatim allows 1 request/s).
+
+- resolve(address): awaitable lookup; identical addresses (normalized) share one in-flight
+  request and recent results are cached, so a burst of listings at one address costs one call.
+- submit_listing(db, listing_id, address): queues a geocode_listing job (services/jobs.py), so
+  one leased worker handles each listing and a crash is retried. The listing is created with
+  status "geocoding" and geocode_status "pending", then patched with its location and status
+  "open" (geocode_status "done"/"failed"). Listings waiting on a donation plan
+  (donation_request) get a donation_plan job once the location lands. Without background
+  workers (serverless) the job runs inside the creating request.
+- resume_pending(db): queue jobs for listings left in "geocoding" without one (deduped per listing,
+  so every process may call it).
+
+Env vars:
+  GEOCODE_RATE_PER_S  – default: 1.0
+  GEOCODE_CACHE_SIZE  – default: 1024
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from services import jobs
+from services.donation_planner import enqueue_plan
+from services.geocode import geocode_address
+from services.listing_fields import derive_listing_fields
+from services.market_cache import invalidate as invalidate_market
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_RATE_PER_S = float(os.environ.get("GEOCODE_RATE_PER_S", 1.0))
+GEOCODE_CACHE_SIZE = int(os.environ.get("GEOCODE_CACHE_SIZE", 1024))
+
+GEOCODE_JOB = "geocode_listing"
+
+Coords = Optional[Tuple[float, float]]
+
+
+def normalize_address(address: str) -> str:
+    return " ".join(address.lower().split())
+
+
+class GeocodeQueue:
+    def __init__(self, rate_per_s: float = GEOCODE_RATE_PER_S, cache_size: int = GEOCODE_CACHE_SIZE):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self.cache_size = cache_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._addresses: dict[str, str] = {}
+        self._cache: OrderedDict[str, Coords] = OrderedDict()
+        self._next_at = 0.0
+        self.stats = {"requests": 0, "deduped": 0, "cache_hits": 0, "failures": 0}
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            # Anything submitted to a dead worker's queue is requeued on the new one
+            for key in self._inflight:
+                self._queue.put_nowait((key, self._addresses[key]))
+            self._worker = asyncio.create_task(self._run())
+
+    async def resolve(self, address: str) -> Coords:
+        key = normalize_address(address)
+        if not key:
+            return None
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self._cache[key]
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[key] = fut
+            self._addresses[key] = address
+            new_worker = self._worker is None or self._worker.done()
+            self._ensure_worker()
+            if not new_worker:
+                self._queue.put_nowait((key, address))
+        else:
+            self.stats["deduped"] += 1
+        return await asyncio.shield(fut)
+
+    async def _run(self) -> None:
+        while True:
+            key, address = await self._queue.get()
+            fut = self._inflight.get(key)
+            if fut is None or fut.done():
+                continue
+            wait = self._next_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_at = time.monotonic() + self.interval
+            self.stats["requests"] += 1
+            try:
+                coords = await geocode_address(address)
+            except Exception:
+                logger.exception("Geocoding %r failed", address)
+                coords = None
+            if coords is None:
+                self.stats["failures"] += 1
+            else:
+                self._cache[key] = coords
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            self._inflight.pop(key, None)
+            self._addresses.pop(key, None)
+            fut.set_result(coords)
+
+    async def submit_listing(self, db, listing_id, address: str) -> dict:
+        """Queue the geocode job; runs it here when this process has no workers. Returns the job."""
+        job = await jobs.enqueue(db, GEOCODE_JOB, str(listing_id), {"address": address})
+        await jobs.run_inline(db, job)
+        return job
+
+    async def resume_pending(self, db, limit: int = 1000) -> int:
+        cursor = db.listings.find({"status": "geocoding"}, {"address": 1}).limit(limit)
+        count = 0
+        async for doc in cursor:
+            if doc.get("address"):
+                await jobs.enqueue(db, GEOCODE_JOB, str(doc["_id"]), {"address": doc["address"]})
+                count += 1
+        return count
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
+async def on_location(db, listing: dict) -> None:
+    """Location landed for a listing that asked for a donation plan: queue the plan job."""
+    job = await enqueue_plan(db, listing["_id"], listing["donation_request"]["donate_percent"])
+    await db.listings.update_one({"_id": listing["_id"]}, {"$unset": {"donation_request": ""}})
+    await jobs.run_inline(db, job)
+
+
+async def _mark_failed(db, listing_id) -> None:
+    await db.listings.update_one(
+        {"_id": listing_id, "status": "geocoding"},
+        {"$set": {"status": "open", "geocode_status": "failed"}},
+    )
+    await db.listings.update_one(
+        {"_id": listing_id, "donation_request": {"$exists": True}},
+        {
+            "$set": {"donation_mode": "failed", "donation_error": "Address could not be geocoded"},
+            "$unset": {"donation_request": ""},
+        },
+    )
+
+
+async def _run_geocode_job(db, job: dict) -> dict:
+    listing_id = ObjectId(job["key"])
+    listing = await db.listings.find_one({"_id": listing_id}, {"status": 1})
+    if listing is None or listing.get("status") != "geocoding":
+        # Located by an earlier attempt, or closed/deleted since
+        return {"skipped": True}
+    coords = await geocode_queue.resolve(job["payload"]["address"])
+    if coords is None:
+        await _mark_failed(db, listing_id)
+        return {"geocode_status": "failed"}
+    location = {"type": "Point", "coordinates": list(coords)}
+    listing = await db.listings.find_one_and_update(
+        {"_id": listing_id, "status": "geocoding"},
+        {"$set": {
+            "location": location,
+            **derive_listing_fields({"location": location}),
+            "status": "open",
+            "geocode_status": "done",
+        }},
+        return_document=ReturnDocument.AFTER,
+    )
+    if listing is None:
+        return {"skipped": True}
+    invalidate_market(listing_id, listing["location"])
+    if listing.get("donation_request"):
+        await on_location(db, listing)
+    return {"geocode_status": "done", "coordinates": list(coords)}
+
+
+async def _give_up_geocode(db, job: dict, error: str) -> None:
+    await _mark_failed(db, ObjectId(job["key"]))
+
+
+jobs.register(GEOCODE_JOB, _run_geocode_job, _give_up_geocode)
+
+geocode_queue = GeocodeQueue()
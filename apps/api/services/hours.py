@@ -0,0 +1,223 @@
+"""
+Food-bank opening hours: free text → weekly half-hour bitmask.
+
+  "Mon - Fri, 11:30 - 1pm"            weekday range, meridiem inferred from the end time
+  "Tue 12 - 2pm & 4 - 7pm"            several ranges on the same days
+  "Mon 12 - 2pm, Thu 3 - 6pm"         several day/time clauses
+  "Wed 4 - 7pm, June 6 - Sept 26"     seasonal date range (kept in hours_season)
+  "2nd & 4th Sat, 10am - 1pm"         monthly/alternate schedules are approximated as weekly
+  "Wed 6pm", "6pm - food runs out"    open-ended → DEFAULT_OPEN_MINUTES
+
+compile_hours() returns the fields stored on food_banks:
+  hours_mask   – 7 ints (Mon..Sun), bit i = open during [i*30, i*30+30) local minutes
+  open_days    – 7-bit int, bit d set if open at all on weekday d (indexed; $bitsAnySet)
+  hours_known  – False when nothing could be parsed (mask is then all-open, so never excluded)
+  hours_approx – True for "Alt." / "2nd & 4th" style schedules
+  hours_season – {"start": [month, day], "end": [month, day]} or None
+  next_open_at – next opening (UTC ISO) as of compile time
+
+Times are local to HOURS_TZ (default America/New_York).
+"""
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+HOURS_TZ = ZoneInfo(os.environ.get("HOURS_TZ", "America/New_York"))
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+ALL_DAYS = 0b1111111
+DEFAULT_OPEN_MINUTES = 120
+
+_DAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_DAY = r"(?:Mon|Tues?|Tu|Wed|Thu(?:rs)?|Fri|Sat|Sun)[a-z]*\.?"
+_ORDINALS = r"\d(?:st|nd|rd|th)(?:\s*&\s*\d(?:st|nd|rd|th))*\s+"
+_DAY_SPEC = re.compile(
+    rf"(?P<qual>Alt\.?\s*|{_ORDINALS})?(?P<days>{_DAY}(?:\s*(?:-|&|,)\s*{_DAY})*)",
+    re.IGNORECASE,
+)
+_TIME = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?"
+_TIME_RANGE = re.compile(rf"{_TIME}(?:\s*-\s*(?:{_TIME}|(food runs out)))?", re.IGNORECASE)
+_MONTH = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+_SEASON = re.compile(rf"{_MONTH}\s*(\d{{1,2}})\s*-\s*{_MONTH}\s*(\d{{1,2}})", re.IGNORECASE)
+
+
+def _parse_days(text: str) -> list[int]:
+    tokens = re.findall(rf"{_DAY}|-|&|,", text, re.IGNORECASE)
+    days: list[int] = []
+    pending_range = False
+    for tok in tokens:
+        if tok == "-":
+            pending_range = True
+            continue
+        if tok in "&,":
+            continue
+        low = tok.lower()
+        d = 1 if low.startswith("tu") else _DAYS.get(low[:3])
+        if d is None:
+            continue
+        if pending_range and days:
+            start = days[-1]
+            span = (d - start) % 7
+            days.extend((start + i) % 7 for i in range(1, span + 1))
+        else:
+            days.append(d)
+        pending_range = False
+    return sorted(set(days))
+
+
+def _minutes(hour: str, minute: Optional[str], meridiem: Optional[str]) -> int:
+    h = int(hour) % 12 if meridiem else int(hour)
+    if meridiem and meridiem.lower() == "pm":
+        h += 12
+    return h * 60 + int(minute or 0)
+
+
+def _parse_ranges(text: str) -> list[tuple[int, int]]:
+    """(start, end) local minutes; a start without meridiem borrows the end's, unless that inverts the range."""
+    ranges = []
+    for m in _TIME_RANGE.finditer(text):
+        h1, m1, ap1, h2, m2, ap2, open_ended = m.groups()
+        if int(h1) > 24 or (h2 and int(h2) > 24):
+            continue
+        if h2 is None:
+            if ap1 is None and open_ended is None:
+                continue  # bare number, e.g. a stray digit
+            start = _minutes(h1, m1, ap1)
+            ranges.append((start, min(start + DEFAULT_OPEN_MINUTES, 24 * 60)))
+            continue
+        end = _minutes(h2, m2, ap2)
+        if ap1 is None and ap2 is not None:
+            start = _minutes(h1, m1, ap2)
+            if start > end:
+                start = _minutes(h1, m1, "am" if ap2.lower() == "pm" else "pm")
+        else:
+            start = _minutes(h1, m1, ap1)
+        if ap1 is None and ap2 is None and end <= start:
+            end += 12 * 60  # "12 - 2" style with no meridiem at all
+        if end > start:
+            ranges.append((start, min(end, 24 * 60)))
+    return ranges
+
+
+def _slot_bits(start: int, end: int) -> int:
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)  # ceil
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def parse_hours(text: str) -> dict:
+    """Free-text hours → {mask, known, approx, season}."""
+    text = (text or "").replace("–", "-").replace("—", "-").strip()
+    season = None
+    m = _SEASON.search(text)
+    if m:
+        season = {
+            "start": [_MONTHS[m.group(1)[:3].lower()], int(m.group(2))],
+            "end": [_MONTHS[m.group(3)[:3].lower()], int(m.group(4))],
+        }
+        text = (text[:m.start()] + text[m.end():]).strip(" ,")
+
+    mask = [0] * 7
+    approx = False
+    specs = list(_DAY_SPEC.finditer(text))
+    for i, spec in enumerate(specs):
+        days = _parse_days(spec.group("days"))
+        if not days:
+            continue
+        approx = approx or bool(spec.group("qual"))
+        tail = text[spec.end(): specs[i + 1].start() if i + 1 < len(specs) else len(text)]
+        ranges = _parse_ranges(tail)
+        day_bits = 0
+        for start, end in ranges:
+            day_bits |= _slot_bits(start, end)
+        for d in days:
+            # Days listed without times: open, hours unknown
+            mask[d] |= day_bits or FULL_DAY
+
+    known = any(mask)
+    if not known:
+        mask = [FULL_DAY] * 7
+    return {"mask": mask, "known": known, "approx": approx, "season": season}
+
+
+def in_season(season: Optional[dict], day: date) -> bool:
+    if not season:
+        return True
+    start, end, today = tuple(season["start"]), tuple(season["end"]), (day.month, day.day)
+    if start <= end:
+        return start <= today <= end
+    return today >= start or today <= end
+
+
+def horizon_masks(now: datetime, hours: float) -> list[int]:
+    """Per-weekday slot bits covering [now, now + hours) in local time."""
+    masks = [0] * 7
+    local = now.astimezone(HOURS_TZ)
+    slot_start = local.replace(
+        minute=local.minute - local.minute % SLOT_MINUTES, second=0, microsecond=0
+    )
+    t = slot_start
+    end = local + timedelta(hours=hours)
+    while t < end:
+        masks[t.weekday()] |= 1 << ((t.hour * 60 + t.minute) // SLOT_MINUTES)
+        t += timedelta(minutes=SLOT_MINUTES)
+        if t.weekday() == slot_start.weekday() and t - slot_start >= timedelta(days=7):
+            break
+    return masks
+
+
+def days_bits(masks: list[int]) -> int:
+    return sum(1 << d for d, bits in enumerate(masks) if bits)
+
+
+def open_within(bank: dict, now: datetime, hmasks: list[int]) -> bool:
+    """In-memory test: bank opens at some point in the horizon (banks without compiled hours pass)."""
+    mask = bank.get("hours_mask")
+    if not mask:
+        return True
+    if not in_season(bank.get("hours_season"), now.astimezone(HOURS_TZ).date()):
+        return False
+    return any(m & h for m, h in zip(mask, hmasks))
+
+
+def next_open(mask: list[int], after: datetime, season: Optional[dict] = None) -> Optional[datetime]:
+    """First slot start at or after `after` (UTC), searching 8 days ahead (a year if seasonal)."""
+    if not any(mask):
+        return None
+    local = after.astimezone(HOURS_TZ)
+    day0 = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    current_slot = (local.hour * 60 + local.minute) // SLOT_MINUTES
+    for offset in range(366 if season else 8):
+        day = day0 + timedelta(days=offset)
+        if not in_season(season, day.date()):
+            continue
+        bits = mask[day.weekday()]
+        if offset == 0:
+            bits &= ~((1 << current_slot) - 1)
+        if bits:
+            slot = (bits & -bits).bit_length() - 1
+            opens = day.replace(tzinfo=None) + timedelta(minutes=slot * SLOT_MINUTES)
+            return opens.replace(tzinfo=HOURS_TZ).astimezone(timezone.utc)
+    return None
+
+
+def compile_hours(text: str, now: Optional[datetime] = None) -> dict:
+    """Fields to $set on a food_banks document."""
+    parsed = parse_hours(text)
+    opens = next_open(parsed["mask"], now or datetime.now(timezone.utc), parsed["season"])
+    return {
+        "hours_mask": parsed["mask"],
+        "open_days": days_bits(parsed["mask"]),
+        "hours_known": parsed["known"],
+        "hours_approx": parsed["approx"],
+        "hours_season": parsed["season"],
+        "next_open_at": opens.isoformat() if opens else None,
+    }
@@ -0,0 +1,310 @@
+"""
+Durable Mongo-backed job queue (collection `jobs`) with in-process workers.
+
+- enqueue(db, kind, key, payload): one active job per key. The unique sparse `active_key`
+  index dedupes, so enqueueing twice for the same listing returns the existing job.
+- Workers claim with one find_one_and_update that sets status "running" and pushes visible_at
+  forward by the visibility timeout. A worker that dies mid-job leaves it claimable again
+  once visible_at passes, until max_attempts; then reap_expired() marks it failed.
+- Failures are retried with exponential backoff up to max_attempts. Handlers raise
+  PermanentJobError for failures a retry cannot fix. Finished jobs (done or failed) drop
+  active_key, so the key can be enqueued again.
+- Without a JobPool in this process (serverless), run_inline() runs a just-enqueued job in the
+  caller's request; retries and leftovers are drained by run_pending() (POST /api/jobs/run).
+
+Job doc: {kind, key, active_key, payload, status: queued|running|done|failed, attempts,
+          max_attempts, visible_at, created_at, updated_at, result?, error?}
+
+Env vars:
+  JOB_WORKERS             – worker tasks per process, default: 2
+  JOB_VISIBILITY_S        – claim lease before a running job can be reclaimed, default: 60
+  JOB_MAX_ATTEMPTS        – default: 5
+  JOB_BACKOFF_S           – first retry delay (doubles per attempt), default: 2
+  JOB_POLL_S              – idle poll interval when no local enqueue wakes the worker, default: 1.0
+  JOB_RUN_LIMIT           – jobs per POST /api/jobs/run call, default: 20
+  JOB_RUN_BUDGET_S        – stop claiming new jobs after this many seconds in that call, default: 20
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_VISIBILITY_S = float(os.environ.get("JOB_VISIBILITY_S", 60))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_BACKOFF_S = float(os.environ.get("JOB_BACKOFF_S", 2))
+JOB_POLL_S = float(os.environ.get("JOB_POLL_S", 1.0))
+JOB_RUN_LIMIT = int(os.environ.get("JOB_RUN_LIMIT", 20))
+JOB_RUN_BUDGET_S = float(os.environ.get("JOB_RUN_BUDGET_S", 20))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+Handler = Callable[..., Awaitable[Optional[dict]]]
+# kind -> (handler(db, job) -> result, on_give_up(db, job, error))
+_handlers: dict[str, tuple[Handler, Optional[Callable[..., Awaitable[None]]]]] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot succeed."""
+
+
+def register(kind: str, handler: Handler, on_give_up=None) -> None:
+    _handlers[kind] = (handler, on_give_up)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_to_response(job: dict) -> dict:
+    return {
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "key": job["key"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "max_attempts": job.get("max_attempts", JOB_MAX_ATTEMPTS),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat() if job.get("created_at") else None,
+        "updated_at": job["updated_at"].isoformat() if job.get("updated_at") else None,
+    }
+
+
+async def enqueue(db, kind: str, key: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> dict:
+    """Insert a queued job, or return the active job already queued for this key."""
+    now = _now()
+    active_key = f"{kind}:{key}"
+    doc = {
+        "kind": kind,
+        "key": key,
+        "active_key": active_key,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "visible_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        result = await db.jobs.insert_one(doc)
+        doc["_id"] = result.inserted_id
+    except DuplicateKeyError:
+        existing = await db.jobs.find_one({"active_key": active_key})
+        if existing is not None:
+            return existing
+        # Finished between the insert and the lookup: try once more
+        doc.pop("_id", None)
+        result = await db.jobs.insert_one(doc)
+        doc["_id"] = result.inserted_id
+    job_pool.notify()
+    return doc
+
+
+async def latest_job(db, kind: str, key: str) -> Optional[dict]:
+    return await db.jobs.find_one({"kind": kind, "key": key}, sort=[("created_at", -1)])
+
+
+async def get_job(db, job_id: str) -> Optional[dict]:
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        return None
+    return await db.jobs.find_one({"_id": oid})
+
+
+async def claim(db, kinds: list[str], visibility_s: float = JOB_VISIBILITY_S) -> Optional[dict]:
+    """Lease the oldest visible job (queued, or running with an expired lease)."""
+    now = _now()
+    return await db.jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": "queued"},
+                # An expired lease is only re-run while attempts remain (reap_expired fails the rest)
+                {"status": "running", "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            ],
+            "visible_at": {"$lte": now},
+            "kind": {"$in": kinds},
+        },
+        {
+            "$set": {"status": "running", "visible_at": now + timedelta(seconds=visibility_s), "updated_at": now},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("visible_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def reap_expired(db, kinds: list[str]) -> int:
+    """Mark failed the running jobs whose lease expired on their last attempt (the worker crashed or hung)."""
+    reaped = 0
+    while True:
+        now = _now()
+        job = await db.jobs.find_one_and_update(
+            {
+                "status": "running",
+                "visible_at": {"$lte": now},
+                "kind": {"$in": kinds},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {"status": "failed", "error": "Lease expired on the last attempt", "updated_at": now},
+                "$unset": {"active_key": ""},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return reaped
+        reaped += 1
+        logger.warning("Job %s (%s) lease expired after %d attempts", job["_id"], job["kind"], job["attempts"])
+        on_give_up = _handlers[job["kind"]][1]
+        if on_give_up is not None:
+            await on_give_up(db, job, job["error"])
+
+
+async def run_inline(db, job: dict) -> bool:
+    """
+    When this process runs no workers, claim this job and run it now, in the caller.
+    Returns True when it ran (whatever the outcome), False when a worker will pick it up.
+    """
+    if job_pool.running or job.get("status") != "queued":
+        return False
+    now = _now()
+    claimed = await db.jobs.find_one_and_update(
+        {"_id": job["_id"], "status": "queued", "visible_at": {"$lte": now}},
+        {
+            "$set": {"status": "running", "visible_at": now + timedelta(seconds=JOB_VISIBILITY_S), "updated_at": now},
+            "$inc": {"attempts": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    if claimed is None:
+        return False
+    try:
+        await run_one(db, claimed)
+    except Exception:
+        logger.exception("Job %s (%s) could not be settled", claimed["_id"], claimed["kind"])
+    return True
+
+
+async def complete(db, job: dict, result: Optional[dict]) -> None:
+    await db.jobs.update_one(
+        {"_id": job["_id"], "attempts": job["attempts"]},
+        {"$set": {"status": "done", "result": result, "updated_at": _now()}, "$unset": {"active_key": "", "error": ""}},
+    )
+
+
+async def fail(db, job: dict, error: str, permanent: bool = False) -> bool:
+    """Schedule a retry with backoff, or mark failed. Returns True when the job gave up."""
+    now = _now()
+    if not permanent and job["attempts"] < job.get("max_attempts", JOB_MAX_ATTEMPTS):
+        delay = JOB_BACKOFF_S * 2 ** (job["attempts"] - 1)
+        await db.jobs.update_one(
+            {"_id": job["_id"], "attempts": job["attempts"]},
+            {"$set": {
+                "status": "queued",
+                "error": error,
+                "visible_at": now + timedelta(seconds=delay),
+                "updated_at": now,
+            }},
+        )
+        return False
+    await db.jobs.update_one(
+        {"_id": job["_id"], "attempts": job["attempts"]},
+        {"$set": {"status": "failed", "error": error, "updated_at": now}, "$unset": {"active_key": ""}},
+    )
+    return True
+
+
+async def run_one(db, job: dict) -> None:
+    handler, on_give_up = _handlers[job["kind"]]
+    try:
+        result = await handler(db, job)
+    except Exception as e:
+        permanent = isinstance(e, PermanentJobError)
+        if not permanent:
+            logger.warning("Job %s (%s) attempt %d failed: %s", job["_id"], job["kind"], job["attempts"], e)
+        gave_up = await fail(db, job, str(e), permanent=permanent)
+        if gave_up and on_give_up is not None:
+            await on_give_up(db, job, str(e))
+        return
+    await complete(db, job, result)
+
+
+async def run_pending(db, limit: int, budget_s: float) -> dict:
+    """
+    Run up to limit visible jobs in the caller's task, stopping after budget_s; for deployments
+    without a JobPool (serverless), driven by POST /api/jobs/run from a scheduler.
+    """
+    kinds = list(_handlers)
+    started = asyncio.get_running_loop().time()
+    ran = 0
+    while ran < limit and asyncio.get_running_loop().time() - started < budget_s:
+        job = await claim(db, kinds)
+        if job is None:
+            break
+        await run_one(db, job)
+        ran += 1
+    return {"ran": ran, "reaped": await reap_expired(db, kinds)}
+
+
+class JobPool:
+    """Worker tasks for this process; enqueue() wakes them so local jobs start without polling delay."""
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self, db, workers: int = JOB_WORKERS) -> None:
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(db)) for _ in range(workers)]
+
+    async def _run(self, db) -> None:
+        while True:
+            try:
+                job = await claim(db, list(_handlers))
+                if job is None:
+                    await reap_expired(db, list(_handlers))
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is not None:
+                try:
+                    await run_one(db, job)
+                except Exception:
+                    # complete/fail/on_give_up hit the database; the lease lets another attempt pick it up
+                    logger.exception("Job %s (%s) could not be settled", job["_id"], job["kind"])
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=JOB_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wake = None
+
+
+job_pool = JobPool()
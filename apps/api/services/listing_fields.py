@@ -0,0 +1,115 @@
+"""
+Fields derived from a listing's own data, stored on the document so market queries can use them
+directly. Recompute them with derive_listing_fields() wherever location (or other inputs) are set,
+and run scripts/backfill_listing_fields.py after changing the derivation.
+
+listing_snapshot() is the compact copy of a listing embedded on each order at reserve time, so
+order history renders without listing lookups (scripts/backfill_order_snapshots.py fills old orders).
+
+  tile            – web-mercator quadkey of the location at MARKET_QUADKEY_ZOOM. A bounding box
+                    maps to a few contiguous quadkey-prefix ranges (covering_ranges), which become
+                    range scans on the (status, tile, price_cents) index in the "tile" market mode.
+  search_prefixes – edge n-grams of the words in title, business_name and category, so
+                    GET /api/market/search can prefix-match typed words ("bag" → "bagels") with
+                    one multikey index lookup per term.
+
+Env vars:
+  MARKET_QUADKEY_ZOOM   – default: 18 (~120 m tiles at Boston's latitude)
+  MARKET_TILE_MAX_CELLS – most prefixes a bounding box is covered with, default: 16
+  SEARCH_MAX_PREFIX     – longest stored word prefix, default: 15
+"""
+import math
+import os
+import re
+import unicodedata
+from typing import Optional
+
+MARKET_QUADKEY_ZOOM = int(os.environ.get("MARKET_QUADKEY_ZOOM", 18))
+MARKET_TILE_MAX_CELLS = int(os.environ.get("MARKET_TILE_MAX_CELLS", 16))
+SEARCH_MAX_PREFIX = int(os.environ.get("SEARCH_MAX_PREFIX", 15))
+SEARCH_FIELDS = ("title", "business_name", "category")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_MAX_LAT = 85.05112878
+
+
+def _tile_xy(lng: float, lat: float, zoom: int) -> tuple[int, int]:
+    lat = min(max(lat, -_MAX_LAT), _MAX_LAT)
+    n = 1 << zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    s = math.sin(math.radians(lat))
+    y = int((0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _quadkey_xy(x: int, y: int, zoom: int) -> str:
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def quadkey(lng: float, lat: float, zoom: int = MARKET_QUADKEY_ZOOM) -> str:
+    return _quadkey_xy(*_tile_xy(lng, lat, zoom), zoom)
+
+
+def covering_ranges(
+    west: float, south: float, east: float, north: float,
+    zoom: int = MARKET_QUADKEY_ZOOM, max_cells: int = MARKET_TILE_MAX_CELLS,
+) -> list[tuple[str, str]]:
+    """
+    [lo, hi) string ranges on `tile` covering the box. Uses the deepest level whose covering
+    tiles number at most max_cells; prefixes adjacent in quadkey (Z-order) merge into one range.
+    """
+    for level in range(zoom, 0, -1):
+        x0, y0 = _tile_xy(west, north, level)
+        x1, y1 = _tile_xy(east, south, level)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= max_cells:
+            break
+    prefixes = sorted(_quadkey_xy(x, y, level) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    ranges: list[tuple[str, str]] = []
+    prev: Optional[int] = None
+    for prefix in prefixes:
+        value = int(prefix, 4)
+        if prev is not None and value == prev + 1:
+            ranges[-1] = (ranges[-1][0], prefix + "4")
+        else:
+            # "4" sorts after every quadkey digit, so prefix + "4" bounds all keys under prefix
+            ranges.append((prefix, prefix + "4"))
+        prev = value
+    return ranges
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase ASCII words; accents are folded ("Café" → "cafe")."""
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return _WORD.findall(folded)
+
+
+def search_prefixes(doc: dict) -> list[str]:
+    prefixes: set[str] = set()
+    for field in SEARCH_FIELDS:
+        for word in tokenize(doc.get(field) or ""):
+            prefixes.update(word[:n] for n in range(1, min(len(word), SEARCH_MAX_PREFIX) + 1))
+    return sorted(prefixes)
+
+
+SNAPSHOT_FIELDS = ("title", "business_name", "price_cents", "pickup_start", "pickup_end", "address", "category")
+
+
+def listing_snapshot(doc: dict) -> dict:
+    return {field: doc.get(field) for field in SNAPSHOT_FIELDS}
+
+
+def derive_listing_fields(doc: dict) -> dict:
+    """Derived fields for a listing doc (only those whose inputs are present)."""
+    out: dict = {}
+    location = doc.get("location")
+    if location and location.get("coordinates"):
+        lng, lat = location["coordinates"][:2]
+        out["tile"] = quadkey(lng, lat)
+    if any(doc.get(field) for field in SEARCH_FIELDS):
+        out["search_prefixes"] = search_prefixes(doc)
+    return out
@@ -0,0 +1,112 @@
+"""
+Closing and deleting listings with their dependents, in one server-side batch:
+
+  - reserved orders → "canceled" (cancel_reason "listing_closed" / "listing_deleted");
+  - planned donations → "voided", subtracted again from the impact rollups;
+  - listings → status "closed" and donation_mode "voided" (so /api/simulation and a queued
+    donation_plan job skip them), or deleted.
+
+Each collection gets one multi-document write for the whole set of listings. The listings are
+written first, so a new reservation finds the listing closed. A reserve that took its unit just
+before that may insert its order after the cascade's order write; reserve re-reads the listing
+after the insert and cancels that order itself (routers/orders.py). The writes run in a
+transaction when the deployment supports it (replica set / mongos), retried on transient errors
+such as a write conflict with a concurrent reserve; on a standalone mongod they run in the same
+order without one. Either way the market cache is invalidated and the rollups are adjusted after
+the writes succeed.
+
+Env vars:
+  MONGO_TRANSACTIONS – use transactions when the server supports them, default: 1
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import OperationFailure
+
+from services.market_cache import invalidate as invalidate_market
+from services.rollups import record_donations
+
+logger = logging.getLogger(__name__)
+
+MONGO_TRANSACTIONS = os.environ.get("MONGO_TRANSACTIONS", "1") not in ("0", "false", "False")
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos"
+_ILLEGAL_OPERATION = 20
+
+# None until the first attempt tells us whether the server supports transactions
+_transactions_supported: Optional[bool] = None if MONGO_TRANSACTIONS else False
+
+
+async def _cascade(db, listings: list[dict], delete: bool, now: str, session=None) -> dict:
+    str_ids = [str(d["_id"]) for d in listings]
+    oids = [d["_id"] for d in listings]
+    if delete:
+        result = await db.listings.delete_many({"_id": {"$in": oids}}, session=session)
+        changed = result.deleted_count
+    else:
+        result = await db.listings.update_many(
+            {"_id": {"$in": oids}, "status": {"$ne": "closed"}},
+            {"$set": {"status": "closed", "closed_at": now, "donation_mode": "voided"}},
+            session=session,
+        )
+        changed = result.modified_count
+    orders = await db.orders.update_many(
+        {"listing_id": {"$in": str_ids}, "status": "reserved"},
+        {"$set": {
+            "status": "canceled",
+            "canceled_at": now,
+            "cancel_reason": "listing_deleted" if delete else "listing_closed",
+        }},
+        session=session,
+    )
+    voided = await db.donations.find(
+        {"listing_id": {"$in": str_ids}, "status": "planned"}, session=session,
+    ).to_list(length=None)
+    if voided:
+        await db.donations.update_many(
+            {"_id": {"$in": [d["_id"] for d in voided]}, "status": "planned"},
+            {"$set": {"status": "voided", "voided_at": now}},
+            session=session,
+        )
+    return {
+        "listings": changed,
+        "orders_canceled": orders.modified_count,
+        "donations_voided": len(voided),
+        "units_voided": sum(d.get("qty", 0) for d in voided),
+        "_voided": voided,
+    }
+
+
+async def _run(db, listings: list[dict], delete: bool, now: str) -> dict:
+    global _transactions_supported
+    if _transactions_supported is not False:
+        try:
+            async with await db.client.start_session() as session:
+                result = await session.with_transaction(
+                    lambda s: _cascade(db, listings, delete, now, session=s),
+                )
+            _transactions_supported = True
+            return result
+        except OperationFailure as exc:
+            if exc.code != _ILLEGAL_OPERATION:
+                raise
+            _transactions_supported = False
+            logger.info("Transactions unavailable (standalone server); cascading without one")
+    return await _cascade(db, listings, delete, now)
+
+
+async def close_listings(db, filter: dict, delete: bool = False) -> dict:
+    """
+    Close (or delete) every listing matching filter and cascade to its orders and donations.
+    Returns counts: listings, orders_canceled, donations_voided, units_voided.
+    """
+    listings = await db.listings.find(filter, {"location": 1}).to_list(length=None)
+    if not listings:
+        return {"listings": 0, "orders_canceled": 0, "donations_voided": 0, "units_voided": 0}
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    result = await _run(db, listings, delete, now)
+    await record_donations(db, result.pop("_voided"), sign=-1)
+    for doc in listings:
+        invalidate_market(doc["_id"], doc.get("location"))
+    return result
@@ -0,0 +1,48 @@
+"""
+Listing search for GET /api/market/search.
+
+Candidates come from Mongo: every query word must be a stored prefix of some word in the listing
+(search_prefixes $all, on the (status, search_prefixes) multikey index), combined with the usual
+market filters. Ranking happens in memory on that small set:
+  - a word matching a title word outranks business_name, which outranks category;
+  - a whole-word match outranks a prefix match;
+  - ties go to the cheaper listing.
+"""
+from services.listing_fields import SEARCH_MAX_PREFIX, tokenize
+
+# Per-field weight for one query word; whole-word matches get WHOLE_WORD_BONUS on top
+FIELD_WEIGHTS = {"title": 3.0, "business_name": 2.0, "category": 1.0}
+WHOLE_WORD_BONUS = 0.5
+
+
+def query_terms(q: str) -> list[str]:
+    """Distinct query words, cut to the longest stored prefix so long words still match."""
+    terms: list[str] = []
+    for word in tokenize(q):
+        term = word[:SEARCH_MAX_PREFIX]
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def score(doc: dict, terms: list[str]) -> float:
+    words = {field: tokenize(doc.get(field) or "") for field in FIELD_WEIGHTS}
+    total = 0.0
+    for term in terms:
+        best = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in words[field]:
+                if not word.startswith(term):
+                    continue
+                # A term cut at SEARCH_MAX_PREFIX counts as whole when the word shares all of it
+                whole = word == term or len(term) == SEARCH_MAX_PREFIX
+                best = max(best, weight + (WHOLE_WORD_BONUS if whole else 0.0))
+        total += best
+    return round(total, 3)
+
+
+def rank(docs: list[dict], terms: list[str]) -> list[dict]:
+    """Docs with a "score" field, best first."""
+    scored = [{**doc, "score": score(doc, terms)} for doc in docs]
+    scored.sort(key=lambda d: (-d["score"], d.get("price_cents", 0)))
+    return scored
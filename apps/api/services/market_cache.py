@@ -0,0 +1,236 @@
+"""
+In-process cache for GET /api/market viewports.
+
+Bounds are snapped to a lat/lng tile grid (MARKET_TILE_DEG). Each cached entry is the open-listing
+set of one tile for one normalized filter key (price range, category). A request:
+  1. lists the tiles covering its viewport;
+  2. fetches every missing tile with one query over their bounding rectangle and buckets the rows;
+  3. assembles the response from the tile sets, clipped to the exact viewport, with open_now
+     applied in memory (pickup windows move with the clock, so they are not part of the key).
+Panning and zooming within already-seen tiles is served from memory.
+
+Writes that change what the market shows call invalidate() with the listing id and/or location;
+every filter key cached for that tile is dropped. The cache is per process, so other workers only
+see a change once MARKET_CACHE_TTL_S expires.
+
+Env vars:
+  MARKET_CACHE_ENABLED    – default: 1
+  MARKET_TILE_DEG         – tile size in degrees, default: 0.01 (~1.1 km north-south)
+  MARKET_CACHE_TTL_S      – default: 30
+  MARKET_CACHE_SIZE       – tile entries kept (LRU), default: 4096
+  MARKET_CACHE_MAX_TILES  – viewports covering more tiles skip the cache, default: 64
+"""
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+MARKET_CACHE_ENABLED = os.environ.get("MARKET_CACHE_ENABLED", "1") in ("1", "true", "True")
+MARKET_TILE_DEG = float(os.environ.get("MARKET_TILE_DEG", 0.01))
+MARKET_CACHE_TTL_S = float(os.environ.get("MARKET_CACHE_TTL_S", 30))
+MARKET_CACHE_SIZE = int(os.environ.get("MARKET_CACHE_SIZE", 4096))
+MARKET_CACHE_MAX_TILES = int(os.environ.get("MARKET_CACHE_MAX_TILES", 64))
+
+Tile = tuple[int, int]
+# (sw_lng, sw_lat, ne_lng, ne_lat)
+Bounds = tuple[float, float, float, float]
+FilterKey = tuple
+
+
+def filter_key(min_price_cents: Optional[int], max_price_cents: Optional[int], category: Optional[str]) -> FilterKey:
+    return (min_price_cents, max_price_cents, category or None)
+
+
+def tile_of(lng: float, lat: float, deg: float = MARKET_TILE_DEG) -> Tile:
+    return (math.floor(lng / deg), math.floor(lat / deg))
+
+
+def _coords(doc: dict) -> Optional[tuple[float, float]]:
+    location = doc.get("location")
+    if location and location.get("coordinates"):
+        lng, lat = location["coordinates"][:2]
+        return lng, lat
+    return None
+
+
+def is_open_now(doc: dict, now: str) -> bool:
+    """Same comparison the Mongo filter uses (ISO strings)."""
+    start, end = doc.get("pickup_start"), doc.get("pickup_end")
+    return start is not None and end is not None and start <= now <= end
+
+
+class MarketCache:
+    def __init__(
+        self,
+        tile_deg: float = MARKET_TILE_DEG,
+        ttl_s: float = MARKET_CACHE_TTL_S,
+        max_entries: int = MARKET_CACHE_SIZE,
+        max_tiles: int = MARKET_CACHE_MAX_TILES,
+    ):
+        self.tile_deg = tile_deg
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_tiles = max_tiles
+        self._entries: OrderedDict[tuple[Tile, FilterKey], tuple[float, list[dict]]] = OrderedDict()
+        self._keys_by_tile: dict[Tile, set[FilterKey]] = {}
+        self._tile_by_listing: dict[str, Tile] = {}
+        self._listings_by_tile: dict[Tile, set[str]] = {}
+        # Bumped per tile on invalidation (and globally on clear); a fill only caches the tiles
+        # whose counter did not move while it ran. Counters are dropped when no fill is in flight.
+        self._generation = 0
+        self._tile_generation: dict[Tile, int] = {}
+        self._fills_in_flight = 0
+        self.stats = {"tile_hits": 0, "tile_misses": 0, "queries": 0, "bypass": 0, "invalidations": 0}
+
+    def tiles_for(self, bounds: Bounds) -> tuple[range, range]:
+        sw_lng, sw_lat, ne_lng, ne_lat = bounds
+        x0, y0 = tile_of(sw_lng, sw_lat, self.tile_deg)
+        x1, y1 = tile_of(ne_lng, ne_lat, self.tile_deg)
+        return range(x0, x1 + 1), range(y0, y1 + 1)
+
+    def _get(self, tile: Tile, fkey: FilterKey, now: float) -> Optional[list[dict]]:
+        entry = self._entries.get((tile, fkey))
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._drop((tile, fkey))
+            return None
+        self._entries.move_to_end((tile, fkey))
+        return entry[1]
+
+    def _put(self, tile: Tile, fkey: FilterKey, docs: list[dict], now: float) -> None:
+        self._entries[(tile, fkey)] = (now + self.ttl_s, docs)
+        self._entries.move_to_end((tile, fkey))
+        self._keys_by_tile.setdefault(tile, set()).add(fkey)
+        ids = self._listings_by_tile.setdefault(tile, set())
+        for doc in docs:
+            self._tile_by_listing[doc["id"]] = tile
+            ids.add(doc["id"])
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: tuple[Tile, FilterKey]) -> None:
+        self._entries.pop(key, None)
+        tile, fkey = key
+        keys = self._keys_by_tile.get(tile)
+        if keys is not None:
+            keys.discard(fkey)
+            if not keys:
+                del self._keys_by_tile[tile]
+                self._forget_listings(tile)
+
+    def _forget_listings(self, tile: Tile) -> None:
+        """No entry of this tile is cached any more: its listing→tile lookups go too."""
+        for listing_id in self._listings_by_tile.pop(tile, ()):
+            if self._tile_by_listing.get(listing_id) == tile:
+                del self._tile_by_listing[listing_id]
+
+    def invalidate_tile(self, tile: Tile) -> None:
+        for fkey in self._keys_by_tile.pop(tile, ()):
+            self._entries.pop((tile, fkey), None)
+        self._forget_listings(tile)
+        if self._fills_in_flight:
+            self._tile_generation[tile] = self._tile_generation.get(tile, 0) + 1
+        self.stats["invalidations"] += 1
+
+    def invalidate(self, listing_id=None, location: Optional[dict] = None) -> None:
+        """Drop the tile a listing was cached in and the tile of its (new) location."""
+        if listing_id is not None:
+            tile = self._tile_by_listing.pop(str(listing_id), None)
+            if tile is not None:
+                self.invalidate_tile(tile)
+        coords = _coords({"location": location}) if location else None
+        if coords is not None:
+            self.invalidate_tile(tile_of(*coords, self.tile_deg))
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_tile.clear()
+        self._tile_by_listing.clear()
+        self._listings_by_tile.clear()
+
+    async def query(
+        self,
+        bounds: Bounds,
+        fkey: FilterKey,
+        open_now: bool,
+        fetch: Callable[[Bounds], Awaitable[list[dict]]],
+        fill: Optional[Callable[[Bounds], Awaitable[list[dict]]]] = None,
+    ) -> list[dict]:
+        """
+        Listings inside bounds for one filter key. fetch(rect) runs the uncached query for a
+        rectangle and returns response dicts (with "id" and "location"); fill(rect), when given,
+        is used instead for queries whose rows get cached (e.g. a read from the primary).
+        """
+        xs, ys = self.tiles_for(bounds)
+        if len(xs) * len(ys) > self.max_tiles:
+            self.stats["bypass"] += 1
+            docs = await fetch(bounds)
+        else:
+            now = time.monotonic()
+            found: dict[Tile, list[dict]] = {}
+            missing: list[Tile] = []
+            for x in xs:
+                for y in ys:
+                    docs = self._get((x, y), fkey, now)
+                    if docs is None:
+                        missing.append((x, y))
+                    else:
+                        found[(x, y)] = docs
+            self.stats["tile_hits"] += len(found)
+            self.stats["tile_misses"] += len(missing)
+            if missing:
+                found.update(await self._fill(missing, fkey, fill or fetch))
+            docs = [doc for tile_docs in found.values() for doc in tile_docs]
+
+        sw_lng, sw_lat, ne_lng, ne_lat = bounds
+        clock = datetime.utcnow().isoformat() + "Z"
+        out = []
+        for doc in docs:
+            coords = _coords(doc)
+            if coords is None or not (sw_lng <= coords[0] <= ne_lng and sw_lat <= coords[1] <= ne_lat):
+                continue
+            if open_now and not is_open_now(doc, clock):
+                continue
+            out.append(doc)
+        return out
+
+    async def _fill(self, missing: list[Tile], fkey: FilterKey, fetch) -> dict[Tile, list[dict]]:
+        """One query over the rectangle spanning the missing tiles; every tile in it is cached."""
+        x0, x1 = min(t[0] for t in missing), max(t[0] for t in missing)
+        y0, y1 = min(t[1] for t in missing), max(t[1] for t in missing)
+        d = self.tile_deg
+        self.stats["queries"] += 1
+        buckets: dict[Tile, list[dict]] = {(x, y): [] for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)}
+        generation = self._generation
+        before = {tile: self._tile_generation.get(tile, 0) for tile in buckets}
+        self._fills_in_flight += 1
+        try:
+            rows = await fetch((x0 * d, y0 * d, (x1 + 1) * d, (y1 + 1) * d))
+        finally:
+            self._fills_in_flight -= 1
+        changed = {tile for tile, gen in before.items() if self._tile_generation.get(tile, 0) != gen}
+        if not self._fills_in_flight:
+            self._tile_generation.clear()
+        for doc in rows:
+            coords = _coords(doc)
+            if coords is not None:
+                tile = tile_of(*coords, d)
+                if tile in buckets:
+                    buckets[tile].append(doc)
+        if generation == self._generation:
+            now = time.monotonic()
+            for tile, docs in buckets.items():
+                if tile not in changed:
+                    self._put(tile, fkey, docs, now)
+        return {tile: buckets[tile] for tile in missing}
+
+
+market_cache = MarketCache()
+
+
+def invalidate(listing_id=None, location: Optional[dict] = None) -> None:
+    market_cache.invalidate(listing_id=listing_id, location=location)
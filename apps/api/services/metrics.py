@@ -0,0 +1,319 @@
+"""
+In-process metrics with Prometheus text exposition (GET /metrics).
+
+- MetricsMiddleware: per-route request histograms (route template, not raw path).
+- MongoCommandListener: pymongo command timings per command and collection (attached to the
+  Motor clients in database.py).
+- MongoPoolListener: per-profile pool checkout wait, checkout failures, in-use connections and
+  saturation (in use / maxPoolSize).
+- track_outbound(): timings for OSRM, Nominatim and Gemini calls.
+
+Observing a value is a bisect plus a few increments under a lock (pymongo listeners run on
+Motor's worker threads), cheap enough to leave on under full load.
+
+Env vars:
+  METRICS_ENABLED – default: 1 (set 0 to skip the middleware and Mongo listener)
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from pymongo import monitoring
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for labelvalues, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items)
+        return lines
+
+
+class CallbackGauge:
+    """Gauge read at scrape time; fn returns {labelvalues_tuple: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, fn: Callable[[], dict]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.fn = fn
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        lines.extend(f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self.fn().items()))
+        return lines
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "replate_http_request_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "replate_mongo_command_seconds", "MongoDB command latency by command and collection",
+    ("command", "collection"),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "replate_mongo_command_failures_total", "Failed MongoDB commands",
+    ("command", "collection"),
+)
+MONGO_POOL_CHECKOUT_SECONDS = Histogram(
+    "replate_mongo_pool_checkout_seconds", "Time waiting for a pooled MongoDB connection by client profile",
+    ("profile",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "replate_mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts (e.g. wait queue timeout)",
+    ("profile", "reason"),
+)
+OUTBOUND_SECONDS = Histogram(
+    "replate_outbound_request_seconds", "Outbound HTTP call latency by service and outcome",
+    ("service", "operation", "outcome"),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; labels by the matched route template so cardinality stays bounded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status[0]),
+            )
+
+
+# Handshake/heartbeat chatter that would only add noise
+_IGNORED_COMMANDS = frozenset({"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"})
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._inflight: dict[tuple, str] = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        if event.command_name == "getMore":
+            collection = event.command.get("collection", "")
+        else:
+            collection = event.command.get(event.command_name, "")
+        self._inflight[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def succeeded(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, collection)
+
+    def failed(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, collection)
+            MONGO_COMMAND_FAILURES.inc(event.command_name, collection)
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Pool gauges for one client profile; counts are summed over all servers in the pool."""
+
+    def __init__(self, profile: str, max_pool_size: int):
+        self.profile = profile
+        self.max_pool_size = max_pool_size
+        self.in_use = 0
+        self.open = 0
+        self.waiting = 0
+        self._lock = threading.Lock()
+        _pool_listeners.append(self)
+
+    def _add(self, attr: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, attr, max(0, getattr(self, attr) + delta))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        self._add("waiting", -1)
+        MONGO_POOL_CHECKOUT_FAILURES.inc(self.profile, str(event.reason))
+
+    def connection_checked_out(self, event):
+        self._add("waiting", -1)
+        self._add("in_use", 1)
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_SECONDS.observe(event.duration, self.profile)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "open": self.open,
+                "waiting": self.waiting,
+                "max_pool_size": self.max_pool_size,
+                "saturation": round(self.in_use / self.max_pool_size, 3) if self.max_pool_size else 0.0,
+            }
+
+
+_pool_listeners: list[MongoPoolListener] = []
+
+
+def pool_stats() -> dict[str, dict]:
+    return {listener.profile: listener.stats() for listener in _pool_listeners}
+
+
+def _pool_gauge(key: str) -> Callable[[], dict]:
+    return lambda: {(profile,): s[key] for profile, s in pool_stats().items()}
+
+
+CallbackGauge(
+    "replate_mongo_pool_in_use", "Checked-out MongoDB connections by client profile",
+    ("profile",), _pool_gauge("in_use"),
+)
+CallbackGauge(
+    "replate_mongo_pool_waiting", "Operations waiting for a MongoDB connection by client profile",
+    ("profile",), _pool_gauge("waiting"),
+)
+CallbackGauge(
+    "replate_mongo_pool_saturation", "Checked-out connections / maxPoolSize by client profile",
+    ("profile",), _pool_gauge("saturation"),
+)
+
+
+@asynccontextmanager
+async def track_outbound(service: str, operation: str):
+    """Time an outbound call; outcome is 'error' if the block raises."""
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OUTBOUND_SECONDS.observe(time.perf_counter() - start, service, operation, outcome)
+
+
+def event_listeners(profile: str = "default", max_pool_size: int = 100) -> list:
+    if not METRICS_ENABLED:
+        return []
+    return [mongo_command_listener, MongoPoolListener(profile, max_pool_size)]
@@ -0,0 +1,181 @@
+"""
+Food-insecurity raster: SNAP rates interpolated onto a lat/lng grid by scripts/build_need_raster.py.
+
+The file is a fixed header followed by one uint8 per cell (rows north → south); 255 is nodata
+and other values are snap_rate / scale. It is memory-mapped once, so need_at() is index
+arithmetic plus one byte read, and heatmap tiles are rendered from the same bytes (or read from
+the pre-rendered tile directory) as 256×256 RGBA PNGs.
+
+Env vars:
+  NEED_RASTER_PATH  – default: food_data/need_raster.bin
+  NEED_TILES_DIR    – pre-rendered tiles, default: food_data/need_tiles
+  NEED_TILE_CACHE   – rendered tiles kept in memory, default: 512
+"""
+import logging
+import math
+import mmap
+import os
+import struct
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+API_DIR = Path(__file__).parent.parent
+NEED_RASTER_PATH = Path(os.environ.get("NEED_RASTER_PATH", API_DIR / "food_data" / "need_raster.bin"))
+NEED_TILES_DIR = Path(os.environ.get("NEED_TILES_DIR", API_DIR / "food_data" / "need_tiles"))
+NEED_TILE_CACHE = int(os.environ.get("NEED_TILE_CACHE", 512))
+
+MAGIC = b"NRST"
+VERSION = 1
+# magic, version, width, height, west, north, cell_deg, scale
+HEADER = struct.Struct("<4sHII3df")
+NODATA = 255
+TILE_SIZE = 256
+MAX_ZOOM = 20
+
+# Heat ramp stops (value fraction, r, g, b, a); snap rates at or above NEED_TILE_SATURATION are red
+NEED_TILE_SATURATION = float(os.environ.get("NEED_TILE_SATURATION", 0.4))
+_RAMP = (
+    (0.0, 255, 255, 204, 40),
+    (0.35, 254, 217, 118, 110),
+    (0.65, 253, 141, 60, 160),
+    (1.0, 189, 0, 38, 200),
+)
+
+
+def _ramp_color(frac: float) -> bytes:
+    frac = min(max(frac, 0.0), 1.0)
+    for (f0, *c0), (f1, *c1) in zip(_RAMP, _RAMP[1:]):
+        if frac <= f1:
+            t = (frac - f0) / (f1 - f0)
+            return bytes(round(a + (b - a) * t) for a, b in zip(c0, c1))
+    return bytes(_RAMP[-1][1:])
+
+
+def _png(width: int, height: int, rows: list[bytes]) -> bytes:
+    """Minimal RGBA PNG (filter 0 on every row)."""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    raw = b"".join(b"\x00" + row for row in rows)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+@lru_cache(maxsize=1)
+def empty_tile() -> bytes:
+    return _png(TILE_SIZE, TILE_SIZE, [bytes(TILE_SIZE * 4)] * TILE_SIZE)
+
+
+def tile_lng(x: float, z: int) -> float:
+    return x / (1 << z) * 360.0 - 180.0
+
+
+def tile_lat(y: float, z: int) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << z)))))
+
+
+class NeedRaster:
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.west, self.north, self.cell_deg, self.scale = (
+            HEADER.unpack_from(self._mm, 0)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a need raster (v{VERSION})")
+        if len(self._mm) < HEADER.size + self.width * self.height:
+            raise ValueError(f"{path} is truncated")
+        self.east = self.west + self.width * self.cell_deg
+        self.south = self.north - self.height * self.cell_deg
+        self.data = memoryview(self._mm)[HEADER.size:HEADER.size + self.width * self.height]
+        # Changes whenever the raster is rebuilt; used for tile ETags
+        self.etag = f"{zlib.crc32(self._mm):08x}"
+        self._lut = [_ramp_color(v * self.scale / NEED_TILE_SATURATION) for v in range(NODATA)] + [bytes(4)]
+        self.tile = lru_cache(maxsize=NEED_TILE_CACHE)(self._tile)
+
+    def value_at(self, lng: float, lat: float) -> Optional[float]:
+        col = int((lng - self.west) / self.cell_deg)
+        row = int((self.north - lat) / self.cell_deg)
+        if not (0 <= col < self.width and 0 <= row < self.height) or lng < self.west or lat > self.north:
+            return None
+        v = self.data[row * self.width + col]
+        return None if v == NODATA else v * self.scale
+
+    def tile_in_bounds(self, z: int, x: int, y: int) -> bool:
+        return (
+            tile_lng(x + 1, z) > self.west and tile_lng(x, z) < self.east
+            and tile_lat(y, z) > self.south and tile_lat(y + 1, z) < self.north
+        )
+
+    def render_tile(self, z: int, x: int, y: int) -> bytes:
+        """Nearest-cell heatmap tile; transparent where there is no data."""
+        if not self.tile_in_bounds(z, x, y):
+            return empty_tile()
+        cols = []
+        for px in range(TILE_SIZE):
+            c = math.floor((tile_lng(x + (px + 0.5) / TILE_SIZE, z) - self.west) / self.cell_deg)
+            cols.append(c if 0 <= c < self.width else -1)
+        lut, data, width = self._lut, self.data, self.width
+        blank = bytes(TILE_SIZE * 4)
+        rows = []
+        for py in range(TILE_SIZE):
+            r = math.floor((self.north - tile_lat(y + (py + 0.5) / TILE_SIZE, z)) / self.cell_deg)
+            if not 0 <= r < self.height:
+                rows.append(blank)
+                continue
+            base = r * width
+            rows.append(b"".join(lut[data[base + c]] if c >= 0 else lut[NODATA] for c in cols))
+        return _png(TILE_SIZE, TILE_SIZE, rows)
+
+    def _tile(self, z: int, x: int, y: int) -> bytes:
+        prerendered = NEED_TILES_DIR / str(z) / str(x) / f"{y}.png"
+        if prerendered.is_file():
+            return prerendered.read_bytes()
+        return self.render_tile(z, x, y)
+
+    def close(self) -> None:
+        self.data.release()
+        self._mm.close()
+        self._file.close()
+
+
+_raster: Optional[NeedRaster] = None
+_load_attempted = False
+
+
+def load_raster(path: Path = NEED_RASTER_PATH) -> Optional[NeedRaster]:
+    """Memory-map the raster (called at startup). Returns None if it has not been built."""
+    global _raster, _load_attempted
+    _load_attempted = True
+    if _raster is not None:
+        _raster.close()
+        _raster = None
+    if not path.is_file():
+        logger.info("Need raster not found at %s; run scripts/build_need_raster.py", path)
+        return None
+    try:
+        _raster = NeedRaster(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load need raster %s: %s", path, e)
+    return _raster
+
+
+def get_raster() -> Optional[NeedRaster]:
+    if not _load_attempted:
+        load_raster()
+    return _raster
+
+
+def need_at(lng: float, lat: float) -> Optional[float]:
+    """Interpolated SNAP rate at a point, or None outside the raster / when it is not built."""
+    raster = get_raster()
+    return raster.value_at(lng, lat) if raster is not None else None
@@ -0,0 +1,179 @@
+"""
+No-show sweeper: reserved orders whose pickup window ended NO_SHOW_GRACE_MIN ago become "no_show",
+and their units go back to the listing.
+
+Orders are found through the (status, listing_snapshot.pickup_end) index, so the sweep never scans
+settled orders. Legacy orders without a snapshot are not seen until
+scripts/backfill_order_snapshots.py has run. Extending a listing's pickup window (PATCH) updates
+the snapshots of its reserved orders; as a backstop, each batch re-reads the live listings, and
+orders whose listing window has not ended get their snapshot refreshed instead of expiring. Per batch:
+  - one bulk_write marks the orders no_show (guarded on status "reserved", so a pickup scan that
+    lands first wins), stamped with this sweep's no_show_at to re-read exactly the ones it moved;
+  - one bulk_write of grouped $inc per parent listing returns the units. If the listing's pickup
+    window is still open by the time of the restock, it is reopened for sale; otherwise it is
+    "closed".
+  - no-shows are added to the business rollups (services/rollups.py).
+
+no_show_sweeper.start(db) runs sweep_no_shows every NO_SHOW_INTERVAL_S; POST /api/orders/no-show-sweep
+runs one sweep on demand.
+
+Env vars:
+  NO_SHOW_ENABLED     – run the in-process scheduler, default: 1
+  NO_SHOW_INTERVAL_S  – seconds between sweeps, default: 300
+  NO_SHOW_GRACE_MIN   – minutes after pickup_end before a reservation is a no-show, default: 15
+  NO_SHOW_BATCH       – orders per batch, default: 500
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from services.market_cache import invalidate as invalidate_market
+from services.rollups import record_no_shows
+
+logger = logging.getLogger(__name__)
+
+NO_SHOW_ENABLED = os.environ.get("NO_SHOW_ENABLED", "1") not in ("0", "false", "False")
+NO_SHOW_INTERVAL_S = float(os.environ.get("NO_SHOW_INTERVAL_S", 300))
+NO_SHOW_GRACE_MIN = float(os.environ.get("NO_SHOW_GRACE_MIN", 15))
+NO_SHOW_BATCH = int(os.environ.get("NO_SHOW_BATCH", 500))
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+async def _restock(db, counts: Counter, now_iso: str) -> dict:
+    """One $inc per listing; exactly one of the two pickup_end-guarded ops matches each listing."""
+    ops = []
+    oids = []
+    for listing_id, n in counts.items():
+        try:
+            oid = ObjectId(listing_id)
+        except Exception:
+            continue
+        oids.append(oid)
+        ops.append(UpdateOne(
+            {"_id": oid, "pickup_end": {"$gt": now_iso}, "status": {"$in": ["open", "sold_out"]}},
+            {"$inc": {"qty_available": n, "no_show_count": n}, "$set": {"status": "open"}},
+        ))
+        ops.append(UpdateOne(
+            {"_id": oid, "pickup_end": {"$lte": now_iso}},
+            {"$inc": {"qty_available": n, "no_show_count": n}, "$set": {"status": "closed"}},
+        ))
+    if not ops:
+        return {"listings": 0}
+    result = await db.listings.bulk_write(ops, ordered=False)
+    # By location: a sold-out listing is in no cached tile, so its id alone finds nothing to drop
+    async for doc in db.listings.find({"_id": {"$in": oids}}, {"location": 1}):
+        invalidate_market(doc["_id"], doc.get("location"))
+    return {"listings": result.modified_count}
+
+
+async def _drop_extended(db, docs: list[dict], cutoff: str) -> list[dict]:
+    """
+    Orders whose live listing window still runs past cutoff get its window copied into their
+    snapshot (so the next find skips them); the rest are returned for expiry.
+    """
+    oids = set()
+    for d in docs:
+        try:
+            oids.add(ObjectId(d["listing_id"]))
+        except Exception:
+            pass
+    windows = {
+        str(l["_id"]): l
+        async for l in db.listings.find(
+            {"_id": {"$in": list(oids)}, "pickup_end": {"$gte": cutoff}},
+            {"pickup_start": 1, "pickup_end": 1},
+        )
+    }
+    if not windows:
+        return docs
+    await db.orders.bulk_write(
+        [
+            UpdateOne(
+                {"_id": d["_id"], "status": "reserved"},
+                {"$set": {
+                    "listing_snapshot.pickup_start": windows[str(d["listing_id"])].get("pickup_start"),
+                    "listing_snapshot.pickup_end": windows[str(d["listing_id"])]["pickup_end"],
+                }},
+            )
+            for d in docs if str(d.get("listing_id")) in windows
+        ],
+        ordered=False,
+    )
+    return [d for d in docs if str(d.get("listing_id")) not in windows]
+
+
+async def sweep_no_shows(db, batch_size: int = NO_SHOW_BATCH, grace_min: float = NO_SHOW_GRACE_MIN) -> dict:
+    now = datetime.now(timezone.utc)
+    # Unique per sweep (microseconds), so the re-read only sees orders this sweep moved
+    stamp = _iso(now)
+    cutoff = _iso(now - timedelta(minutes=grace_min))
+    t0 = time.perf_counter()
+    orders = listings = 0
+    while True:
+        docs = await db.orders.find(
+            {"status": "reserved", "listing_snapshot.pickup_end": {"$lt": cutoff}},
+            {"_id": 1, "listing_id": 1},
+        ).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        docs = await _drop_extended(db, docs, cutoff)
+        if not docs:
+            continue
+        ids = [d["_id"] for d in docs]
+        await db.orders.bulk_write(
+            [
+                UpdateOne({"_id": i, "status": "reserved"}, {"$set": {"status": "no_show", "no_show_at": stamp}})
+                for i in ids
+            ],
+            ordered=False,
+        )
+        moved = await db.orders.find(
+            {"_id": {"$in": ids}, "status": "no_show", "no_show_at": stamp},
+            {"listing_id": 1, "business_id": 1, "no_show_at": 1},
+        ).to_list(length=len(ids))
+        counts = Counter(str(o["listing_id"]) for o in moved)
+        listings += (await _restock(db, counts, stamp))["listings"]
+        await record_no_shows(db, moved)
+        orders += len(moved)
+    return {"orders": orders, "listings": listings, "seconds": round(time.perf_counter() - t0, 2)}
+
+
+class NoShowSweeper:
+    """Runs sweep_no_shows on an interval in this process; concurrent sweeps elsewhere are harmless."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    def start(self, db, interval_s: float = NO_SHOW_INTERVAL_S) -> None:
+        if self._task is None and NO_SHOW_ENABLED:
+            self._task = asyncio.create_task(self._run(db, interval_s))
+
+    async def _run(self, db, interval_s: float) -> None:
+        while True:
+            try:
+                self.last_run = await sweep_no_shows(db)
+                if self.last_run["orders"]:
+                    logger.info("No-show sweep: %s", self.last_run)
+            except Exception:
+                logger.exception("No-show sweep failed")
+            await asyncio.sleep(interval_s)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+no_show_sweeper = NoShowSweeper()
@@ -2,15 +2,31 @@
 OSRM client (async, httpx).
 Uses the Table API for many-to-one duration matrices and Route API as a single-pair fallback.
 
+Resilience: every call honours an optional deadline (time.monotonic() value) propagated from
+the endpoint, a circuit breaker short-circuits to the caller's fallback after repeated
+failures, a hedged second request is sent once the primary exceeds the recent p95 latency,
+and a semaphore caps concurrent upstream requests. See osrm_status().
+
 Env vars:
-  OSRM_BASE_URL  – default: http://router.project-osrm.org
-  OSRM_PROFILE   – default: driving
+  OSRM_BASE_URL          – default: http://router.project-osrm.org
+  OSRM_PROFILE           – default: driving
+  OSRM_MAX_CONCURRENCY   – default: 8
+  OSRM_BREAKER_FAILURES  – consecutive failures before the breaker opens, default: 5
+  OSRM_BREAKER_RESET_S   – seconds before a half-open trial request, default: 30
+  OSRM_HEDGE_DELAY_S     – hedge delay until enough latency samples exist, default: 1.0
+  OSRM_MAX_TABLE_COORDS  – max coordinates per Table request, default: 100
 """
+import asyncio
 import os
 import logging
-from typing import Optional
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Optional
+
+from services.metrics import CallbackGauge, track_outbound
 
-import httpx
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
@@ -20,33 +36,268 @@ OSRM_PROFILE = os.environ.get("OSRM_PROFILE", "driving")
 TIMEOUT = 5.0
 RETRIES = 1
 
+OSRM_MAX_CONCURRENCY = int(os.environ.get("OSRM_MAX_CONCURRENCY", 8))
+OSRM_BREAKER_FAILURES = int(os.environ.get("OSRM_BREAKER_FAILURES", 5))
+OSRM_BREAKER_RESET_S = float(os.environ.get("OSRM_BREAKER_RESET_S", 30))
+OSRM_HEDGE_DELAY_S = float(os.environ.get("OSRM_HEDGE_DELAY_S", 1.0))
+# Coordinates per Table request (the public demo server rejects more than 100)
+OSRM_MAX_TABLE_COORDS = int(os.environ.get("OSRM_MAX_TABLE_COORDS", 100))
+
+# Hedge at observed p95 only once we have this many samples
+_MIN_HEDGE_SAMPLES = 20
+_MIN_HEDGE_DELAY_S = 0.05
+
+
+class CircuitBreaker:
+    """closed → open after N consecutive failures → half_open (one trial) after reset_seconds."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+            logger.info("OSRM circuit half-open; sending trial request")
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("OSRM circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """The trial ended without an answer either way (cancelled); let the next call try."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("OSRM circuit open after %d failures", self.failures)
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+_breaker = CircuitBreaker(OSRM_BREAKER_FAILURES, OSRM_BREAKER_RESET_S)
+_semaphore: Optional[asyncio.Semaphore] = None
+_client: Optional["httpx.AsyncClient"] = None
+_latencies: deque = deque(maxlen=200)
+_stats = {
+    "requests": 0,
+    "failures": 0,
+    "short_circuited": 0,
+    "deadline_exceeded": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "in_flight": 0,
+}
+
+
+_BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+CallbackGauge(
+    "replate_osrm_breaker_state", "OSRM circuit breaker state (0 closed, 1 half_open, 2 open)",
+    (), lambda: {(): _BREAKER_STATE_VALUES[_breaker.state]},
+)
+CallbackGauge(
+    "replate_osrm_in_flight", "OSRM requests currently in flight",
+    (), lambda: {(): _stats["in_flight"]},
+)
+
 
 def _coord_str(lng: float, lat: float) -> str:
     return f"{lng},{lat}"
 
 
-async def _get(url: str, params: dict) -> Optional[dict]:
-    """GET with one retry on timeout/connection error."""
-    for attempt in range(RETRIES + 1):
+def _get_client() -> "httpx.AsyncClient":
+    global _client, _semaphore
+    if _client is None:
+        # httpx (and certifi) load on the first OSRM call, not at app import
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=OSRM_MAX_CONCURRENCY * 2),
+        )
+        _semaphore = asyncio.Semaphore(OSRM_MAX_CONCURRENCY)
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _hedge_delay() -> float:
+    if len(_latencies) < _MIN_HEDGE_SAMPLES:
+        return OSRM_HEDGE_DELAY_S
+    return max(_percentile(_latencies, 0.95), _MIN_HEDGE_DELAY_S)
+
+
+def _remaining(deadline: Optional[float]) -> float:
+    if deadline is None:
+        return TIMEOUT
+    return min(TIMEOUT, deadline - time.monotonic())
+
+
+def osrm_status() -> dict:
+    """Breaker state, latency percentiles (ms) and counters for observability endpoints."""
+    return {
+        "base_url": OSRM_BASE_URL,
+        "breaker": {
+            "state": _breaker.state,
+            "consecutive_failures": _breaker.failures,
+            "times_opened": _breaker.times_opened,
+            "open_for_s": (
+                round(time.monotonic() - _breaker.opened_at, 1)
+                if _breaker.state == "open" else None
+            ),
+        },
+        "latency_ms": {
+            "samples": len(_latencies),
+            "p50": _ms(_percentile(_latencies, 0.50)),
+            "p95": _ms(_percentile(_latencies, 0.95)),
+            "p99": _ms(_percentile(_latencies, 0.99)),
+        },
+        "hedge_delay_ms": _ms(_hedge_delay()),
+        "max_concurrency": OSRM_MAX_CONCURRENCY,
+        **_stats,
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+async def _attempt(url: str, params: dict, timeout: float) -> dict:
+    """One upstream request, holding a concurrency slot for its duration."""
+    client = _get_client()
+    operation = "table" if "/table/" in url else "route"
+    async with _semaphore:
+        _stats["in_flight"] += 1
+        _stats["requests"] += 1
+        t0 = time.monotonic()
         try:
-            async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-                r = await client.get(url, params=params)
+            async with track_outbound("osrm", operation):
+                r = await client.get(url, params=params, timeout=timeout)
                 r.raise_for_status()
-                return r.json()
-        except (httpx.TimeoutException, httpx.ConnectError) as e:
-            if attempt < RETRIES:
-                logger.warning("OSRM request failed (attempt %d): %s — retrying", attempt + 1, e)
-            else:
-                logger.error("OSRM request failed after %d attempts: %s", RETRIES + 1, e)
-        except httpx.HTTPStatusError as e:
-            logger.error("OSRM HTTP error: %s", e)
-            break
-    return None
+                data = r.json()
+        finally:
+            _stats["in_flight"] -= 1
+        _latencies.append(time.monotonic() - t0)
+        return data
+
+
+async def _hedged_get(url: str, params: dict, budget: float) -> dict:
+    """Primary request; if it is still pending after the hedge delay, race a second one."""
+    deadline = time.monotonic() + budget
+    primary = asyncio.create_task(_attempt(url, params, budget))
+    pending = {primary}
+    hedge = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=min(_hedge_delay(), budget))
+        if not done and not _semaphore.locked():
+            hedge = asyncio.create_task(_attempt(url, params, deadline - time.monotonic()))
+            pending.add(hedge)
+            _stats["hedges"] += 1
+
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(deadline - time.monotonic(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                import httpx
+
+                raise httpx.TimeoutException("OSRM request exceeded deadline")
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _stats["hedge_wins"] += 1
+                    return task.result()
+                last_exc = task.exception()
+        raise last_exc
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def _get(url: str, params: dict, deadline: Optional[float] = None) -> Optional[dict]:
+    """GET with one retry on timeout/connection error, within the caller's deadline."""
+    import httpx
+
+    if _remaining(deadline) <= 0:
+        # A slow caller is not an OSRM failure: leave the breaker alone
+        _stats["deadline_exceeded"] += 1
+        logger.warning("OSRM deadline exhausted before the first attempt")
+        return None
+    if not _breaker.allow():
+        _stats["short_circuited"] += 1
+        return None
+    settled = False
+    try:
+        for attempt in range(RETRIES + 1):
+            budget = _remaining(deadline)
+            if budget <= 0:
+                _stats["deadline_exceeded"] += 1
+                logger.warning("OSRM deadline exhausted before attempt %d", attempt + 1)
+                break
+            try:
+                data = await _hedged_get(url, params, budget)
+                _breaker.record_success()
+                settled = True
+                return data
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt < RETRIES:
+                    logger.warning("OSRM request failed (attempt %d): %s — retrying", attempt + 1, e)
+                else:
+                    logger.error("OSRM request failed after %d attempts: %s", RETRIES + 1, e)
+            except httpx.HTTPStatusError as e:
+                logger.error("OSRM HTTP error: %s", e)
+                break
+        _stats["failures"] += 1
+        _breaker.record_failure()
+        settled = True
+        return None
+    finally:
+        if not settled:
+            # Cancelled (hedge loser, request gone) or an unexpected error: free a half-open trial
+            _breaker.release_trial()
 
 
 async def table_durations(
     origin: tuple[float, float],
     destinations: list[tuple[float, float]],
+    deadline: Optional[float] = None,
 ) -> list[Optional[float]]:
     """
     Get driving durations (seconds) from one origin to many destinations via OSRM Table API.
@@ -54,6 +305,7 @@ async def table_durations(
     Args:
         origin: (lng, lat)
         destinations: list of (lng, lat)
+        deadline: optional time.monotonic() by which the call must finish
 
     Returns:
         List of durations in seconds, same order as destinations.
@@ -66,7 +318,7 @@ async def table_durations(
     coord_str = ";".join(coords)
     url = f"{OSRM_BASE_URL}/table/v1/{OSRM_PROFILE}/{coord_str}"
 
-    data = await _get(url, {"sources": "0", "annotations": "duration"})
+    data = await _get(url, {"sources": "0", "annotations": "duration"}, deadline)
 
     if data is None or data.get("code") != "Ok":
         logger.warning("OSRM table failed, returning None for all destinations")
@@ -78,9 +330,48 @@ async def table_durations(
     return [row[i + 1] if i + 1 < len(row) else None for i in range(len(destinations))]
 
 
+async def table_matrix(
+    sources: list[tuple[float, float]],
+    destinations: list[tuple[float, float]],
+    deadline: Optional[float] = None,
+) -> list[list[Optional[float]]]:
+    """
+    Many-to-many driving durations (seconds) in one Table request.
+    Callers keep len(sources) + len(destinations) within OSRM_MAX_TABLE_COORDS.
+
+    Returns:
+        One row per source, one column per destination. All None on failure.
+    """
+    if not sources or not destinations:
+        return [[] for _ in sources]
+
+    coords = [_coord_str(*c) for c in sources] + [_coord_str(*d) for d in destinations]
+    url = f"{OSRM_BASE_URL}/table/v1/{OSRM_PROFILE}/{';'.join(coords)}"
+    n = len(sources)
+    params = {
+        "sources": ";".join(str(i) for i in range(n)),
+        "destinations": ";".join(str(n + j) for j in range(len(destinations))),
+        "annotations": "duration",
+    }
+
+    data = await _get(url, params, deadline)
+
+    if data is None or data.get("code") != "Ok":
+        logger.warning("OSRM table matrix failed, returning None for all pairs")
+        return [[None] * len(destinations) for _ in sources]
+
+    rows = data.get("durations", [])
+    matrix = []
+    for i in range(n):
+        row = rows[i] if i < len(rows) else []
+        matrix.append([row[j] if j < len(row) else None for j in range(len(destinations))])
+    return matrix
+
+
 async def route_duration(
     origin: tuple[float, float],
     dest: tuple[float, float],
+    deadline: Optional[float] = None,
 ) -> Optional[float]:
     """
     Get driving duration (seconds) for a single origin → destination via OSRM Route API.
@@ -89,6 +380,7 @@ async def route_duration(
     Args:
         origin: (lng, lat)
         dest: (lng, lat)
+        deadline: optional time.monotonic() by which the call must finish
 
     Returns:
         Duration in seconds, or None on failure.
@@ -96,7 +388,7 @@ async def route_duration(
     coord_str = f"{_coord_str(*origin)};{_coord_str(*dest)}"
     url = f"{OSRM_BASE_URL}/route/v1/{OSRM_PROFILE}/{coord_str}"
 
-    data = await _get(url, {"overview": "false"})
+    data = await _get(url, {"overview": "false"}, deadline)
 
     if data is None or data.get("code") != "Ok":
         return None
@@ -0,0 +1,202 @@
+"""
+Daily impact rollups, so "units each food bank received this week" or "meals rescued per business
+per day" is an indexed range read instead of a scan of donations and orders.
+
+  rollup_bank_daily         key = food_bank_id   donated_units, donations
+  rollup_business_daily     key = business_id    donated_units, donations, picked_up, revenue_cents,
+                                                 no_shows
+  rollup_neighborhood_daily key = neighborhood   donated_units, donations (of the receiving bank)
+
+Each doc has _id "<key>|<day>" plus key and day (UTC "YYYY-MM-DD"). Write paths keep them current
+with one unordered bulk_write of upserting $inc per call:
+  - record_donations(): after a plan is persisted (sign=-1 when planned donations are voided);
+  - record_pickups(): when an order moves to picked_up;
+  - record_no_shows(): when the no-show sweeper (services/no_show.py) expires reservations.
+A failed rollup write is logged and never fails the request. rebuild() recomputes every day from
+`since` on from donations/orders and their archives (scripts/rebuild_rollups.py), and
+records the watermark in meta.rollups.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = {
+    "bank": "rollup_bank_daily",
+    "business": "rollup_business_daily",
+    "neighborhood": "rollup_neighborhood_daily",
+}
+COUNTERS = ("donated_units", "donations", "picked_up", "revenue_cents", "no_shows")
+UNKNOWN_NEIGHBORHOOD = "UNKNOWN"
+
+
+def _day(ts: Optional[str]) -> str:
+    return (ts or datetime.now(timezone.utc).isoformat())[:10]
+
+
+def _add(acc: dict, dimension: str, key, day: str, **counts) -> None:
+    if not key:
+        return
+    row = acc[dimension][(str(key), day)]
+    for name, value in counts.items():
+        row[name] += value
+
+
+def _new_acc() -> dict:
+    return {dim: defaultdict(lambda: defaultdict(int)) for dim in DIMENSIONS}
+
+
+async def _apply(db, acc: dict) -> None:
+    for dimension, rows in acc.items():
+        if not rows:
+            continue
+        ops = [
+            UpdateOne(
+                {"_id": f"{key}|{day}"},
+                {"$inc": dict(counts), "$setOnInsert": {"key": key, "day": day}},
+                upsert=True,
+            )
+            for (key, day), counts in rows.items()
+        ]
+        await db[DIMENSIONS[dimension]].bulk_write(ops, ordered=False)
+
+
+async def record_donations(db, donations: list[dict], sign: int = 1) -> None:
+    """donations: donation docs (food_bank_id, business_id, neighborhood, qty, created_at)."""
+    acc = _new_acc()
+    for d in donations:
+        day, counts = _day(d.get("created_at")), {"donated_units": sign * d.get("qty", 0), "donations": sign}
+        _add(acc, "bank", d.get("food_bank_id"), day, **counts)
+        _add(acc, "business", d.get("business_id"), day, **counts)
+        _add(acc, "neighborhood", d.get("neighborhood") or UNKNOWN_NEIGHBORHOOD, day, **counts)
+    try:
+        await _apply(db, acc)
+    except Exception:
+        logger.exception("Donation rollup update failed; run scripts/rebuild_rollups.py")
+
+
+async def record_pickups(db, orders: list[dict], sign: int = 1) -> None:
+    """orders: picked-up order docs; revenue comes from listing_snapshot.price_cents."""
+    acc = _new_acc()
+    for o in orders:
+        price = (o.get("listing_snapshot") or {}).get("price_cents") or 0
+        _add(acc, "business", o.get("business_id"), _day(o.get("picked_up_at")),
+             picked_up=sign, revenue_cents=sign * price)
+    try:
+        await _apply(db, acc)
+    except Exception:
+        logger.exception("Pickup rollup update failed; run scripts/rebuild_rollups.py")
+
+
+async def record_no_shows(db, orders: list[dict]) -> None:
+    acc = _new_acc()
+    for o in orders:
+        _add(acc, "business", o.get("business_id"), _day(o.get("no_show_at")), no_shows=1)
+    try:
+        await _apply(db, acc)
+    except Exception:
+        logger.exception("No-show rollup update failed; run scripts/rebuild_rollups.py")
+
+
+async def read_series(db, dimension: str, key: str, start: str, end: str) -> list[dict]:
+    """Rollup docs for one key with start <= day <= end, oldest first (index (key, day))."""
+    cursor = db[DIMENSIONS[dimension]].find({"key": key, "day": {"$gte": start, "$lte": end}}).sort("day", 1)
+    return await cursor.to_list(length=None)
+
+
+async def read_top(db, dimension: str, start: str, end: str, limit: int) -> list[dict]:
+    """Counters summed per key over the range (index (day)), highest donated_units first."""
+    pipeline = [
+        {"$match": {"day": {"$gte": start, "$lte": end}}},
+        {"$group": {"_id": "$key", **{c: {"$sum": f"${c}"} for c in COUNTERS}}},
+        {"$sort": {"donated_units": -1, "picked_up": -1}},
+        {"$limit": limit},
+    ]
+    return await db[DIMENSIONS[dimension]].aggregate(pipeline).to_list(length=limit)
+
+
+async def _lookup(db, collection: str, ids: set, field: str) -> dict:
+    """{str(_id): doc[field]} over collection and its archive, in chunks of $in."""
+    oids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    out: dict = {}
+    for name in (collection, f"{collection}_archive"):
+        for i in range(0, len(oids), 5000):
+            async for doc in db[name].find({"_id": {"$in": oids[i:i + 5000]}}, {field: 1}):
+                out.setdefault(str(doc["_id"]), doc.get(field))
+    return out
+
+
+async def rebuild(db, since: str = "0000-00-00") -> dict:
+    """
+    Recompute all rollups for days >= since from donations, orders and their archives, replacing
+    what is stored. Neighborhood and business come from the food bank and listing when older
+    donation docs lack them. Increments landing mid-rebuild for those days may be lost; run
+    while traffic is low.
+    """
+    acc = _new_acc()
+    day_expr = {"$substrBytes": ["$created_at", 0, 10]}
+    donation_rows = []
+    for name in ("donations", "donations_archive"):
+        pipeline = [
+            {"$match": {"created_at": {"$gte": since}, "status": {"$ne": "voided"}}},
+            {"$group": {
+                "_id": {
+                    "l": "$listing_id", "b": "$food_bank_id", "biz": "$business_id",
+                    "nbhd": "$neighborhood", "day": day_expr,
+                },
+                "units": {"$sum": "$qty"},
+                "n": {"$sum": 1},
+            }},
+        ]
+        donation_rows.extend(await db[name].aggregate(pipeline, allowDiskUse=True).to_list(length=None))
+    neighborhoods = await _lookup(
+        db, "food_banks", {r["_id"]["b"] for r in donation_rows if r["_id"].get("b") and not r["_id"].get("nbhd")}, "neighborhood",
+    )
+    businesses = await _lookup(db, "listings", {r["_id"]["l"] for r in donation_rows if not r["_id"].get("biz")}, "business_id")
+    for row in donation_rows:
+        g = row["_id"]
+        counts = {"donated_units": row["units"], "donations": row["n"]}
+        _add(acc, "bank", g.get("b"), g["day"], **counts)
+        _add(acc, "business", g.get("biz") or businesses.get(g.get("l")), g["day"], **counts)
+        neighborhood = g.get("nbhd") or neighborhoods.get(g.get("b")) or UNKNOWN_NEIGHBORHOOD
+        _add(acc, "neighborhood", neighborhood, g["day"], **counts)
+
+    for name in ("orders", "orders_archive"):
+        for status, field in (("picked_up", "picked_up_at"), ("no_show", "no_show_at")):
+            pipeline = [
+                {"$match": {"status": status, field: {"$gte": since}}},
+                {"$group": {
+                    "_id": {"biz": "$business_id", "day": {"$substrBytes": [f"${field}", 0, 10]}},
+                    "n": {"$sum": 1},
+                    "revenue": {"$sum": {"$ifNull": ["$listing_snapshot.price_cents", 0]}},
+                }},
+            ]
+            async for row in db[name].aggregate(pipeline, allowDiskUse=True):
+                g = row["_id"]
+                if status == "picked_up":
+                    _add(acc, "business", g.get("biz"), g["day"], picked_up=row["n"], revenue_cents=row["revenue"])
+                else:
+                    _add(acc, "business", g.get("biz"), g["day"], no_shows=row["n"])
+
+    written = {}
+    for dimension, rows in acc.items():
+        coll = db[DIMENSIONS[dimension]]
+        await coll.delete_many({"day": {"$gte": since}})
+        ops = [
+            ReplaceOne({"_id": f"{key}|{day}"}, {"key": key, "day": day, **counts}, upsert=True)
+            for (key, day), counts in rows.items()
+        ]
+        for i in range(0, len(ops), 5000):
+            await coll.bulk_write(ops[i:i + 5000], ordered=False)
+        written[dimension] = len(ops)
+    await db.meta.update_one(
+        {"_id": "rollups"},
+        {"$set": {"since": since, "rebuilt_at": datetime.now(timezone.utc).isoformat(), "docs": written}},
+        upsert=True,
+    )
+    return written
@@ -0,0 +1,135 @@
+"""
+Local travel-time model used when OSRM is unavailable and to pre-rank candidates before OSRM.
+
+duration_seconds ≈ intercept_s + haversine_km * seconds_per_km[cell]
+
+seconds_per_km is fitted per grid cell (keyed by the origin) from cached OSRM results
+(collection travel_time_samples) by scripts/fit_travel_time_model.py, which writes
+food_data/travel_time_model.json. Without a model file we fall back to ~30 mph. Samples expire
+through a TTL index on created_at (database.INDEX_SPECS), so the collection holds a rolling window.
+
+Env vars:
+  TRAVEL_TIME_MODEL_PATH  – default: food_data/travel_time_model.json
+  TRAVEL_SAMPLES_TTL_DAYS – days a cached OSRM sample is kept, default: 90
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRAVEL_TIME_MODEL_PATH = Path(
+    os.environ.get(
+        "TRAVEL_TIME_MODEL_PATH",
+        Path(__file__).parent.parent / "food_data" / "travel_time_model.json",
+    )
+)
+
+TRAVEL_SAMPLES_TTL_DAYS = float(os.environ.get("TRAVEL_SAMPLES_TTL_DAYS", 90))
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Defaults match donation_routing_service's 0.8 km/min (~30 mph) prefilter estimate
+DEFAULT_CELL_DEG = 0.02
+DEFAULT_INTERCEPT_S = 60.0
+DEFAULT_SECONDS_PER_KM = 75.0
+
+_model: Optional[dict] = None
+_pending_writes: set[asyncio.Task] = set()
+
+
+def haversine_km(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def cell_key(lng: float, lat: float, cell_deg: float) -> str:
+    return f"{math.floor(lat / cell_deg)}:{math.floor(lng / cell_deg)}"
+
+
+def load_model(path: Path = TRAVEL_TIME_MODEL_PATH) -> dict:
+    """Load the fitted model once; defaults when the file is missing or unreadable."""
+    global _model
+    if _model is not None:
+        return _model
+    model = {
+        "cell_deg": DEFAULT_CELL_DEG,
+        "intercept_s": DEFAULT_INTERCEPT_S,
+        "default_s_per_km": DEFAULT_SECONDS_PER_KM,
+        "cells": {},
+    }
+    try:
+        with open(path, encoding="utf-8") as f:
+            model.update(json.load(f))
+        logger.info("Loaded travel-time model (%d cells) from %s", len(model["cells"]), path)
+    except FileNotFoundError:
+        logger.info("No travel-time model at %s; using default speed", path)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read travel-time model %s: %s", path, e)
+    _model = model
+    return _model
+
+
+def estimate_seconds(origin: tuple[float, float], dest: tuple[float, float]) -> float:
+    """Estimated driving seconds for origin → dest, both (lng, lat)."""
+    model = load_model()
+    dist_km = haversine_km(origin[0], origin[1], dest[0], dest[1])
+    s_per_km = model["cells"].get(
+        cell_key(origin[0], origin[1], model["cell_deg"]),
+        model["default_s_per_km"],
+    )
+    return model["intercept_s"] + dist_km * s_per_km
+
+
+def estimate_durations(
+    origin: tuple[float, float],
+    destinations: list[tuple[float, float]],
+) -> list[float]:
+    """Same shape as osrm_service.table_durations, but never None."""
+    return [estimate_seconds(origin, d) for d in destinations]
+
+
+def record_samples(
+    db,
+    origin: tuple[float, float],
+    destinations: list[tuple[float, float]],
+    durations: list[Optional[float]],
+) -> None:
+    """
+    Cache OSRM results as training samples without blocking the request.
+    Write failures are logged and dropped; the model is only refitted offline.
+    """
+    # A BSON date (not an ISO string) so the TTL index can expire it
+    now = datetime.now(timezone.utc)
+    docs = [
+        {
+            "origin": list(origin),
+            "dest": list(dest),
+            "distance_km": round(haversine_km(origin[0], origin[1], dest[0], dest[1]), 4),
+            "duration_s": dur,
+            "created_at": now,
+        }
+        for dest, dur in zip(destinations, durations)
+        if dur is not None
+    ]
+    if not docs:
+        return
+
+    async def _write():
+        try:
+            await db.travel_time_samples.insert_many(docs, ordered=False)
+        except Exception as e:
+            logger.warning("Could not cache travel-time samples: %s", e)
+
+    task = asyncio.create_task(_write())
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
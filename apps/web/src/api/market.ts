@@ -30,6 +30,17 @@ export type MarketListing = {
   address?: string | null;
   location?: GeoPoint | null;
   created_at?: string | null;
+  distance_m?: number | null; // set by /market/near
+};
+
+export type OrderListingSnapshot = {
+  title?: string | null;
+  business_name?: string | null;
+  price_cents?: number | null;
+  pickup_start?: string | null;
+  pickup_end?: string | null;
+  address?: string | null;
+  category?: string | null;
 };
 
 export type MarketOrder = {
@@ -42,6 +53,7 @@ export type MarketOrder = {
   created_at?: string | null;
   picked_up_at?: string | null;
   canceled_at?: string | null;
+  listing_snapshot?: OrderListingSnapshot | null; // listing as reserved
 };
 
 export type Bounds = {
@@ -90,6 +102,28 @@ export async function getMarketWithBounds(
   return data;
 }
 
+/** Closest open listings within radiusKm of a point, nearest first (each has distance_m). */
+export async function getMarketNear(
+  lat: number,
+  lng: number,
+  radiusKm: number,
+  filters?: MarketFilters,
+  limit = 50
+): Promise<MarketListing[]> {
+  const params: Record<string, string | number | boolean | undefined> = {
+    lat,
+    lng,
+    radius_km: radiusKm,
+    limit,
+  };
+  if (filters?.open_now) params.open_now = true;
+  if (filters?.min_price_cents != null) params.min_price_cents = filters.min_price_cents;
+  if (filters?.max_price_cents != null) params.max_price_cents = filters.max_price_cents;
+  if (filters?.category) params.category = filters.category;
+  const { data } = await marketApi.get<MarketListing[]>("/market/near", { params });
+  return data;
+}
+
 export async function parseMarketIntent(query: string): Promise<MarketIntent> {
   const { data } = await marketApi.post<MarketIntent>("/market/intent", { query });
   return data;
@@ -38,3 +38,8 @@ export async function getSimulation(): Promise<SimulationData> {
   if (!res.ok) throw new Error(`GET /api/simulation → ${res.status}`);
   return res.json();
 }
+
+/** Leaflet URL template for the food-insecurity heatmap tiles. */
+export function needTileUrl(): string {
+  return `${getApiBaseUrl()}/need/tiles/{z}/{x}/{y}.png`;
+}
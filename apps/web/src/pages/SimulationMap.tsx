@@ -7,7 +7,7 @@ import { useEffect, useState } from "react";
 import { MapContainer, TileLayer, Marker, Popup, Polyline } from "react-leaflet";
 import L from "leaflet";
 import "leaflet/dist/leaflet.css";
-import { getSimulation } from "../api/simulation";
+import { getSimulation, needTileUrl } from "../api/simulation";
 import type { SimulationData, SimFoodBank } from "../api/simulation";
 
 const BOSTON_CENTER: [number, number] = [42.3601, -71.0589];
@@ -68,6 +68,9 @@ function SimMapView({ data }: { data: SimulationData }) {
         maxZoom={20}
       />
 
+      {/* Food-insecurity heatmap (SNAP rate raster) */}
+      <TileLayer url={needTileUrl()} opacity={0.6} maxZoom={20} />
+
       {/* Allocation lines */}
       {lines.map((line, i) => (
         <Polyline
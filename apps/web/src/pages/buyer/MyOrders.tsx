@@ -71,6 +71,23 @@ export function MyOrders() {
       <ul className="space-y-3">
         {orders.map((o) => (
           <li key={o.id} className="p-4 bg-white rounded-xl border">
+            {o.listing_snapshot?.title && (
+              <div className="font-semibold text-gray-900">
+                {o.listing_snapshot.title}
+                {o.listing_snapshot.business_name && (
+                  <span className="font-normal text-gray-600"> · {o.listing_snapshot.business_name}</span>
+                )}
+              </div>
+            )}
+            {o.listing_snapshot?.pickup_start && o.listing_snapshot?.pickup_end && (
+              <div className="text-sm text-gray-600">
+                Pickup {new Date(o.listing_snapshot.pickup_start).toLocaleString()} –{" "}
+                {new Date(o.listing_snapshot.pickup_end).toLocaleTimeString()}
+              </div>
+            )}
+            {o.listing_snapshot?.address && (
+              <div className="text-sm text-gray-600">{o.listing_snapshot.address}</div>
+            )}
             <div className="font-medium text-gray-900">{o.status}</div>
             <div className="text-sm text-gray-600 mt-1">
               Order ID: <code>{o.id}</code>